@@ -3,7 +3,10 @@ Flask backend for real-time number plate detection system.
 
 Endpoints:
 - POST /api/detect - Upload image/frame for detection
-- POST /api/detect/video - Process video file
+- POST /api/detect/video - Queue video file for background processing
+- POST /api/detect/video/stream - Queue a raw video body, decoded while it uploads
+- GET /api/jobs/<id> - Get video job progress
+- POST /api/jobs/<id>/cancel - Cancel video job
 - GET /api/detections - Retrieve detection history
 - GET /api/detections/<id> - Get specific detection
 - DELETE /api/detections/<id> - Delete detection
@@ -11,17 +14,23 @@ Endpoints:
 - WebSocket /ws/live - Real-time video stream processing
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, insert, text
 from flask_socketio import SocketIO, emit
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial
 from dotenv import load_dotenv
 import os
 import cv2
 import numpy as np
-import base64
+import threading
+import time
+import atexit
+import uuid
+import json
 from pathlib import Path
 import sys
 
@@ -31,8 +40,44 @@ load_dotenv()
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from backend.models import db, Detection
+from backend.models import (
+    db,
+    Camera,
+    Detection,
+    DETECTION_FIELDS,
+    DEFAULT_LIST_FIELDS,
+    ensure_schema,
+)
+from backend.fields import parse_fields
+from backend.pagination import (
+    APPROX_COUNT_LIMIT,
+    decode_cursor,
+    encode_cursor,
+    parse_datetime,
+    parse_total_mode,
+)
 from backend.detector import PlateDetector
+from backend.pipeline import VideoPipeline
+from backend.decoder import can_stream, open_decoder
+from backend.jobs import VideoJobManager
+from backend.upload import StreamingUpload
+from backend.tracker import TrackerRegistry
+from backend.broker import InferenceBroker
+from backend.ingest import CameraIngestService
+from backend.writer import DetectionWriter
+from backend.crop_store import create_crop_store, sweep_crops
+from backend.plate_index import PlateIndex, normalize_plate
+from backend.stats import DetectionStats
+from backend.gate import GateRegistry, MotionGate, parse_roi
+from backend.sampler import AdaptiveSampler, parse_sample_rate
+from backend.segments import SegmentedVideoProcessor
+from backend.live import (
+    LiveScheduler,
+    crop_payload,
+    encode_result,
+    parse_frames,
+    result_format,
+)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -48,19 +93,453 @@ db.init_app(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Initialize detector
-detector = PlateDetector(
+DETECTOR_CONFIG = dict(
     yolov7_weights=os.getenv("MODEL_WEIGHTS", "models/yolov7.pt"),
     device=os.getenv("DEVICE", "0"),
     conf_threshold=float(os.getenv("CONF_THRESHOLD", "0.25")),
+    # 'torch' or 'onnx'; defaults to 'onnx' for .onnx weights
+    backend=os.getenv("DETECTOR_BACKEND") or None,
+    # 'int8' loads the quantized <weights>.int8.onnx from scripts/quantize_model.py
+    precision=os.getenv("MODEL_PRECISION", "fp32"),
 )
+# Parallel video jobs: split each video into keyframe-aligned segments of at most
+# VIDEO_SEGMENT_SECONDS and process them on VIDEO_PROCESSES worker processes, each with
+# its own detector (0: one in-process pipeline per job). VIDEO_PROCESS_THREADS is the
+# inference threads per worker (0: cores / VIDEO_PROCESSES).
+VIDEO_PROCESSES = int(os.getenv("VIDEO_PROCESSES", "0"))
+VIDEO_PROCESS_THREADS = int(os.getenv("VIDEO_PROCESS_THREADS", "0"))
+VIDEO_SEGMENT_SECONDS = float(os.getenv("VIDEO_SEGMENT_SECONDS", "300"))
+# Workers are forked here: the inference libraries are already imported, but no model
+# is loaded and no thread pool is running yet. Under the debug reloader the watching
+# parent never serves requests, so only the reloaded child starts a pool.
+segment_processor = None
+RELOADER_PARENT = __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+if VIDEO_PROCESSES > 1 and not RELOADER_PARENT:
+    try:
+        segment_processor = SegmentedVideoProcessor(
+            VIDEO_PROCESSES,
+            DETECTOR_CONFIG,
+            threads=VIDEO_PROCESS_THREADS,
+            segment_seconds=VIDEO_SEGMENT_SECONDS,
+        )
+        atexit.register(segment_processor.close)
+    except ValueError as e:
+        print(f"Warning: {e}; video jobs run in-process")
+detector = PlateDetector(**DETECTOR_CONFIG)
+# Frames per forward pass on the video and WebSocket paths
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "8"))
+# Video pipeline: OCR thread pool size and inter-stage queue capacity
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+# Background video job workers
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "1"))
+# Finished video jobs (state files and uploads) are removed after VIDEO_JOB_RETENTION_HOURS,
+# keeping at most VIDEO_JOB_MAX_FINISHED of them
+VIDEO_JOB_RETENTION_HOURS = float(os.getenv("VIDEO_JOB_RETENTION_HOURS", "24"))
+VIDEO_JOB_MAX_FINISHED = int(os.getenv("VIDEO_JOB_MAX_FINISHED", "1000"))
+# Cap on live frames processed per second per stream (0: as fast as inference allows)
+LIVE_MAX_FPS = float(os.getenv("LIVE_MAX_FPS", "0"))
+# Live frames from all streams are micro-batched: up to LIVE_MAX_BATCH frames per
+# forward pass, each waiting at most LIVE_MAX_WAIT_MS for others to join
+LIVE_MAX_BATCH = int(os.getenv("LIVE_MAX_BATCH", str(BATCH_SIZE)))
+LIVE_MAX_WAIT_MS = float(os.getenv("LIVE_MAX_WAIT_MS", "5"))
+# Seconds between sweeps that store the tracks of live streams that stopped sending
+LIVE_EXPIRE_SECONDS = float(os.getenv("LIVE_EXPIRE_SECONDS", "1"))
+# Server-side ingestion of active cameras' rtsp_url streams. Off by default: with several
+# app processes (workers or replicas) enable it in exactly one, or every camera is read
+# and stored once per process
+CAMERA_INGEST = os.getenv("CAMERA_INGEST", "0") == "1"
+# Detection rate for cameras without their own sample_fps, and camera list reload interval
+INGEST_SAMPLE_FPS = float(os.getenv("INGEST_SAMPLE_FPS", "2"))
+INGEST_REFRESH_SECONDS = float(os.getenv("INGEST_REFRESH_SECONDS", "30"))
+# Detection inserts: 'async' buffers them and bulk-inserts up to DB_WRITE_BATCH_SIZE rows
+# at once, at least every DB_WRITE_INTERVAL_MS; 'sync' inserts on every write
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "async")
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+DB_WRITE_INTERVAL_MS = float(os.getenv("DB_WRITE_INTERVAL_MS", "1000"))
+# Plate crop JPEGs are stored by content hash; rows keep only the key
+CROP_STORE = os.getenv("CROP_STORE", "local")
+CROP_STORE_DIR = os.getenv("CROP_STORE_DIR", "uploads/crops")
+# Crops no row references (e.g. of deleted detections) are deleted every
+# CROP_SWEEP_HOURS once over an hour old; 0 keeps them
+CROP_SWEEP_HOURS = float(os.getenv("CROP_SWEEP_HOURS", "24"))
+# Motion gating: skip the detector on frames where nothing moved inside the camera's
+# ROI (live streams, camera ingest, and video jobs unless the upload says otherwise).
+# MOTION_THRESHOLD is the fraction of ROI pixels that must change.
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.005"))
+# Video job decoding: backend (auto uses PyAV when installed, else OpenCV), downscale
+# frames wider than DECODE_MAX_WIDTH (0: full resolution), seek instead of decoding
+# across gaps of DECODE_SEEK_FRAMES or more, OpenCV hardware decoding, PyAV threads
+VIDEO_DECODER = os.getenv("VIDEO_DECODER", "auto")
+DECODE_MAX_WIDTH = int(os.getenv("DECODE_MAX_WIDTH", "0"))
+DECODE_SEEK_FRAMES = int(os.getenv("DECODE_SEEK_FRAMES", "300"))
+DECODE_HW_ACCEL = os.getenv("DECODE_HW_ACCEL", "0") == "1"
+DECODE_THREADS = int(os.getenv("DECODE_THREADS", "0"))
+# Largest raw video body accepted by /api/detect/video/stream (MB); the multipart
+# endpoints keep the 50MB MAX_CONTENT_LENGTH
+MAX_VIDEO_UPLOAD_MB = int(os.getenv("MAX_VIDEO_UPLOAD_MB", "2048"))
+# Video jobs sample frames adaptively by default (sample_rate=auto): every
+# SAMPLE_MIN_STRIDE-th frame while plates are in view, backing off to every
+# SAMPLE_MAX_STRIDE-th on idle stretches. ADAPTIVE_SAMPLING=0 makes the default
+# a fixed stride of 5.
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "1") == "1"
+SAMPLE_MIN_STRIDE = int(os.getenv("SAMPLE_MIN_STRIDE", "1"))
+SAMPLE_MAX_STRIDE = int(os.getenv("SAMPLE_MAX_STRIDE", "30"))
+# /api/stats is kept up to date on insert and snapshotted to STATS_FILE every
+# STATS_SAVE_SECONDS; hourly rollups cover the last STATS_HOURS hours
+STATS_FILE = os.getenv("STATS_FILE", "uploads/stats.json")
+STATS_SAVE_SECONDS = float(os.getenv("STATS_SAVE_SECONDS", "300"))
+STATS_HOURS = int(os.getenv("STATS_HOURS", "168"))
 
 # Create upload folder
 upload_folder = Path(app.config["UPLOAD_FOLDER"])
 upload_folder.mkdir(parents=True, exist_ok=True)
+crop_store = create_crop_store(CROP_STORE, root=CROP_STORE_DIR)
 
 # Create database tables
 with app.app_context():
     db.create_all()
+    ensure_schema()
+
+# Per-camera plate trackers for the live WebSocket path
+live_trackers = TrackerRegistry()
+# Latest-frame-wins scheduling per (client, camera) live stream
+live_scheduler = LiveScheduler(max_fps=LIVE_MAX_FPS)
+# Shared forward passes across live streams
+live_broker = InferenceBroker(
+    partial(detector.detect_batch, ocr=False),
+    max_batch_size=LIVE_MAX_BATCH,
+    max_wait_ms=LIVE_MAX_WAIT_MS,
+)
+
+
+# Fuzzy plate search over every stored plate text
+plate_index = PlateIndex()
+plate_index_ready = threading.Event()
+
+
+def load_plate_index():
+    """Fill the plate index from the detections table (runs on a startup thread)."""
+    with app.app_context():
+        counts = db.session.query(Detection.plate_number, func.count()).group_by(
+            Detection.plate_number
+        )
+        for plate_number, count in counts:
+            plate_index.add(plate_number, count)
+    plate_index_ready.set()
+
+
+threading.Thread(target=load_plate_index, name="plate-index", daemon=True).start()
+
+
+# Detection counts and distinct plate estimates, updated on every insert
+detection_stats = DetectionStats(hours=STATS_HOURS)
+detection_stats.load(STATS_FILE)
+stats_ready = threading.Event()
+
+
+def run_detection_stats():
+    """Count detections newer than the stats snapshot, then save it periodically.
+
+    Runs on a startup thread. Batches written meanwhile are held back by
+    ``DetectionStats.add_batch`` and counted at the end unless their ids are
+    at or below the newest id the catch-up read. The snapshot is only saved
+    once the catch-up has succeeded.
+    """
+    newest = None
+    try:
+        with app.app_context():
+            newest = db.session.query(func.max(Detection.id)).scalar()
+            rows = (
+                db.session.query(
+                    Detection.id, Detection.plate_number, Detection.camera_id, Detection.created_at
+                )
+                .filter(
+                    Detection.id > (detection_stats.watermark or 0), Detection.id <= (newest or 0)
+                )
+                .order_by(Detection.id)
+                .yield_per(5000)
+            )
+            for row in rows:
+                detection_stats.add(row.plate_number, row.camera_id, row.created_at, id=row.id)
+    except Exception as e:
+        print(f"Warning: could not count detections for stats: {e}")
+        detection_stats.finish_catch_up(newest)
+        return
+    detection_stats.finish_catch_up(newest)
+    stats_ready.set()
+    while True:
+        time.sleep(STATS_SAVE_SECONDS)
+        save_detection_stats()
+
+
+def save_detection_stats():
+    # An incomplete catch-up must not be saved: its watermark may cover
+    # rows it has not counted
+    if not stats_ready.is_set():
+        return
+    try:
+        detection_stats.save(STATS_FILE)
+    except Exception as e:
+        print(f"Warning: could not save stats: {e}")
+
+
+threading.Thread(target=run_detection_stats, name="detection-stats", daemon=True).start()
+atexit.register(save_detection_stats)
+
+
+def write_detections(rows):
+    """Bulk insert buffered Detection rows (runs on the writer thread)."""
+    with app.app_context():
+        statement = insert(Detection)
+        if db.engine.dialect.insert_executemany_returning:
+            ids = db.session.scalars(
+                statement.returning(Detection.id, sort_by_parameter_order=True), rows
+            ).all()
+            newest = max(ids)
+        else:
+            db.session.execute(statement, rows)
+            # Detections are only inserted here, one batch at a time, so the newest
+            # id in this transaction is the batch's
+            newest = db.session.query(func.max(Detection.id)).scalar()
+        db.session.commit()
+    plate_index.add_many(row["plate_number"] for row in rows)
+    # The batch's newest id advances the stats watermark
+    detection_stats.add_batch(
+        ((row["plate_number"], row["camera_id"], row["created_at"]) for row in rows), id=newest
+    )
+
+
+# Write-behind batching of detection inserts from every path
+detection_writer = DetectionWriter(
+    write_detections,
+    batch_size=DB_WRITE_BATCH_SIZE,
+    flush_interval=DB_WRITE_INTERVAL_MS / 1000.0,
+    mode=DB_WRITE_MODE,
+)
+
+
+def store_detections(records, camera_id, wait=False):
+    """Store track records' crops and queue their rows for insertion.
+
+    Args:
+        records: Track records (pipeline or ingest) with a ``plate_crop``.
+        camera_id: Camera the records belong to.
+        wait: Block until the rows are written.
+    """
+    rows = []
+    for record in records:
+        crop_key = crop_store.put_crop(record["plate_crop"])
+        if crop_key is not None:
+            rows.append(Detection.row_from_result(record, camera_id, crop_key))
+    detection_writer.add(rows, wait=wait)
+
+
+def store_live_tracks(tracks, wait=False):
+    """Store finished live tracks, one Detection row per track.
+
+    Args:
+        tracks: (camera_id, track) pairs from the live trackers.
+        wait: Block until the rows are written.
+    """
+    records = {}
+    for camera_id, track in tracks:
+        records.setdefault(camera_id, []).append(track.to_record())
+    for camera_id, camera_records in records.items():
+        store_detections(camera_records, camera_id, wait=wait)
+
+
+def referenced_crops(keys):
+    """Which of these crop keys detection rows still reference."""
+    with app.app_context():
+        rows = (
+            db.session.query(Detection.plate_image)
+            .filter(Detection.plate_image.in_(keys))
+            .distinct()
+        )
+        return {key for (key,) in rows}
+
+
+def sweep_unreferenced_crops():
+    """Delete crops no detection references, every CROP_SWEEP_HOURS (runs on a thread)."""
+    while True:
+        time.sleep(CROP_SWEEP_HOURS * 3600)
+        try:
+            deleted = sweep_crops(crop_store, referenced_crops)
+        except Exception as e:
+            print(f"Warning: crop sweep failed: {e}")
+            continue
+        if deleted:
+            print(f"Deleted {deleted} unreferenced crops")
+
+
+if CROP_SWEEP_HOURS > 0:
+    threading.Thread(target=sweep_unreferenced_crops, name="crop-sweep", daemon=True).start()
+
+
+def expire_live_tracks():
+    """Store tracks of live streams that went quiet, even when no frame arrives."""
+    while True:
+        time.sleep(LIVE_EXPIRE_SECONDS)
+        try:
+            store_live_tracks(live_trackers.expire(time.time()))
+        except Exception as e:
+            print(f"Warning: could not store live tracks: {e}")
+
+
+def flush_live_tracks():
+    """Store every open live track (at shutdown)."""
+    try:
+        store_live_tracks(live_trackers.flush(), wait=True)
+    except Exception as e:
+        print(f"Warning: could not store live tracks: {e}")
+
+
+threading.Thread(target=expire_live_tracks, name="live-expiry", daemon=True).start()
+# Registered after the detection writer, so it runs before the writer closes
+atexit.register(flush_live_tracks)
+
+
+def camera_roi(camera_id):
+    """Motion gate ROI configured for a camera, or None."""
+    with app.app_context():
+        camera = Camera.query.filter_by(camera_id=camera_id).first()
+        roi = camera.to_dict()["roi"] if camera is not None else None
+    try:
+        return parse_roi(roi)
+    except ValueError as e:
+        print(f"Warning: ignoring roi of camera {camera_id}: {e}")
+        return None
+
+
+# Per-camera motion gates for the live WebSocket path
+live_gates = GateRegistry(camera_roi, threshold=MOTION_THRESHOLD)
+
+
+def run_video_job(job, on_progress, cancel):
+    """Process a queued video upload through the staged pipeline."""
+    params = job["params"]
+    # Gate and sampler settings; each pipeline (or segment) builds its own
+    gate = None
+    if params.get("motion_gate", False):
+        gate = {"threshold": MOTION_THRESHOLD, "roi": camera_roi(params["camera_id"])}
+    sampler = None
+    if params["sample_rate"] == "auto":
+        sampler = {
+            "min_stride": params.get("min_stride", SAMPLE_MIN_STRIDE),
+            "max_stride": params.get("max_stride", SAMPLE_MAX_STRIDE),
+        }
+    pipeline_options = {
+        "batch_size": BATCH_SIZE,
+        "ocr_workers": OCR_WORKERS,
+        "queue_size": PIPELINE_QUEUE_SIZE,
+    }
+    decoder_options = {
+        "backend": VIDEO_DECODER,
+        "max_width": DECODE_MAX_WIDTH,
+        "seek_frames": DECODE_SEEK_FRAMES,
+        "hw_accel": DECODE_HW_ACCEL,
+        "threads": DECODE_THREADS,
+    }
+    run_options = dict(
+        start_frame=job["committed_frame"] + 1,
+        on_progress=on_progress,
+        cancel=cancel,
+        # Track times are the upload time plus the offset into the video
+        base_timestamp=datetime.fromisoformat(job["created_at"])
+        .replace(tzinfo=timezone.utc)
+        .timestamp(),
+    )
+
+    def sink(records):
+        # Rows must be written before the job checkpoints past them
+        store_detections(records, params["camera_id"], wait=True)
+
+    # A streaming upload may still be arriving: decode it as it comes in if the
+    # decoder reads file objects, otherwise wait for the last byte
+    upload = job.get("_upload")
+    stream = None
+    if upload is not None and not upload.complete:
+        if can_stream(VIDEO_DECODER):
+            stream = upload.open(cancel)
+        else:
+            upload.wait(cancel)
+    if stream is None and upload is not None and upload.error is not None:
+        raise RuntimeError(f"Upload failed: {upload.error}")
+
+    if (
+        segment_processor is not None
+        and not segment_processor.broken
+        and stream is None
+        and params.get("parallel", True)
+    ):
+        # Keyframe-aligned segments on the worker processes
+        return segment_processor.run(
+            job["video_path"],
+            sink,
+            1 if sampler is not None else params["sample_rate"],
+            gate=gate,
+            sampler=sampler,
+            pipeline_options=pipeline_options,
+            decoder_options=decoder_options,
+            **run_options,
+        )
+
+    # Decode, detect, OCR and insert run as overlapping pipeline stages
+    pipeline = VideoPipeline(
+        detector,
+        sink,
+        decoder_factory=partial(open_decoder, **decoder_options),
+        **pipeline_options,
+    )
+    try:
+        result = pipeline.run(
+            stream or job["video_path"],
+            1 if sampler is not None else params["sample_rate"],
+            gate=MotionGate(**gate) if gate is not None else None,
+            sampler=AdaptiveSampler(**sampler) if sampler is not None else None,
+            **run_options,
+        )
+    finally:
+        if stream is not None:
+            stream.close()
+    if upload is not None and upload.error is not None:
+        raise RuntimeError(f"Upload failed: {upload.error}")
+    return result
+
+
+# Start video job workers (resumes jobs left unfinished by a restart)
+video_jobs = VideoJobManager(
+    upload_folder / "jobs",
+    run_video_job,
+    workers=VIDEO_WORKERS,
+    retention_seconds=VIDEO_JOB_RETENTION_HOURS * 3600,
+    max_finished=VIDEO_JOB_MAX_FINISHED,
+)
+video_jobs.start()
+
+
+def load_cameras():
+    """Active cameras for the ingest service (runs on its refresh thread)."""
+    with app.app_context():
+        return [camera.to_dict() for camera in Camera.query.filter_by(is_active=True).all()]
+
+
+# One RTSP reader per active camera; detection is batched with the live streams
+camera_ingest = CameraIngestService(
+    load_cameras,
+    live_broker.detect,
+    detector.run_ocr_batch,
+    store_detections,
+    default_sample_fps=INGEST_SAMPLE_FPS,
+    refresh_interval=INGEST_REFRESH_SECONDS,
+    gate_factory=(
+        (lambda roi: MotionGate(threshold=MOTION_THRESHOLD, roi=roi)) if MOTION_GATE else None
+    ),
+)
+if CAMERA_INGEST:
+    camera_ingest.start()
 
 
 @app.route("/api/health", methods=["GET"])
@@ -70,6 +549,15 @@ def health_check():
         {
             "status": "healthy",
             "model_loaded": getattr(detector, "model", None) is not None,
+            "live_batching": live_broker.stats(),
+            "detection_writer": detection_writer.stats(),
+            "live_motion_gates": live_gates.stats() if MOTION_GATE else None,
+            # Worker processes for parallel video jobs (0: in-process)
+            "video_processes": (
+                segment_processor.processes
+                if segment_processor is not None and not segment_processor.broken
+                else 0
+            ),
             "timestamp": datetime.utcnow().isoformat(),
         }
     )
@@ -108,6 +596,7 @@ def detect_plate():
     results = detector.detect(img) or []
 
     # Save to database
+    rows = []
     detection_records = []
     for result in results:
         # defensive access
@@ -115,40 +604,24 @@ def detect_plate():
         if plate_crop is None:
             continue
 
-        # Save cropped plate image (base64)
-        ok, buffer = cv2.imencode(".jpg", plate_crop)
-        if not ok:
+        # Save cropped plate image to the crop store; the row keeps its key
+        crop_key = crop_store.put_crop(plate_crop)
+        if crop_key is None:
             continue
-        plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
-
-        # Create Detection instance then set attributes (avoids keyword-arg mismatch)
-        detection = Detection()
-        # Use .get with defaults, cast to expected primitive types
-        detection.plate_number = result.get("plate_text")
-        detection.confidence = float(result.get("confidence", 0.0))
-        detection.camera_id = camera_id
-        bbox = result.get("bbox", [0, 0, 0, 0])
-        try:
-            detection.bbox_x1 = float(bbox[0])
-            detection.bbox_y1 = float(bbox[1])
-            detection.bbox_x2 = float(bbox[2])
-            detection.bbox_y2 = float(bbox[3])
-        except Exception:
-            detection.bbox_x1 = detection.bbox_y1 = detection.bbox_x2 = detection.bbox_y2 = 0.0
-        detection.plate_image = plate_img_b64
 
-        db.session.add(detection)
+        rows.append(Detection.row_from_result(result, camera_id, crop_key))
 
         detection_records.append(
             {
                 "plate_number": result.get("plate_text"),
                 "confidence": float(result.get("confidence", 0.0)),
-                "bbox": bbox,
+                "bbox": result.get("bbox", [0, 0, 0, 0]),
                 "ocr_confidence": float(result.get("ocr_confidence", 0.0)),
             }
         )
 
-    db.session.commit()
+    # One bulk insert, written before responding
+    detection_writer.add(rows, wait=True)
 
     return jsonify(
         {
@@ -160,144 +633,273 @@ def detect_plate():
     )
 
 
+def parse_video_params(values):
+    """Video job parameters from form fields or query args.
+
+    Raises:
+        ValueError: If sample_rate or a stride bound is invalid.
+    """
+    return {
+        "camera_id": values.get("camera_id", "default"),
+        "sample_rate": parse_sample_rate(
+            values.get("sample_rate", "auto" if ADAPTIVE_SAMPLING else "5")
+        ),
+        "min_stride": int(values.get("min_stride", SAMPLE_MIN_STRIDE)),
+        "max_stride": int(values.get("max_stride", SAMPLE_MAX_STRIDE)),
+        "motion_gate": values.get("motion_gate", "1" if MOTION_GATE else "0") == "1",
+        "parallel": values.get("parallel", "1") == "1",
+    }
+
+
 @app.route("/api/detect/video", methods=["POST"])
 def detect_video():
-    """Process video file and detect plates in frames.
+    """Queue video file for background plate detection.
 
     Request:
         - file: video file
         - camera_id: optional camera identifier
-        - sample_rate: frames to skip (default: 5)
-
-    Response:
-        - detections: list of all detections across frames
-        - total_frames: number of frames processed
+        - sample_rate: process every n-th frame, or "auto" to adapt the stride to
+          detection activity (default: "auto" unless ADAPTIVE_SAMPLING=0, then 5)
+        - min_stride, max_stride: stride bounds for "auto" (default:
+          SAMPLE_MIN_STRIDE, SAMPLE_MAX_STRIDE)
+        - motion_gate: "1"/"0" to skip frames where nothing moved inside the
+          camera's ROI (default: MOTION_GATE)
+        - parallel: "0" to run the job in-process even when VIDEO_PROCESSES is
+          set (default: "1")
+
+    Response (202):
+        - job_id: id to poll at /api/jobs/<job_id>
+        - status: initial job status ("queued")
     """
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     file = request.files["file"]
-    camera_id = request.form.get("camera_id", "default")
-    sample_rate = int(request.form.get("sample_rate", 5))
+    try:
+        params = parse_video_params(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if not file or not file.filename:
         return jsonify({"error": "Empty filename"}), 400
 
-    # Save video temporarily (use secure filename)
-    filename = secure_filename(file.filename)
-    video_path = upload_folder / filename
+    # Save under a unique name so concurrent uploads of the same file don't collide
+    job_id = uuid.uuid4().hex
+    video_path = upload_folder / f"{job_id}{Path(secure_filename(file.filename)).suffix}"
     file.save(str(video_path))
 
-    # Process video
-    cap = cv2.VideoCapture(str(video_path))
-    frame_count = 0
-    all_detections = []
-    processed_frames = 0
+    job = video_jobs.submit(video_path, params, job_id=job_id)
+
+    return (
+        jsonify(
+            {
+                "success": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['id']}",
+            }
+        ),
+        202,
+    )
 
-    try:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # guard in case frame is None
-            if frame is None:
-                frame_count += 1
-                continue
 
-            # Sample frames
-            if frame_count % sample_rate == 0:
-                results = detector.detect(frame) or []
-
-                for result in results:
-                    plate_crop = result.get("plate_crop")
-                    if plate_crop is None:
-                        continue
-
-                    ok, buffer = cv2.imencode(".jpg", plate_crop)
-                    if not ok:
-                        continue
-                    plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
-
-                    # Create Detection safely
-                    detection = Detection()
-                    detection.plate_number = result.get("plate_text")
-                    detection.confidence = float(result.get("confidence", 0.0))
-                    detection.camera_id = camera_id
-                    bbox = result.get("bbox", [0, 0, 0, 0])
-                    try:
-                        detection.bbox_x1 = float(bbox[0])
-                        detection.bbox_y1 = float(bbox[1])
-                        detection.bbox_x2 = float(bbox[2])
-                        detection.bbox_y2 = float(bbox[3])
-                    except Exception:
-                        detection.bbox_x1 = detection.bbox_y1 = detection.bbox_x2 = (
-                            detection.bbox_y2
-                        ) = 0.0
-                    detection.plate_image = plate_img_b64
-
-                    db.session.add(detection)
-                    all_detections.append(result.get("plate_text"))
-
-                processed_frames += 1
-
-            frame_count += 1
+@app.route("/api/detect/video/stream", methods=["POST", "PUT"])
+def detect_video_stream():
+    """Queue a video sent as the raw request body and detect while it uploads.
+
+    The job is queued before the body is read, and the decoder follows the
+    upload as it is written, so the first detections don't wait for the
+    last byte (faststart MP4, MKV/WebM and MPEG-TS; containers indexed at
+    the end are decoded once that part arrives). The request returns when
+    the upload is complete.
+
+    Request:
+        - body: video file bytes (Content-Length lets decoding start early)
+        - query args: filename (for the container extension) and the
+          detect_video fields camera_id, sample_rate, min_stride,
+          max_stride, motion_gate
+
+    Response (202):
+        - job_id, status, status_url: as for detect_video
+        - upload: bytes_received, complete, seconds, error
+        - frames_done, detections, time_to_first_detection: progress so far
+    """
+    max_bytes = MAX_VIDEO_UPLOAD_MB * 1024 * 1024
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({"error": f"Video larger than {MAX_VIDEO_UPLOAD_MB}MB"}), 413
+    chunked = request.headers.get("Transfer-Encoding", "").lower() == "chunked"
+    if not request.content_length and not chunked:
+        return jsonify({"error": "Empty request body"}), 400
+    request.max_content_length = max_bytes
+    try:
+        params = parse_video_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job_id = uuid.uuid4().hex
+    suffix = Path(secure_filename(request.args.get("filename", ""))).suffix
+    upload = StreamingUpload(
+        upload_folder / f"{job_id}{suffix}", expected_size=request.content_length
+    )
+    video_jobs.submit(upload.path, params, job_id=job_id, upload=upload)
+    try:
+        upload.receive(request.stream)
+    except Exception as e:
+        print(f"Video upload {job_id} failed: {e}")
     finally:
-        cap.release()
-        db.session.commit()
-        # Clean up safely
-        try:
-            if video_path.exists():
-                video_path.unlink()
-        except Exception:
-            pass
+        video_jobs.finish_upload(job_id)
+    if upload.error is not None:
+        return jsonify({"error": f"Upload failed: {upload.error}", "job_id": job_id}), 400
 
-    return jsonify(
-        {
-            "success": True,
-            "total_frames": frame_count,
-            "processed_frames": processed_frames,
-            "detections": all_detections,
-            "unique_plates": len(set(all_detections)),
-        }
+    job = video_jobs.get(job_id)
+    return (
+        jsonify(
+            {
+                "success": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['id']}",
+                "upload": job["upload"],
+                "frames_done": job["frames_done"],
+                "detections": job["detections"],
+                "time_to_first_detection": job["time_to_first_detection"],
+            }
+        ),
+        202,
     )
 
 
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Get video job status, frames done, detections so far and ETA."""
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Cancel a queued or running video job."""
+    job = video_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/crops/<key>", methods=["GET"])
+def get_crop(key):
+    """Serve a stored plate crop JPEG.
+
+    Keys are content hashes, so responses are immutable and cacheable forever.
+    """
+    data = crop_store.get(key)
+    if data is None:
+        return jsonify({"error": "Crop not found"}), 404
+    response = Response(data, mimetype="image/jpeg")
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def count_detections(query, filtered, mode):
+    """Total rows of a detection list query.
+
+    Args:
+        query: Filtered detection query.
+        filtered: Whether ``query`` has filters.
+        mode: ``exact`` counts every row; ``approx`` uses the planner's row
+            estimate on PostgreSQL for unfiltered lists and otherwise counts at
+            most ``APPROX_COUNT_LIMIT`` rows.
+
+    Returns:
+        (total, exact) tuple.
+    """
+    query = query.order_by(None)
+    if mode == "exact":
+        return query.count(), True
+    if not filtered and db.engine.dialect.name == "postgresql":
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'detections'")
+        ).scalar()
+        # -1/0 until the table is first analyzed
+        if estimate and estimate > 0:
+            return int(estimate), False
+    total = query.with_entities(Detection.id).limit(APPROX_COUNT_LIMIT).count()
+    return total, total < APPROX_COUNT_LIMIT
+
+
 @app.route("/api/detections", methods=["GET"])
 def get_detections():
-    """Get detection history with pagination and filters.
+    """Get detection history, newest first, with cursor pagination and filters.
 
     Query params:
-        - page: page number (default: 1)
+        - cursor: ``next_cursor`` of the previous page (default: first page)
         - per_page: items per page (default: 50)
+        - page: page number; pages by offset instead of cursor (slow for deep pages)
+        - total: ``none``, ``approx`` or ``exact`` (default: none, exact with ``page``)
         - camera_id: filter by camera
-        - date_from: filter by date (ISO format)
-        - date_to: filter by date (ISO format)
+        - plate: filter by plate number (exact match; upper-cased, like stored plates)
+        - date_from: detections recorded at or after this time (ISO format, UTC if naive)
+        - date_to: detections recorded at or before this time (a bare date includes that day)
+        - fields: comma separated fields to return (default: all but plate_image)
     """
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 50, type=int)
+    page = request.args.get("page", type=int)
+    per_page = max(1, request.args.get("per_page", 50, type=int))
+    cursor = request.args.get("cursor")
     camera_id = request.args.get("camera_id")
+    plate = request.args.get("plate", "").strip().upper()
+    try:
+        date_from = parse_datetime(request.args.get("date_from"))
+        date_to = parse_datetime(request.args.get("date_to"), end_of_day=True)
+        fields = parse_fields(request.args.get("fields"), DETECTION_FIELDS, DEFAULT_LIST_FIELDS)
+        total_mode = parse_total_mode(
+            request.args.get("total"), "none" if page is None else "exact"
+        )
+        after_id = int(decode_cursor(cursor)) if cursor else None
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
 
     query = Detection.query
 
     if camera_id:
         query = query.filter_by(camera_id=camera_id)
-
-    # Date filters can be added here
-
-    pagination = query.order_by(Detection.id.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    if plate:
+        query = query.filter_by(plate_number=plate)
+    if date_from:
+        query = query.filter(Detection.created_at >= date_from)
+    if date_to:
+        query = query.filter(Detection.created_at <= date_to)
+
+    filtered = bool(camera_id or plate or date_from or date_to)
+    total, total_exact = (
+        count_detections(query, filtered, total_mode) if total_mode != "none" else (None, None)
     )
 
-    return jsonify(
-        {
-            "detections": [d.to_dict() for d in pagination.items],
-            "total": pagination.total,
-            "page": page,
-            "per_page": per_page,
-            "pages": pagination.pages,
-        }
-    )
+    query = Detection.load_fields(query, fields).order_by(Detection.id.desc())
+    if page is not None:
+        query = query.offset((max(page, 1) - 1) * per_page)
+    elif after_id is not None:
+        query = query.filter(Detection.id < after_id)
+    # One extra row tells whether there is a next page
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    response = {
+        "detections": [d.to_dict(fields) for d in items],
+        "per_page": per_page,
+        "next_cursor": encode_cursor(items[-1].id) if has_more else None,
+    }
+    if page is not None:
+        response["page"] = page
+    if total is not None:
+        response["total"] = total
+        response["total_exact"] = total_exact
+        response["pages"] = (total + per_page - 1) // per_page
+    return jsonify(response)
 
 
 @app.route("/api/detections/<int:detection_id>", methods=["GET"])
@@ -309,29 +911,110 @@ def get_detection(detection_id):
 
 @app.route("/api/detections/<int:detection_id>", methods=["DELETE"])
 def delete_detection(detection_id):
-    """Delete a detection record."""
+    """Delete a detection record.
+
+    Its crop may be shared with other rows, so it is left for the crop sweep.
+    """
     detection = Detection.query.get_or_404(detection_id)
     db.session.delete(detection)
     db.session.commit()
+    plate_index.remove(detection.plate_number)
+    detection_stats.remove(detection.camera_id, detection.created_at)
     return jsonify({"success": True, "message": "Detection deleted"})
 
 
-@app.route("/api/stats", methods=["GET"])
-def get_stats():
-    """Get detection statistics."""
-    total = Detection.query.count()
-    unique_plates = db.session.query(Detection.plate_number).distinct().count()
-    cameras = db.session.query(Detection.camera_id).distinct().all()
+@app.route("/api/plates/search", methods=["GET"])
+def search_plates():
+    """Find plate numbers close to a query, tolerating OCR confusions (0/O, 1/I, 8/B, ...).
+
+    Query params:
+        - q: plate text to look for
+        - max_distance: most character edits after normalization (default: 2, max: 3)
+        - limit: most results (default: 20)
+    """
+    query = request.args.get("q", "")
+    if not normalize_plate(query):
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    max_distance = min(max(request.args.get("max_distance", 2, type=int), 0), 3)
+    limit = max(request.args.get("limit", 20, type=int), 1)
 
     return jsonify(
         {
-            "total_detections": total,
-            "unique_plates": unique_plates,
-            "cameras": [c[0] for c in cameras],
+            "query": query,
+            "normalized": normalize_plate(query),
+            "results": plate_index.search(query, max_distance=max_distance, limit=limit),
+            # False while the index is still loading at startup
+            "complete": plate_index_ready.is_set(),
         }
     )
 
 
+@app.route("/api/stats", methods=["GET"])
+def get_stats():
+    """Get detection statistics.
+
+    Served from counters kept up to date on insert, so the cost does not grow
+    with the table. ``unique_plates`` counts are estimates (about 1% error).
+    """
+    stats = detection_stats.snapshot()
+    # False while detections newer than the last snapshot are still being counted
+    stats["complete"] = stats_ready.is_set()
+    return jsonify(stats)
+
+
+@app.route("/api/cameras", methods=["GET"])
+def get_cameras():
+    """List cameras with their ingest reader status (None when not ingesting)."""
+    status = {reader["camera_id"]: reader for reader in camera_ingest.status()}
+    cameras = []
+    for camera in Camera.query.order_by(Camera.id).all():
+        camera_dict = camera.to_dict()
+        camera_dict["ingest"] = status.get(camera.camera_id)
+        cameras.append(camera_dict)
+    return jsonify({"cameras": cameras})
+
+
+@app.route("/api/cameras", methods=["POST"])
+def save_camera():
+    """Create or update a camera.
+
+    Request (JSON):
+        - camera_id: camera identifier (required)
+        - name: display name (required for new cameras)
+        - rtsp_url, location, is_active, sample_fps: optional
+        - roi: motion gate polygon, [[x, y], ...] in 0..1 coordinates (null: whole frame)
+
+    Ingest readers are started, restarted or stopped to match right away.
+    """
+    data = request.get_json(silent=True) or {}
+    camera_id = data.get("camera_id")
+    if not camera_id:
+        return jsonify({"error": "camera_id is required"}), 400
+
+    try:
+        roi = parse_roi(data.get("roi"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    camera = Camera.query.filter_by(camera_id=camera_id).first()
+    if camera is None:
+        if not data.get("name"):
+            return jsonify({"error": "name is required"}), 400
+        camera = Camera(camera_id=camera_id)
+        db.session.add(camera)
+    for field in ("name", "location", "rtsp_url", "is_active", "sample_fps"):
+        if field in data:
+            setattr(camera, field, data[field])
+    if "roi" in data:
+        camera.roi = json.dumps(roi) if roi else None
+        live_gates.reset(camera_id)
+    db.session.commit()
+
+    if CAMERA_INGEST:
+        threading.Thread(target=camera_ingest.refresh, daemon=True).start()
+    return jsonify(camera.to_dict())
+
+
 @socketio.on("connect")
 def handle_connect():
     """Handle WebSocket connection."""
@@ -339,77 +1022,128 @@ def handle_connect():
     emit("connection_response", {"status": "connected"})
 
 
+@socketio.on("disconnect")
+def handle_disconnect():
+    """Handle WebSocket disconnection.
+
+    Open tracks of the client's cameras are stored unless another client is
+    still streaming the same camera.
+    """
+    streams = live_scheduler.discard(request.sid)
+    streaming = {camera_id for _, camera_id in live_scheduler.streams()}
+    for _, camera_id in streams:
+        if camera_id not in streaming:
+            store_live_tracks(live_trackers.flush(camera_id))
+
+
 @socketio.on("video_frame")
 def handle_video_frame(data):
-    """Process video frame from WebSocket.
+    """Process video frame(s) from WebSocket.
 
     Expected data:
-        - frame: base64 encoded image
+        - frame: JPEG/WebP bytes (binary attachment) or base64 string
+        - frames: optional list of frames, detected as one batch
+        - seq: optional frame sequence number, echoed in the results
         - camera_id: camera identifier
-    """
-    try:
-        # Validate payload
-        frame_b64 = data.get("frame")
-        if not frame_b64:
-            emit("error", {"message": "No frame provided"})
-            return
+        - include_crops: optional, add JPEG plate crops to the results
+        - format: optional, "msgpack" for binary msgpack results (default JSON)
 
-        # Decode frame
-        img_data = base64.b64decode(frame_b64)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    Detections are linked into per-camera plate tracks. OCR runs only for new
+    tracks or better crops, and one Detection row is stored per track once the
+    plate leaves the view. One ``detection_result`` event is emitted per frame.
 
-        # Guard: ensure decode succeeded
-        if img is None:
-            emit("error", {"message": "Invalid frame data"})
+    Frames are scheduled latest-frame-wins per client and camera: while a
+    payload is being processed, newer ones replace the pending payload and the
+    stale frames are dropped (reported as ``dropped`` in the next result).
+    """
+    if not isinstance(data, dict):
+        emit("error", {"message": "No frame provided"})
+        return
+
+    # Only the handler that finds the stream idle processes it
+    key = (request.sid, data.get("camera_id", "live"))
+    if not live_scheduler.submit(key, data):
+        return
+    while True:
+        item = live_scheduler.next(key)
+        if item is None:
+            break
+        data, dropped = item
+        start = time.perf_counter()
+        process_live_frames(data, dropped, live_scheduler.stats(key))
+        live_scheduler.record(key, time.perf_counter() - start)
+
+
+def process_live_frames(data, dropped, stats):
+    """Detect, track and emit results for one scheduled ``video_frame`` payload.
+
+    Args:
+        data: ``video_frame`` payload.
+        dropped: Frames dropped since the previous payload of this stream.
+        stats: ``LiveScheduler.stats`` of the stream, added to each result.
+    """
+    try:
+        # Binary frames (or legacy base64 strings)
+        images, error = parse_frames(data, BATCH_SIZE)
+        if error:
+            emit("error", {"message": error})
             return
 
-        # Detect plates
-        results = detector.detect(img) or []
-
-        # Save to DB and emit results
-        detections = []
-        for result in results:
-            plate_crop = result.get("plate_crop")
-            if plate_crop is None:
+        camera_id = data.get("camera_id", "live")
+        tracker = live_trackers.get(camera_id)
+
+        # Frames where nothing moved skip the model and the tracker
+        if MOTION_GATE:
+            gate = live_gates.get(camera_id)
+            active = [gate.check(image) for image in images]
+        else:
+            active = [True] * len(images)
+
+        # Detect plates and link them to tracks
+        # Batched with frames from other live streams
+        detected = iter(live_broker.detect([im for im, a in zip(images, active) if a]))
+        batch_results = [next(detected) if a else [] for a in active]
+        now = time.time()
+        ocr_requests, finished = [], []
+        for results, is_active in zip(batch_results, active):
+            if not is_active:
                 continue
+            frame_requests, frame_finished = tracker.update(results, now)
+            ocr_requests.extend(frame_requests)
+            finished.extend((camera_id, track) for track in frame_finished)
+        tracker.apply_ocr(
+            ocr_requests, detector.run_ocr_batch([r["plate_crop"] for _, r in ocr_requests])
+        )
 
-            ok, buffer = cv2.imencode(".jpg", plate_crop)
-            if not ok:
-                continue
-            plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
-
-            detection = Detection()
-            detection.plate_number = result.get("plate_text")
-            detection.confidence = float(result.get("confidence", 0.0))
-            detection.camera_id = data.get("camera_id", "live")
-            bbox = result.get("bbox", [0, 0, 0, 0])
-            try:
-                detection.bbox_x1 = float(bbox[0])
-                detection.bbox_y1 = float(bbox[1])
-                detection.bbox_x2 = float(bbox[2])
-                detection.bbox_y2 = float(bbox[3])
-            except Exception:
-                detection.bbox_x1 = detection.bbox_y1 = detection.bbox_x2 = detection.bbox_y2 = 0.0
-            detection.plate_image = plate_img_b64
-
-            db.session.add(detection)
-
-            detections.append(
-                {
+        # Queue one row per finished track, including idle tracks of other cameras
+        store_live_tracks(finished + live_trackers.expire(now))
+
+        # Emit results back to client
+        # Crops are only JPEG-encoded when the client asks for them
+        include_crops = bool(data.get("include_crops"))
+        fmt = result_format(data)
+        seq = data.get("seq")
+        for i, results in enumerate(batch_results):
+            detections = []
+            for result in results:
+                detection = {
                     "plate_number": result.get("plate_text"),
                     "confidence": float(result.get("confidence", 0.0)),
-                    "bbox": bbox,
+                    "bbox": result.get("bbox", [0, 0, 0, 0]),
+                    "track_id": result.get("track_id"),
                 }
-            )
-
-        db.session.commit()
-
-        # Emit results back to client
-        emit(
-            "detection_result",
-            {"detections": detections, "timestamp": datetime.utcnow().isoformat()},
-        )
+                if include_crops:
+                    detection["plate_image"] = crop_payload(result["plate_crop"], fmt)
+                detections.append(detection)
+            payload = {"detections": detections, "timestamp": datetime.utcnow().isoformat()}
+            if isinstance(seq, int):
+                # Frames of a batch are numbered seq, seq + 1, ...
+                payload["seq"] = seq + i
+            # Frames dropped before this one, and the stream's sustainable rate
+            payload["dropped"] = dropped if i == 0 else 0
+            payload["gated"] = not active[i]
+            payload.update(stats)
+            emit("detection_result", encode_result(payload, fmt))
 
     except Exception as e:
         emit("error", {"message": str(e)})
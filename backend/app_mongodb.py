@@ -3,7 +3,10 @@ Flask backend for real-time number plate detection system with MongoDB.
 
 Endpoints:
 - POST /api/detect - Upload image/frame for detection
-- POST /api/detect/video - Process video file
+- POST /api/detect/video - Queue video file for background processing
+- POST /api/detect/video/stream - Queue a raw video body, decoded while it uploads
+- GET /api/jobs/<id> - Get video job progress
+- POST /api/jobs/<id>/cancel - Cancel video job
 - GET /api/detections - Retrieve detection history
 - GET /api/detections/<id> - Get specific detection
 - DELETE /api/detections/<id> - Delete detection
@@ -11,18 +14,24 @@ Endpoints:
 - WebSocket /ws/live - Real-time video stream processing
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 from flask_pymongo import PyMongo
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 import os
 import cv2
 import numpy as np
-import base64
+import threading
+import time
+import atexit
+import uuid
 from pathlib import Path
 import sys
 
@@ -32,8 +41,42 @@ load_dotenv()
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from backend.models_mongodb import DetectionMongo
+from backend.models_mongodb import (
+    CameraMongo,
+    DetectionMongo,
+    DETECTION_FIELDS,
+    DEFAULT_LIST_FIELDS,
+)
+from backend.fields import parse_fields
+from backend.pagination import (
+    APPROX_COUNT_LIMIT,
+    decode_cursor,
+    encode_cursor,
+    parse_datetime,
+    parse_total_mode,
+)
 from backend.detector import PlateDetector
+from backend.pipeline import VideoPipeline
+from backend.decoder import can_stream, open_decoder
+from backend.jobs import VideoJobManager
+from backend.upload import StreamingUpload
+from backend.tracker import TrackerRegistry
+from backend.broker import InferenceBroker
+from backend.ingest import CameraIngestService
+from backend.writer import DetectionWriter, PartialWriteError
+from backend.crop_store import create_crop_store, sweep_crops
+from backend.plate_index import PlateIndex, normalize_plate
+from backend.stats import DetectionStats
+from backend.gate import GateRegistry, MotionGate, parse_roi
+from backend.sampler import AdaptiveSampler, parse_sample_rate
+from backend.segments import SegmentedVideoProcessor
+from backend.live import (
+    LiveScheduler,
+    crop_payload,
+    encode_result,
+    parse_frames,
+    result_format,
+)
 
 # ------------------------------------------------------
 # Flask & MongoDB setup
@@ -54,18 +97,462 @@ CORS(app, origins=["http://localhost:3000", "http://localhost:5173"])
 mongo = PyMongo(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+
+# ------------------------------------------------------
+# Indexes
+# ------------------------------------------------------
+def ensure_indexes():
+    """Indexes for history queries by camera or plate over a time range, and crop lookups."""
+    assert mongo.db is not None, "Database not initialized"
+    mongo.db.detections.create_index([("camera_id", 1), ("created_at", -1)])
+    mongo.db.detections.create_index([("plate_number", 1), ("created_at", -1)])
+    # Crop sweep lookups; hashed, as legacy documents hold whole base64 crops here
+    mongo.db.detections.create_index([("plate_image", "hashed")])
+
+
+try:
+    ensure_indexes()
+except Exception as e:
+    print(f"Warning: could not create MongoDB indexes: {e}")
+
 # ------------------------------------------------------
 # YOLOv7 detector initialization
 # ------------------------------------------------------
-detector = PlateDetector(
+DETECTOR_CONFIG = dict(
     yolov7_weights=os.getenv("MODEL_WEIGHTS", "models/yolov7.pt"),
     device=os.getenv("DEVICE", "cpu"),
     conf_threshold=float(os.getenv("CONF_THRESHOLD", "0.25")),
+    # 'torch' or 'onnx'; defaults to 'onnx' for .onnx weights
+    backend=os.getenv("DETECTOR_BACKEND") or None,
+    # 'int8' loads the quantized <weights>.int8.onnx from scripts/quantize_model.py
+    precision=os.getenv("MODEL_PRECISION", "fp32"),
 )
+# Parallel video jobs: split each video into keyframe-aligned segments of at most
+# VIDEO_SEGMENT_SECONDS and process them on VIDEO_PROCESSES worker processes, each with
+# its own detector (0: one in-process pipeline per job). VIDEO_PROCESS_THREADS is the
+# inference threads per worker (0: cores / VIDEO_PROCESSES).
+VIDEO_PROCESSES = int(os.getenv("VIDEO_PROCESSES", "0"))
+VIDEO_PROCESS_THREADS = int(os.getenv("VIDEO_PROCESS_THREADS", "0"))
+VIDEO_SEGMENT_SECONDS = float(os.getenv("VIDEO_SEGMENT_SECONDS", "300"))
+# Workers are forked here: the inference libraries are already imported, but no model
+# is loaded and no thread pool is running yet; the Mongo client's monitor threads are
+# not copied into the workers, which never use it. Under the debug reloader the watching
+# parent never serves requests, so only the reloaded child starts a pool.
+segment_processor = None
+RELOADER_PARENT = __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+if VIDEO_PROCESSES > 1 and not RELOADER_PARENT:
+    try:
+        segment_processor = SegmentedVideoProcessor(
+            VIDEO_PROCESSES,
+            DETECTOR_CONFIG,
+            threads=VIDEO_PROCESS_THREADS,
+            segment_seconds=VIDEO_SEGMENT_SECONDS,
+        )
+        atexit.register(segment_processor.close)
+    except ValueError as e:
+        print(f"Warning: {e}; video jobs run in-process")
+detector = PlateDetector(**DETECTOR_CONFIG)
+# Frames per forward pass on the video and WebSocket paths
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "8"))
+# Video pipeline: OCR thread pool size and inter-stage queue capacity
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+# Background video job workers
+VIDEO_WORKERS = int(os.getenv("VIDEO_WORKERS", "1"))
+# Finished video jobs (state files and uploads) are removed after VIDEO_JOB_RETENTION_HOURS,
+# keeping at most VIDEO_JOB_MAX_FINISHED of them
+VIDEO_JOB_RETENTION_HOURS = float(os.getenv("VIDEO_JOB_RETENTION_HOURS", "24"))
+VIDEO_JOB_MAX_FINISHED = int(os.getenv("VIDEO_JOB_MAX_FINISHED", "1000"))
+# Cap on live frames processed per second per stream (0: as fast as inference allows)
+LIVE_MAX_FPS = float(os.getenv("LIVE_MAX_FPS", "0"))
+# Live frames from all streams are micro-batched: up to LIVE_MAX_BATCH frames per
+# forward pass, each waiting at most LIVE_MAX_WAIT_MS for others to join
+LIVE_MAX_BATCH = int(os.getenv("LIVE_MAX_BATCH", str(BATCH_SIZE)))
+LIVE_MAX_WAIT_MS = float(os.getenv("LIVE_MAX_WAIT_MS", "5"))
+# Seconds between sweeps that store the tracks of live streams that stopped sending
+LIVE_EXPIRE_SECONDS = float(os.getenv("LIVE_EXPIRE_SECONDS", "1"))
+# Server-side ingestion of active cameras' rtsp_url streams. Off by default: with several
+# app processes (workers or replicas) enable it in exactly one, or every camera is read
+# and stored once per process
+CAMERA_INGEST = os.getenv("CAMERA_INGEST", "0") == "1"
+# Detection rate for cameras without their own sample_fps, and camera list reload interval
+INGEST_SAMPLE_FPS = float(os.getenv("INGEST_SAMPLE_FPS", "2"))
+INGEST_REFRESH_SECONDS = float(os.getenv("INGEST_REFRESH_SECONDS", "30"))
+# Detection inserts: 'async' buffers them and writes up to DB_WRITE_BATCH_SIZE documents
+# per insert_many, at least every DB_WRITE_INTERVAL_MS; 'sync' inserts on every write
+DB_WRITE_MODE = os.getenv("DB_WRITE_MODE", "async")
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+DB_WRITE_INTERVAL_MS = float(os.getenv("DB_WRITE_INTERVAL_MS", "1000"))
+# Plate crop JPEGs are stored by content hash; documents keep only the key
+CROP_STORE = os.getenv("CROP_STORE", "local")
+CROP_STORE_DIR = os.getenv("CROP_STORE_DIR", "uploads/crops")
+# Crops no document references (e.g. of deleted detections) are deleted every
+# CROP_SWEEP_HOURS once over an hour old; 0 keeps them
+CROP_SWEEP_HOURS = float(os.getenv("CROP_SWEEP_HOURS", "24"))
+# Motion gating: skip the detector on frames where nothing moved inside the camera's
+# ROI (live streams, camera ingest, and video jobs unless the upload says otherwise).
+# MOTION_THRESHOLD is the fraction of ROI pixels that must change.
+MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.005"))
+# Video job decoding: backend (auto uses PyAV when installed, else OpenCV), downscale
+# frames wider than DECODE_MAX_WIDTH (0: full resolution), seek instead of decoding
+# across gaps of DECODE_SEEK_FRAMES or more, OpenCV hardware decoding, PyAV threads
+VIDEO_DECODER = os.getenv("VIDEO_DECODER", "auto")
+DECODE_MAX_WIDTH = int(os.getenv("DECODE_MAX_WIDTH", "0"))
+DECODE_SEEK_FRAMES = int(os.getenv("DECODE_SEEK_FRAMES", "300"))
+DECODE_HW_ACCEL = os.getenv("DECODE_HW_ACCEL", "0") == "1"
+DECODE_THREADS = int(os.getenv("DECODE_THREADS", "0"))
+# Largest raw video body accepted by /api/detect/video/stream (MB); the multipart
+# endpoints keep the 50MB MAX_CONTENT_LENGTH
+MAX_VIDEO_UPLOAD_MB = int(os.getenv("MAX_VIDEO_UPLOAD_MB", "2048"))
+# Video jobs sample frames adaptively by default (sample_rate=auto): every
+# SAMPLE_MIN_STRIDE-th frame while plates are in view, backing off to every
+# SAMPLE_MAX_STRIDE-th on idle stretches. ADAPTIVE_SAMPLING=0 makes the default
+# a fixed stride of 5.
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "1") == "1"
+SAMPLE_MIN_STRIDE = int(os.getenv("SAMPLE_MIN_STRIDE", "1"))
+SAMPLE_MAX_STRIDE = int(os.getenv("SAMPLE_MAX_STRIDE", "30"))
+# /api/stats is kept up to date on insert and snapshotted to STATS_FILE every
+# STATS_SAVE_SECONDS; hourly rollups cover the last STATS_HOURS hours
+STATS_FILE = os.getenv("STATS_FILE", "uploads/stats.json")
+STATS_SAVE_SECONDS = float(os.getenv("STATS_SAVE_SECONDS", "300"))
+STATS_HOURS = int(os.getenv("STATS_HOURS", "168"))
 
 # Ensure upload folder exists
 upload_dir = Path(app.config["UPLOAD_FOLDER"])
 upload_dir.mkdir(parents=True, exist_ok=True)
+crop_store = create_crop_store(CROP_STORE, root=CROP_STORE_DIR)
+
+
+# ------------------------------------------------------
+# Batched detection writes
+# ------------------------------------------------------
+# Fuzzy plate search over every stored plate text
+plate_index = PlateIndex()
+plate_index_ready = threading.Event()
+
+
+def load_plate_index():
+    assert mongo.db is not None, "Database not initialized"
+    try:
+        counts = mongo.db.detections.aggregate(
+            [{"$group": {"_id": "$plate_number", "count": {"$sum": 1}}}], allowDiskUse=True
+        )
+        for doc in counts:
+            plate_index.add(doc["_id"], doc["count"])
+    except Exception as e:
+        print(f"Warning: could not load plate index: {e}")
+    plate_index_ready.set()
+
+
+threading.Thread(target=load_plate_index, name="plate-index", daemon=True).start()
+
+
+# Detection counts and distinct plate estimates, updated on every insert
+detection_stats = DetectionStats(hours=STATS_HOURS)
+detection_stats.load(STATS_FILE)
+stats_ready = threading.Event()
+# Lowest ObjectId this process can make
+STATS_STARTED = ObjectId.from_datetime(datetime.now(timezone.utc))
+
+
+def run_detection_stats():
+    # Count documents newer than the snapshot's watermark (up to the newest at
+    # start), then save periodically. Documents written meanwhile are held back
+    # by DetectionStats.add_batch and counted at the end unless the catch-up
+    # counted them; ObjectIds are made by clients, so that is decided by id
+    # membership, tracked for ids made since this process started
+    assert mongo.db is not None, "Database not initialized"
+    counted = set()
+    try:
+        newest = mongo.db.detections.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        if newest is not None:
+            id_range = {"$lte": newest["_id"]}
+            if detection_stats.watermark:
+                id_range["$gt"] = ObjectId(detection_stats.watermark)
+            docs = mongo.db.detections.find(
+                {"_id": id_range}, {"plate_number": 1, "camera_id": 1, "created_at": 1}
+            ).sort("_id", 1)
+            for doc in docs:
+                detection_stats.add(
+                    doc.get("plate_number"),
+                    doc.get("camera_id"),
+                    doc.get("created_at"),
+                    id=str(doc["_id"]),
+                )
+                if doc["_id"] >= STATS_STARTED:
+                    counted.add(str(doc["_id"]))
+    except Exception as e:
+        print(f"Warning: could not count detections for stats: {e}")
+        detection_stats.finish_catch_up(counted=counted)
+        return
+    detection_stats.finish_catch_up(counted=counted)
+    stats_ready.set()
+    while True:
+        time.sleep(STATS_SAVE_SECONDS)
+        save_detection_stats()
+
+
+def save_detection_stats():
+    # An incomplete catch-up must not be saved: its watermark may cover
+    # documents it has not counted
+    if not stats_ready.is_set():
+        return
+    try:
+        detection_stats.save(STATS_FILE)
+    except Exception as e:
+        print(f"Warning: could not save stats: {e}")
+
+
+threading.Thread(target=run_detection_stats, name="detection-stats", daemon=True).start()
+atexit.register(save_detection_stats)
+
+
+def write_detections(docs):
+    assert mongo.db is not None, "Database not initialized"
+    failed = set()
+    error = None
+    try:
+        mongo.db.detections.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # A retried batch may be partly written already: its duplicate _ids are
+        # fine. Unordered inserts go on past other errors, so every document
+        # without one was stored (under a write concern error too, unconfirmed)
+        failed = {
+            err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000
+        }
+        if failed or e.details.get("writeConcernErrors"):
+            error = e
+    written = [i for i in range(len(docs)) if i not in failed]
+    plate_index.add_many(docs[i]["plate_number"] for i in written)
+    # insert_many set each document's _id
+    for i in written:
+        doc = docs[i]
+        detection_stats.add_batch(
+            [(doc["plate_number"], doc["camera_id"], doc.get("created_at"))], id=str(doc["_id"])
+        )
+    if error is not None:
+        raise PartialWriteError(written, error)
+
+
+# Write-behind batching of detection inserts from every path
+detection_writer = DetectionWriter(
+    write_detections,
+    batch_size=DB_WRITE_BATCH_SIZE,
+    flush_interval=DB_WRITE_INTERVAL_MS / 1000.0,
+    mode=DB_WRITE_MODE,
+)
+
+
+def store_detections(records, camera_id, wait=False):
+    docs = []
+    for record in records:
+        crop_key = crop_store.put_crop(record["plate_crop"])
+        if crop_key is not None:
+            docs.append(DetectionMongo.from_result(record, camera_id, crop_key))
+    detection_writer.add(docs, wait=wait)
+
+
+# ------------------------------------------------------
+# Background video jobs
+# ------------------------------------------------------
+
+
+def camera_roi(camera_id):
+    doc = mongo.db.cameras.find_one({"camera_id": camera_id}, {"roi": 1})
+    try:
+        return parse_roi(doc.get("roi") if doc else None)
+    except ValueError as e:
+        print(f"Warning: ignoring roi of camera {camera_id}: {e}")
+        return None
+
+
+def run_video_job(job, on_progress, cancel):
+    params = job["params"]
+    # Gate and sampler settings; each pipeline (or segment) builds its own
+    gate = None
+    if params.get("motion_gate", False):
+        gate = {"threshold": MOTION_THRESHOLD, "roi": camera_roi(params["camera_id"])}
+    sampler = None
+    if params["sample_rate"] == "auto":
+        sampler = {
+            "min_stride": params.get("min_stride", SAMPLE_MIN_STRIDE),
+            "max_stride": params.get("max_stride", SAMPLE_MAX_STRIDE),
+        }
+    pipeline_options = {
+        "batch_size": BATCH_SIZE,
+        "ocr_workers": OCR_WORKERS,
+        "queue_size": PIPELINE_QUEUE_SIZE,
+    }
+    decoder_options = {
+        "backend": VIDEO_DECODER,
+        "max_width": DECODE_MAX_WIDTH,
+        "seek_frames": DECODE_SEEK_FRAMES,
+        "hw_accel": DECODE_HW_ACCEL,
+        "threads": DECODE_THREADS,
+    }
+    run_options = dict(
+        start_frame=job["committed_frame"] + 1,
+        on_progress=on_progress,
+        cancel=cancel,
+        base_timestamp=datetime.fromisoformat(job["created_at"])
+        .replace(tzinfo=timezone.utc)
+        .timestamp(),
+    )
+
+    def sink(records):
+        # Documents must be written before the job checkpoints past them
+        store_detections(records, params["camera_id"], wait=True)
+
+    # A streaming upload may still be arriving: decode it as it comes in if the
+    # decoder reads file objects, otherwise wait for the last byte
+    upload = job.get("_upload")
+    stream = None
+    if upload is not None and not upload.complete:
+        if can_stream(VIDEO_DECODER):
+            stream = upload.open(cancel)
+        else:
+            upload.wait(cancel)
+    if stream is None and upload is not None and upload.error is not None:
+        raise RuntimeError(f"Upload failed: {upload.error}")
+
+    if (
+        segment_processor is not None
+        and not segment_processor.broken
+        and stream is None
+        and params.get("parallel", True)
+    ):
+        # Keyframe-aligned segments on the worker processes
+        return segment_processor.run(
+            job["video_path"],
+            sink,
+            1 if sampler is not None else params["sample_rate"],
+            gate=gate,
+            sampler=sampler,
+            pipeline_options=pipeline_options,
+            decoder_options=decoder_options,
+            **run_options,
+        )
+
+    # Decode, detect, OCR and insert run as overlapping pipeline stages
+    pipeline = VideoPipeline(
+        detector,
+        sink,
+        decoder_factory=partial(open_decoder, **decoder_options),
+        **pipeline_options,
+    )
+    try:
+        result = pipeline.run(
+            stream or job["video_path"],
+            1 if sampler is not None else params["sample_rate"],
+            gate=MotionGate(**gate) if gate is not None else None,
+            sampler=AdaptiveSampler(**sampler) if sampler is not None else None,
+            **run_options,
+        )
+    finally:
+        if stream is not None:
+            stream.close()
+    if upload is not None and upload.error is not None:
+        raise RuntimeError(f"Upload failed: {upload.error}")
+    return result
+
+
+# Per-camera plate trackers for the live WebSocket path
+live_trackers = TrackerRegistry()
+# Per-camera motion gates for the live WebSocket path
+live_gates = GateRegistry(camera_roi, threshold=MOTION_THRESHOLD)
+# Latest-frame-wins scheduling per (client, camera) live stream
+live_scheduler = LiveScheduler(max_fps=LIVE_MAX_FPS)
+# Shared forward passes across live streams
+live_broker = InferenceBroker(
+    partial(detector.detect_batch, ocr=False),
+    max_batch_size=LIVE_MAX_BATCH,
+    max_wait_ms=LIVE_MAX_WAIT_MS,
+)
+
+
+def store_live_tracks(tracks, wait=False):
+    # (camera_id, track) pairs -> one document per track
+    records = {}
+    for camera_id, track in tracks:
+        records.setdefault(camera_id, []).append(track.to_record())
+    for camera_id, camera_records in records.items():
+        store_detections(camera_records, camera_id, wait=wait)
+
+
+def referenced_crops(keys):
+    assert mongo.db is not None, "Database not initialized"
+    return set(mongo.db.detections.distinct("plate_image", {"plate_image": {"$in": keys}}))
+
+
+def sweep_unreferenced_crops():
+    # Delete crops no detection references, every CROP_SWEEP_HOURS
+    while True:
+        time.sleep(CROP_SWEEP_HOURS * 3600)
+        try:
+            deleted = sweep_crops(crop_store, referenced_crops)
+        except Exception as e:
+            print(f"Warning: crop sweep failed: {e}")
+            continue
+        if deleted:
+            print(f"Deleted {deleted} unreferenced crops")
+
+
+if CROP_SWEEP_HOURS > 0:
+    threading.Thread(target=sweep_unreferenced_crops, name="crop-sweep", daemon=True).start()
+
+
+def expire_live_tracks():
+    # Tracks of live streams that went quiet are stored even when no frame arrives
+    while True:
+        time.sleep(LIVE_EXPIRE_SECONDS)
+        try:
+            store_live_tracks(live_trackers.expire(time.time()))
+        except Exception as e:
+            print(f"Warning: could not store live tracks: {e}")
+
+
+def flush_live_tracks():
+    try:
+        store_live_tracks(live_trackers.flush(), wait=True)
+    except Exception as e:
+        print(f"Warning: could not store live tracks: {e}")
+
+
+threading.Thread(target=expire_live_tracks, name="live-expiry", daemon=True).start()
+# Registered after the detection writer, so it runs before the writer closes
+atexit.register(flush_live_tracks)
+
+# Resumes jobs left unfinished by a restart
+video_jobs = VideoJobManager(
+    upload_dir / "jobs",
+    run_video_job,
+    workers=VIDEO_WORKERS,
+    retention_seconds=VIDEO_JOB_RETENTION_HOURS * 3600,
+    max_finished=VIDEO_JOB_MAX_FINISHED,
+)
+video_jobs.start()
+
+
+def load_cameras():
+    assert mongo.db is not None, "Database not initialized"
+    return [CameraMongo.to_dict(doc) for doc in mongo.db.cameras.find({"is_active": True})]
+
+
+# One RTSP reader per active camera; detection is batched with the live streams
+camera_ingest = CameraIngestService(
+    load_cameras,
+    live_broker.detect,
+    detector.run_ocr_batch,
+    store_detections,
+    default_sample_fps=INGEST_SAMPLE_FPS,
+    refresh_interval=INGEST_REFRESH_SECONDS,
+    gate_factory=(
+        (lambda roi: MotionGate(threshold=MOTION_THRESHOLD, roi=roi)) if MOTION_GATE else None
+    ),
+)
+if CAMERA_INGEST:
+    camera_ingest.start()
 
 
 # ------------------------------------------------------
@@ -84,6 +571,15 @@ def health_check():
         {
             "status": "healthy",
             "model_loaded": getattr(detector, "model", None) is not None,
+            "live_batching": live_broker.stats(),
+            "detection_writer": detection_writer.stats(),
+            "live_motion_gates": live_gates.stats() if MOTION_GATE else None,
+            # Worker processes for parallel video jobs (0: in-process)
+            "video_processes": (
+                segment_processor.processes
+                if segment_processor is not None and not segment_processor.broken
+                else 0
+            ),
             "database": db_status,
             "timestamp": datetime.utcnow().isoformat(),
         }
@@ -111,6 +607,7 @@ def detect_plate():
         return jsonify({"error": "Invalid image format"}), 400
 
     results = detector.detect(img) or []
+    docs = []
     detection_records = []
 
     for result in results:
@@ -118,10 +615,10 @@ def detect_plate():
         if plate_crop is None:
             continue
 
-        ok, buffer = cv2.imencode(".jpg", plate_crop)
-        if not ok:
+        # Save cropped plate image to the crop store; the document keeps its key
+        crop_key = crop_store.put_crop(plate_crop)
+        if crop_key is None:
             continue
-        plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
 
         plate_text = result.get("plate_text", "UNKNOWN")
         detection_doc = DetectionMongo.create(
@@ -129,14 +626,14 @@ def detect_plate():
             confidence=float(result.get("confidence", 0.0)),
             camera_id=camera_id,
             bbox=result.get("bbox", [0, 0, 0, 0]),
-            plate_image=plate_img_b64,
+            plate_image=crop_key,
         )
-
-        assert mongo.db is not None, "Database not initialized"
-        inserted = mongo.db.detections.insert_one(detection_doc)
+        # Ids are assigned here so every plate can go into one insert_many
+        detection_doc["_id"] = ObjectId()
+        docs.append(detection_doc)
         detection_records.append(
             {
-                "id": str(inserted.inserted_id),
+                "id": str(detection_doc["_id"]),
                 "plate_number": plate_text,
                 "confidence": float(result.get("confidence", 0.0)),
                 "bbox": result.get("bbox", [0, 0, 0, 0]),
@@ -144,6 +641,9 @@ def detect_plate():
             }
         )
 
+    # Written before responding, so the returned ids can be fetched right away
+    detection_writer.add(docs, wait=True)
+
     return jsonify(
         {
             "success": True,
@@ -157,109 +657,209 @@ def detect_plate():
 # ------------------------------------------------------
 # Video Detection
 # ------------------------------------------------------
+# Form fields (or query args) -> video job params; raises ValueError
+def parse_video_params(values):
+    return {
+        "camera_id": values.get("camera_id", "default"),
+        "sample_rate": parse_sample_rate(
+            values.get("sample_rate", "auto" if ADAPTIVE_SAMPLING else "5")
+        ),
+        "min_stride": int(values.get("min_stride", SAMPLE_MIN_STRIDE)),
+        "max_stride": int(values.get("max_stride", SAMPLE_MAX_STRIDE)),
+        "motion_gate": values.get("motion_gate", "1" if MOTION_GATE else "0") == "1",
+        "parallel": values.get("parallel", "1") == "1",
+    }
+
+
 @app.route("/api/detect/video", methods=["POST"])
 def detect_video():
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
     file = request.files["file"]
-    camera_id = request.form.get("camera_id", "default")
-    sample_rate = int(request.form.get("sample_rate", 5))
+    try:
+        params = parse_video_params(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     if not file or not file.filename:
         return jsonify({"error": "Empty filename"}), 400
 
-    filename = secure_filename(file.filename)
-    video_path = upload_dir / filename
+    # Unique name per upload; the job deletes it when finished
+    job_id = uuid.uuid4().hex
+    video_path = upload_dir / f"{job_id}{Path(secure_filename(file.filename)).suffix}"
     file.save(str(video_path))
 
-    cap = cv2.VideoCapture(str(video_path))
-    frame_count = processed_frames = 0
-    all_detections: list[str] = []
+    job = video_jobs.submit(video_path, params, job_id=job_id)
+    return (
+        jsonify(
+            {
+                "success": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['id']}",
+            }
+        ),
+        202,
+    )
+
 
+# Raw video body, decoded while it is still arriving; returns once it is all in
+@app.route("/api/detect/video/stream", methods=["POST", "PUT"])
+def detect_video_stream():
+    max_bytes = MAX_VIDEO_UPLOAD_MB * 1024 * 1024
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({"error": f"Video larger than {MAX_VIDEO_UPLOAD_MB}MB"}), 413
+    chunked = request.headers.get("Transfer-Encoding", "").lower() == "chunked"
+    if not request.content_length and not chunked:
+        return jsonify({"error": "Empty request body"}), 400
+    request.max_content_length = max_bytes
     try:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if frame is None:
-                frame_count += 1
-                continue
+        params = parse_video_params(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-            if frame_count % sample_rate == 0:
-                results = detector.detect(frame) or []
-                for result in results:
-                    plate_crop = result.get("plate_crop")
-                    if plate_crop is None:
-                        continue
-
-                    ok, buffer = cv2.imencode(".jpg", plate_crop)
-                    if not ok:
-                        continue
-                    plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
-
-                    plate_text = result.get("plate_text", "UNKNOWN")
-                    detection_doc = DetectionMongo.create(
-                        plate_number=plate_text,
-                        confidence=float(result.get("confidence", 0.0)),
-                        camera_id=camera_id,
-                        bbox=result.get("bbox", [0, 0, 0, 0]),
-                        plate_image=plate_img_b64,
-                    )
-                    assert mongo.db is not None, "Database not initialized"
-                    mongo.db.detections.insert_one(detection_doc)
-                    if plate_text:
-                        all_detections.append(plate_text)
-                processed_frames += 1
-            frame_count += 1
+    job_id = uuid.uuid4().hex
+    suffix = Path(secure_filename(request.args.get("filename", ""))).suffix
+    # Content-Length lets the demuxer learn the file size before the upload ends
+    upload = StreamingUpload(upload_dir / f"{job_id}{suffix}", expected_size=request.content_length)
+    video_jobs.submit(upload.path, params, job_id=job_id, upload=upload)
+    try:
+        upload.receive(request.stream)
+    except Exception as e:
+        print(f"Video upload {job_id} failed: {e}")
     finally:
-        cap.release()
-        try:
-            if video_path.exists():
-                video_path.unlink()
-        except Exception:
-            pass
+        video_jobs.finish_upload(job_id)
+    if upload.error is not None:
+        return jsonify({"error": f"Upload failed: {upload.error}", "job_id": job_id}), 400
 
-    return jsonify(
-        {
-            "success": True,
-            "total_frames": frame_count,
-            "processed_frames": processed_frames,
-            "detections": all_detections,
-            "unique_plates": len(set(all_detections)),
-        }
+    job = video_jobs.get(job_id)
+    return (
+        jsonify(
+            {
+                "success": True,
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/api/jobs/{job['id']}",
+                "upload": job["upload"],
+                "frames_done": job["frames_done"],
+                "detections": job["detections"],
+                "time_to_first_detection": job["time_to_first_detection"],
+            }
+        ),
+        202,
     )
 
 
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id: str):
+    job = video_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+# ------------------------------------------------------
+# Plate Crops
+# ------------------------------------------------------
+@app.route("/api/crops/<key>", methods=["GET"])
+def get_crop(key):
+    # Keys are content hashes: responses are immutable and cacheable forever
+    data = crop_store.get(key)
+    if data is None:
+        return jsonify({"error": "Crop not found"}), 404
+    response = Response(data, mimetype="image/jpeg")
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
 # ------------------------------------------------------
 # Detection History & CRUD
 # ------------------------------------------------------
+def count_detections(query, mode):
+    """(total, exact) for a detection list filter; ``approx`` uses collection
+    metadata when unfiltered and counts at most APPROX_COUNT_LIMIT otherwise."""
+    assert mongo.db is not None, "Database not initialized"
+    if mode == "exact":
+        return mongo.db.detections.count_documents(query), True
+    if not query:
+        return mongo.db.detections.estimated_document_count(), False
+    total = mongo.db.detections.count_documents(query, limit=APPROX_COUNT_LIMIT)
+    return total, total < APPROX_COUNT_LIMIT
+
+
 @app.route("/api/detections", methods=["GET"])
 def get_detections():
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 50, type=int)
+    # Pages on _id with an opaque cursor; `page` keeps the old offset paging.
+    # Filters: camera_id, plate, date_from/date_to (ISO, on created_at)
+    page = request.args.get("page", type=int)
+    per_page = max(1, request.args.get("per_page", 50, type=int))
+    cursor = request.args.get("cursor")
     camera_id = request.args.get("camera_id")
+    plate = request.args.get("plate", "").strip().upper()
+    try:
+        date_from = parse_datetime(request.args.get("date_from"))
+        date_to = parse_datetime(request.args.get("date_to"), end_of_day=True)
+        fields = parse_fields(request.args.get("fields"), DETECTION_FIELDS, DEFAULT_LIST_FIELDS)
+        total_mode = parse_total_mode(
+            request.args.get("total"), "none" if page is None else "exact"
+        )
+        after_id = ObjectId(decode_cursor(cursor)) if cursor else None
+    except (ValueError, TypeError, InvalidId) as e:
+        return jsonify({"error": str(e)}), 400
 
     query = {}
     if camera_id:
         query["camera_id"] = camera_id
+    if plate:
+        query["plate_number"] = plate
+    if date_from or date_to:
+        query["created_at"] = {}
+        if date_from:
+            query["created_at"]["$gte"] = date_from
+        if date_to:
+            query["created_at"]["$lte"] = date_to
 
     assert mongo.db is not None, "Database not initialized"
-    total = mongo.db.detections.count_documents(query)
-    skip = (page - 1) * per_page
-    cursor = mongo.db.detections.find(query).sort("_id", -1).skip(skip).limit(per_page)
-
-    detections = [DetectionMongo.to_dict(doc) for doc in cursor]
-    return jsonify(
-        {
-            "detections": detections,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": (total + per_page - 1) // per_page,
-        }
+    total, total_exact = (
+        count_detections(query, total_mode) if total_mode != "none" else (None, None)
     )
 
+    find_query = dict(query)
+    if page is None and after_id is not None:
+        find_query["_id"] = {"$lt": after_id}
+    docs = mongo.db.detections.find(find_query, DetectionMongo.projection(fields)).sort("_id", -1)
+    if page is not None:
+        docs = docs.skip((max(page, 1) - 1) * per_page)
+    # One extra document tells whether there is a next page
+    docs = list(docs.limit(per_page + 1))
+    has_more = len(docs) > per_page
+    docs = docs[:per_page]
+
+    response = {
+        "detections": [DetectionMongo.to_dict(doc, fields) for doc in docs],
+        "per_page": per_page,
+        "next_cursor": encode_cursor(str(docs[-1]["_id"])) if has_more else None,
+    }
+    if page is not None:
+        response["page"] = page
+    if total is not None:
+        response["total"] = total
+        response["total_exact"] = total_exact
+        response["pages"] = (total + per_page - 1) // per_page
+    return jsonify(response)
+
 
 @app.route("/api/detections/<detection_id>", methods=["GET"])
 def get_detection(detection_id: str):
@@ -277,33 +877,97 @@ def get_detection(detection_id: str):
 def delete_detection(detection_id: str):
     try:
         assert mongo.db is not None, "Database not initialized"
-        result = mongo.db.detections.delete_one({"_id": ObjectId(detection_id)})
-        if result.deleted_count == 0:
+        doc = mongo.db.detections.find_one_and_delete(
+            {"_id": ObjectId(detection_id)},
+            projection={"plate_number": 1, "camera_id": 1, "created_at": 1},
+        )
+        if doc is None:
             return jsonify({"error": "Detection not found"}), 404
+        plate_index.remove(doc.get("plate_number"))
+        detection_stats.remove(doc.get("camera_id"), doc.get("created_at"))
+        # Its crop may be shared with other documents, so it is left for the crop sweep
         return jsonify({"success": True, "message": "Detection deleted"})
     except Exception:
         return jsonify({"error": "Invalid ID format"}), 400
 
 
+@app.route("/api/plates/search", methods=["GET"])
+def search_plates():
+    # Fuzzy plate lookup tolerant of OCR confusions; q, max_distance (<= 3), limit
+    query = request.args.get("q", "")
+    if not normalize_plate(query):
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    max_distance = min(max(request.args.get("max_distance", 2, type=int), 0), 3)
+    limit = max(request.args.get("limit", 20, type=int), 1)
+
+    return jsonify(
+        {
+            "query": query,
+            "normalized": normalize_plate(query),
+            "results": plate_index.search(query, max_distance=max_distance, limit=limit),
+            # False while the index is still loading at startup
+            "complete": plate_index_ready.is_set(),
+        }
+    )
+
+
 # ------------------------------------------------------
 # Stats Endpoint
 # ------------------------------------------------------
 @app.route("/api/stats", methods=["GET"])
 def get_stats():
+    # Counters kept up to date on insert; unique_plates are estimates (~1% error)
+    stats = detection_stats.snapshot()
+    # False while documents newer than the last snapshot are still being counted
+    stats["complete"] = stats_ready.is_set()
+    return jsonify(stats)
+
+
+# ------------------------------------------------------
+# Cameras
+# ------------------------------------------------------
+@app.route("/api/cameras", methods=["GET"])
+def get_cameras():
     assert mongo.db is not None, "Database not initialized"
-    total = mongo.db.detections.count_documents({})
-    pipeline = [{"$group": {"_id": "$plate_number"}}, {"$count": "unique_plates"}]
-    result = list(mongo.db.detections.aggregate(pipeline))
-    unique_plates = result[0]["unique_plates"] if result else 0
-    cameras = mongo.db.detections.distinct("camera_id")
+    status = {reader["camera_id"]: reader for reader in camera_ingest.status()}
+    cameras = []
+    for doc in mongo.db.cameras.find().sort("_id", 1):
+        camera = CameraMongo.to_dict(doc)
+        camera["ingest"] = status.get(camera["camera_id"])
+        cameras.append(camera)
+    return jsonify({"cameras": cameras})
 
-    return jsonify(
-        {
-            "total_detections": total,
-            "unique_plates": unique_plates,
-            "cameras": cameras,
-        }
-    )
+
+@app.route("/api/cameras", methods=["POST"])
+def save_camera():
+    assert mongo.db is not None, "Database not initialized"
+    data = request.get_json(silent=True) or {}
+    camera_id = data.get("camera_id")
+    if not camera_id:
+        return jsonify({"error": "camera_id is required"}), 400
+
+    fields = {
+        k: data[k] for k in ("name", "location", "rtsp_url", "is_active", "sample_fps") if k in data
+    }
+    # Motion gate polygon, [[x, y], ...] in 0..1 coordinates (null: whole frame)
+    if "roi" in data:
+        try:
+            fields["roi"] = parse_roi(data["roi"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if mongo.db.cameras.find_one({"camera_id": camera_id}) is None:
+        if not data.get("name"):
+            return jsonify({"error": "name is required"}), 400
+        mongo.db.cameras.insert_one(CameraMongo.create(camera_id, **fields))
+    elif fields:
+        mongo.db.cameras.update_one({"camera_id": camera_id}, {"$set": fields})
+    if "roi" in fields:
+        live_gates.reset(camera_id)
+
+    # Start, restart or stop ingest readers to match
+    if CAMERA_INGEST:
+        threading.Thread(target=camera_ingest.refresh, daemon=True).start()
+    return jsonify(CameraMongo.to_dict(mongo.db.cameras.find_one({"camera_id": camera_id})))
 
 
 # ------------------------------------------------------
@@ -315,58 +979,97 @@ def handle_connect():
     emit("connection_response", {"status": "connected"})
 
 
+@socketio.on("disconnect")
+def handle_disconnect():
+    # Store open tracks of the client's cameras that no other client is streaming
+    streams = live_scheduler.discard(request.sid)
+    streaming = {camera_id for _, camera_id in live_scheduler.streams()}
+    for _, camera_id in streams:
+        if camera_id not in streaming:
+            store_live_tracks(live_trackers.flush(camera_id))
+
+
 @socketio.on("video_frame")
 def handle_video_frame(data):
-    try:
-        frame_b64 = data.get("frame")
-        if not frame_b64:
-            emit("error", {"message": "No frame provided"})
-            return
+    if not isinstance(data, dict):
+        emit("error", {"message": "No frame provided"})
+        return
 
-        img_data = base64.b64decode(frame_b64)
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            emit("error", {"message": "Invalid frame data"})
-            return
+    # Latest-frame-wins: only the handler that finds the stream idle processes it,
+    # newer payloads replace the pending one and stale frames are dropped
+    key = (request.sid, data.get("camera_id", "live"))
+    if not live_scheduler.submit(key, data):
+        return
+    while True:
+        item = live_scheduler.next(key)
+        if item is None:
+            break
+        data, dropped = item
+        start = time.perf_counter()
+        process_live_frames(data, dropped, live_scheduler.stats(key))
+        live_scheduler.record(key, time.perf_counter() - start)
 
-        results = detector.detect(img) or []
-        detections = []
 
-        for result in results:
-            plate_crop = result.get("plate_crop")
-            if plate_crop is None:
-                continue
+def process_live_frames(data, dropped, stats):
+    try:
+        # Binary frames (or legacy base64 strings)
+        images, error = parse_frames(data, BATCH_SIZE)
+        if error:
+            emit("error", {"message": error})
+            return
 
-            ok, buffer = cv2.imencode(".jpg", plate_crop)
-            if not ok:
+        # Link detections to per-camera tracks; OCR only new tracks or better crops
+        camera_id = data.get("camera_id", "live")
+        tracker = live_trackers.get(camera_id)
+        # Frames where nothing moved skip the model and the tracker
+        if MOTION_GATE:
+            gate = live_gates.get(camera_id)
+            active = [gate.check(image) for image in images]
+        else:
+            active = [True] * len(images)
+        # Batched with frames from other live streams
+        detected = iter(live_broker.detect([im for im, a in zip(images, active) if a]))
+        batch_results = [next(detected) if a else [] for a in active]
+        now = time.time()
+        ocr_requests, finished = [], []
+        for results, is_active in zip(batch_results, active):
+            if not is_active:
                 continue
-            plate_img_b64 = base64.b64encode(buffer).decode("utf-8")
-
-            plate_text = result.get("plate_text", "UNKNOWN")
-            detection_doc = DetectionMongo.create(
-                plate_number=plate_text,
-                confidence=float(result.get("confidence", 0.0)),
-                camera_id=data.get("camera_id", "live"),
-                bbox=result.get("bbox", [0, 0, 0, 0]),
-                plate_image=plate_img_b64,
-            )
-
-            assert mongo.db is not None, "Database not initialized"
-            inserted = mongo.db.detections.insert_one(detection_doc)
-            detections.append(
-                {
-                    "id": str(inserted.inserted_id),
-                    "plate_number": plate_text,
+            frame_requests, frame_finished = tracker.update(results, now)
+            ocr_requests.extend(frame_requests)
+            finished.extend((camera_id, track) for track in frame_finished)
+        tracker.apply_ocr(
+            ocr_requests, detector.run_ocr_batch([r["plate_crop"] for _, r in ocr_requests])
+        )
+
+        # One document per finished track, including idle tracks of other cameras
+        store_live_tracks(finished + live_trackers.expire(now))
+
+        # Crops are only JPEG-encoded when the client asks for them
+        include_crops = bool(data.get("include_crops"))
+        fmt = result_format(data)
+        seq = data.get("seq")
+        for i, results in enumerate(batch_results):
+            detections = []
+            for result in results:
+                detection = {
+                    "plate_number": result.get("plate_text"),
                     "confidence": float(result.get("confidence", 0.0)),
                     "bbox": result.get("bbox", [0, 0, 0, 0]),
+                    "track_id": result.get("track_id"),
                 }
-            )
-
-        emit(
-            "detection_result",
-            {"detections": detections, "timestamp": datetime.utcnow().isoformat()},
-        )
+                if include_crops:
+                    detection["plate_image"] = crop_payload(result["plate_crop"], fmt)
+                detections.append(detection)
+            payload = {"detections": detections, "timestamp": datetime.utcnow().isoformat()}
+            if isinstance(seq, int):
+                # Frames of a batch are numbered seq, seq + 1, ...
+                payload["seq"] = seq + i
+            # Frames dropped before this one, and the stream's sustainable rate
+            payload["dropped"] = dropped if i == 0 else 0
+            payload["gated"] = not active[i]
+            payload.update(stats)
+            emit("detection_result", encode_result(payload, fmt))
     except Exception as e:
         emit("error", {"message": str(e)})
 
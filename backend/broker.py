@@ -0,0 +1,138 @@
+"""Cross-client micro-batching of live detector calls.
+
+Every live stream used to call the detector on its own, so concurrent
+cameras meant one single-image forward pass each, serialized on the shared
+model. ``InferenceBroker`` gathers the frames submitted by all streams into
+micro-batches: a batch is run as soon as it holds ``max_batch_size`` frames
+or its first request has waited ``max_wait_ms``, and each caller gets back
+the results for its own frames. Callers keep their own context (tracking,
+OCR, ``emit``); only the forward pass is shared.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# detector.detect_batch(images, ocr=False)
+DetectBatch = Callable[[List[np.ndarray]], List[List[Dict[str, Any]]]]
+
+
+class _Request:
+    __slots__ = ("images", "future")
+
+    def __init__(self, images: List[np.ndarray]):
+        self.images = images
+        self.future: "Future[List[List[Dict[str, Any]]]]" = Future()
+
+
+class InferenceBroker:
+    """Dynamic batching of detector calls from concurrent live streams."""
+
+    def __init__(self, detect_batch: DetectBatch, max_batch_size: int = 8, max_wait_ms: float = 5):
+        """Initialize broker.
+
+        Args:
+            detect_batch: Runs one forward pass over a list of images and returns
+                one result list per image (e.g. ``detector.detect_batch`` with
+                ``ocr=False``).
+            max_batch_size: Most frames per forward pass. A single request with
+                more frames is still run as one batch.
+            max_wait_ms: Longest a request waits for others to join its batch.
+        """
+        self.detect_batch = detect_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._frames = 0
+
+    def start(self):
+        """Start the batching thread."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._work, name="inference-broker", daemon=True
+                )
+                self._thread.start()
+
+    def detect(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """Detect plates in a stream's frames as part of a shared batch.
+
+        Blocks until the batch holding these frames has run. Errors raised by
+        the forward pass are re-raised in every caller of that batch.
+
+        Returns:
+            One list of detection dicts per image, in input order.
+        """
+        if not images:
+            return []
+        self.start()
+        request = _Request(images)
+        self._queue.put(request)
+        return request.future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batches run so far and their mean size."""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "frames": self._frames,
+                "mean_batch_size": round(self._frames / self._batches, 2) if self._batches else 0,
+            }
+
+    # -- internals -----------------------------------------------------------
+
+    def _work(self):
+        carry: Optional[_Request] = None
+        while True:
+            # A request that did not fit the previous batch starts the next one
+            first = carry or self._queue.get()
+            carry = None
+            batch = [first]
+            size = len(first.images)
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    request = (
+                        self._queue.get(timeout=timeout)
+                        if timeout > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if size + len(request.images) > self.max_batch_size:
+                    carry = request
+                    break
+                batch.append(request)
+                size += len(request.images)
+
+            self._run(batch, size)
+
+    def _run(self, batch: List[_Request], size: int):
+        images = [img for request in batch for img in request.images]
+        try:
+            results = self.detect_batch(images)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._frames += size
+        start = 0
+        for request in batch:
+            end = start + len(request.images)
+            request.future.set_result(results[start:end])
+            start = end
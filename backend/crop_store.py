@@ -0,0 +1,190 @@
+"""Content-addressed storage for plate crop JPEGs.
+
+Detection rows used to embed each crop as base64 text in ``plate_image``, so
+the table was mostly image data and every ``/api/detections`` page carried
+it. Crops are now written to a ``CropStore`` under the SHA-256 of their JPEG
+bytes and rows keep only that key; ``GET /api/crops/<key>`` serves the image.
+Identical crops share one object, and since a key names immutable content,
+responses can be cached indefinitely.
+
+Since rows can share a crop, deleting a detection leaves its crop in place.
+``sweep_crops`` (run periodically by the apps) deletes crops that no row
+references once they are older than a grace period, which covers rows still
+waiting in the write buffer; storing a crop again restarts its grace period.
+
+``LocalCropStore`` keeps files under a directory. Other backends (S3, GCS,
+...) subclass ``CropStore`` and register in ``CROP_STORES``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from abc import ABC, abstractmethod
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from backend.crops import CropRef
+
+# Lowercase hex SHA-256
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Crops stored less than this long ago (s) are never swept: their rows may not
+# be written yet
+SWEEP_MIN_AGE = 3600.0
+
+
+def crop_key(data: bytes) -> str:
+    """Content address of crop bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_crop_key(value) -> bool:
+    """Whether a ``plate_image`` value is a crop store key (not legacy base64)."""
+    return isinstance(value, str) and KEY_PATTERN.match(value) is not None
+
+
+def crop_url(value) -> Optional[str]:
+    """API path serving a stored crop, or None for legacy base64 values."""
+    return f"/api/crops/{value}" if is_crop_key(value) else None
+
+
+class CropStore(ABC):
+    """Interface of a crop blob backend."""
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Store JPEG bytes (if already stored, marks them stored again). Returns the key."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """JPEG bytes for a key, or None if unknown."""
+
+    @abstractmethod
+    def keys(self) -> Iterator[Tuple[str, float]]:
+        """Every stored key, with when it was last stored (Unix time)."""
+
+    @abstractmethod
+    def delete(self, key: str, stored_before: Optional[float] = None) -> bool:
+        """Delete a crop, unless it was stored again at or after ``stored_before``.
+
+        Returns:
+            Whether the crop was deleted.
+        """
+
+    def put_crop(self, crop: CropRef) -> Optional[str]:
+        """Store a crop's JPEG. Returns the key, or None if encoding fails."""
+        jpeg = crop.jpeg()
+        return None if jpeg is None else self.put(jpeg)
+
+
+class LocalCropStore(CropStore):
+    """Crops as files under ``root``, fanned out by key prefix."""
+
+    def __init__(self, root: str = "uploads/crops"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        """File path for a key (e.g. root/ab/cd/abcd....jpg)."""
+        return self.root / key[:2] / key[2:4] / f"{key}.jpg"
+
+    def put(self, data: bytes) -> str:
+        key = crop_key(data)
+        path = self.path(key)
+        try:
+            # Storing it again restarts the sweep grace period for the new row
+            os.utime(path)
+            return key
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not is_crop_key(key):
+            return None
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def keys(self) -> Iterator[Tuple[str, float]]:
+        for path in self.root.glob("*/*/*.jpg"):
+            if is_crop_key(path.stem):
+                try:
+                    yield path.stem, path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+
+    def delete(self, key: str, stored_before: Optional[float] = None) -> bool:
+        if not is_crop_key(key):
+            return False
+        path = self.path(key)
+        try:
+            if stored_before is not None and path.stat().st_mtime >= stored_before:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+
+CROP_STORES: Dict[str, Type[CropStore]] = {"local": LocalCropStore}
+
+
+def create_crop_store(backend: str = "local", **kwargs) -> CropStore:
+    """Create a crop store by backend name (see ``CROP_STORES``)."""
+    if backend not in CROP_STORES:
+        raise ValueError(f"Unknown crop store '{backend}', expected one of {sorted(CROP_STORES)}")
+    return CROP_STORES[backend](**kwargs)
+
+
+def sweep_crops(
+    store: CropStore,
+    referenced: Callable[[List[str]], Set[str]],
+    min_age: float = SWEEP_MIN_AGE,
+    chunk_size: int = 1000,
+) -> int:
+    """Delete crops that no detection references.
+
+    Args:
+        store: Crop store to sweep.
+        referenced: Returns the subset of a list of keys that rows still
+            reference (one indexed query per chunk).
+        min_age: Keep crops stored less than this many seconds ago.
+        chunk_size: Keys looked up per ``referenced`` call.
+
+    Returns:
+        Number of crops deleted.
+    """
+    cutoff = time.time() - min_age
+    deleted = 0
+    chunk: List[str] = []
+
+    def delete_unreferenced():
+        nonlocal deleted
+        used = referenced(chunk)
+        deleted += sum(store.delete(key, cutoff) for key in chunk if key not in used)
+        chunk.clear()
+
+    for key, stored_at in store.keys():
+        if stored_at < cutoff:
+            chunk.append(key)
+            if len(chunk) >= chunk_size:
+                delete_unreferenced()
+    if chunk:
+        delete_unreferenced()
+    return deleted
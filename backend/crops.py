@@ -0,0 +1,111 @@
+"""Lazy plate crop references.
+
+Detection results used to carry ``plate_crop`` as a slice of a full copy of
+the frame, and callers JPEG/base64-encoded every crop straight away. A
+``CropRef`` instead holds the source frame and the box: pixels are a view
+into the frame, and the JPEG bytes and base64 string are produced on first
+use and cached, so crops that are never stored or sent are never encoded.
+"""
+
+from __future__ import annotations
+
+import base64
+import threading
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+
+
+class CropRef:
+    """A plate region of a frame, materialized on demand.
+
+    The frame is not copied, so it must not be modified while crops refer to
+    it. Call ``detach`` to keep a crop beyond the frame's lifetime.
+    """
+
+    __slots__ = ("frame", "bbox", "_offset", "_jpeg", "_base64", "_lock")
+
+    def __init__(self, frame: np.ndarray, bbox: Sequence[int]):
+        """Initialize crop.
+
+        Args:
+            frame: Source image (BGR, HWC format).
+            bbox: [x1, y1, x2, y2] in frame pixels, already clipped.
+        """
+        self.frame = frame
+        self.bbox = [int(v) for v in bbox]
+        self._offset = (0, 0)
+        self._jpeg: Optional[bytes] = None
+        self._base64: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        x1, y1, x2, y2 = self.bbox
+        return (y2 - y1, x2 - x1) + self.frame.shape[2:]
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def array(self) -> np.ndarray:
+        """Crop pixels (a view into the frame, not a copy)."""
+        with self._lock:
+            return self._pixels()
+
+    def __array__(self, dtype=None, copy=None):
+        crop = self.array()
+        return crop if dtype is None else crop.astype(dtype)
+
+    def detach(self) -> "CropRef":
+        """Copy just the crop's pixels and drop the frame reference. Returns self."""
+        with self._lock:
+            if self.frame.shape[:2] != self.shape[:2]:
+                self.frame = self._pixels().copy()
+                self._offset = (self.bbox[0], self.bbox[1])
+        return self
+
+    def __getstate__(self):
+        # Pickled (e.g. sent from a worker process) as just the crop's pixels
+        self.detach()
+        return (self.frame, self.bbox, self._offset, self._jpeg)
+
+    def __setstate__(self, state):
+        self.frame, self.bbox, self._offset, self._jpeg = state
+        self._base64 = None
+        self._lock = threading.Lock()
+
+    def jpeg(self) -> Optional[bytes]:
+        """JPEG bytes of the crop (encoded once), or None if encoding fails."""
+        with self._lock:
+            if self._jpeg is None:
+                pixels = self._pixels()
+                # imencode raises on an empty image
+                if pixels.size == 0:
+                    return None
+                ok, buffer = cv2.imencode(".jpg", pixels)
+                if not ok:
+                    return None
+                self._jpeg = buffer.tobytes()
+            return self._jpeg
+
+    def _pixels(self) -> np.ndarray:
+        """Crop view. Caller holds the lock."""
+        x1, y1, x2, y2 = self.bbox
+        ox, oy = self._offset
+        return self.frame[y1 - oy : y2 - oy, x1 - ox : x2 - ox]
+
+    def base64(self) -> Optional[str]:
+        """Base64 of ``jpeg()`` (encoded once), or None if encoding fails."""
+        if self._base64 is None:
+            jpeg = self.jpeg()
+            if jpeg is None:
+                return None
+            self._base64 = base64.b64encode(jpeg).decode("utf-8")
+        return self._base64
+
+
+def crop_pixels(crop) -> np.ndarray:
+    """Pixels of a ``CropRef`` or a plain crop array."""
+    return crop.array() if isinstance(crop, CropRef) else crop
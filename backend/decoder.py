@@ -0,0 +1,293 @@
+"""Video decoders for the video pipeline.
+
+The pipeline used to ``cap.read()`` every frame and then throw most of them
+away through ``sample_rate``. A decoder separates advancing the stream from
+producing an image:
+
+- ``grab()`` moves to the next frame without converting it to BGR (the
+  colour conversion and copy are a large share of ``read()`` at 4K). The
+  frame is still decoded: codecs need every frame to decode the next one;
+- ``retrieve()`` converts the current frame, optionally downscaled to
+  ``max_width``;
+- ``skip_to(frame)`` seeks when the gap is at least ``seek_frames`` (the
+  container jumps to the preceding keyframe and decodes from there) and
+  grabs otherwise, since seeking within a GOP costs more than it saves.
+
+Backends:
+
+- ``opencv``: ``cv2.VideoCapture``, optionally with hardware-accelerated
+  decoding (``hw_accel``, FFmpeg backend, falls back to software).
+- ``pyav``: PyAV (FFmpeg) with frame- and slice-threaded decoding. Frames are
+  scaled straight from YUV when downscaling, so the full-size BGR image is
+  never built. Needs the optional ``av`` package.
+- ``auto``: ``pyav`` when installed, else ``opencv``.
+
+Only PyAV decodes from file objects, e.g. an upload that is still arriving
+(``backend.upload``).
+"""
+
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+try:
+    import av
+
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+DECODERS = ("auto", "opencv", "pyav")
+
+
+def can_stream(backend: str = "auto") -> bool:
+    """Whether ``open_decoder`` with this backend accepts file objects."""
+    return PYAV_AVAILABLE and backend in ("auto", "pyav")
+
+
+def open_decoder(
+    source: Union[str, BinaryIO],
+    backend: str = "auto",
+    max_width: int = 0,
+    seek_frames: int = 300,
+    hw_accel: bool = False,
+    threads: int = 0,
+) -> "VideoDecoder":
+    """Open a video file for decoding.
+
+    Args:
+        source: Video file path, or a readable binary file object (PyAV only).
+        backend: 'auto', 'opencv' or 'pyav'.
+        max_width: Downscale frames wider than this (0: full resolution).
+        seek_frames: Smallest gap ``skip_to`` seeks over instead of grabbing.
+        hw_accel: Ask OpenCV for hardware-accelerated decoding.
+        threads: PyAV decoder threads (0: FFmpeg's choice).
+
+    Returns:
+        Decoder positioned before the first frame.
+
+    Raises:
+        ValueError: If the backend is unknown, 'pyav' is requested but not
+            installed, or ``source`` is a file object the backend can't read.
+    """
+    if backend not in DECODERS:
+        raise ValueError(f"Unknown video decoder '{backend}', expected one of {DECODERS}")
+    if backend == "pyav" and not PYAV_AVAILABLE:
+        raise ValueError("PyAV not installed. Install 'av' or use the opencv decoder.")
+    is_path = isinstance(source, (str, os.PathLike))
+    if not is_path and not can_stream(backend):
+        raise ValueError("Decoding from a file object needs the pyav decoder")
+    if backend == "pyav" or (backend == "auto" and PYAV_AVAILABLE):
+        try:
+            return PyAVDecoder(source, max_width, seek_frames, threads)
+        except (av.error.FFmpegError, OSError, ValueError) as e:
+            if backend == "pyav" or not is_path:
+                raise
+            print(f"Warning: PyAV could not open {source} ({e}); using OpenCV")
+    return OpenCVDecoder(source, max_width, seek_frames, hw_accel)
+
+
+class VideoDecoder(ABC):
+    """Frame-by-frame access to a video file; ``index`` is the current frame."""
+
+    name = ""
+
+    def __init__(self, max_width: int, seek_frames: int):
+        self.max_width = max_width
+        self.seek_frames = max(1, seek_frames)
+        self.fps = 25.0
+        self.frame_count = 0
+        self.width = 0
+        self.height = 0
+        # Index of the frame last grabbed (-1: before the first one)
+        self.index = -1
+        # Output size, and factor from output to source coordinates
+        self.size: Optional[Tuple[int, int]] = None
+        self.scale = 1.0
+
+    def _set_source_size(self, width: int, height: int):
+        self.width, self.height = width, height
+        if self.max_width and width > self.max_width:
+            self.size = (self.max_width, max(1, round(height * self.max_width / width)))
+            self.scale = width / self.max_width
+
+    @abstractmethod
+    def grab(self) -> bool:
+        """Advance to the next frame without converting it. Returns False at the end."""
+
+    @abstractmethod
+    def retrieve(self) -> Optional[np.ndarray]:
+        """BGR image of the current frame, at ``size`` if downscaling."""
+
+    @abstractmethod
+    def seek(self, frame_index: int) -> bool:
+        """Position so that the next ``grab`` returns ``frame_index``.
+
+        Returns:
+            False if the container can't seek; the position is then unchanged.
+        """
+
+    def skip_to(self, frame_index: int) -> bool:
+        """Position before ``frame_index``, seeking over large gaps.
+
+        Returns:
+            False if the video ended first.
+        """
+        if frame_index - (self.index + 1) >= self.seek_frames and self.seek(frame_index):
+            return True
+        while self.index + 1 < frame_index:
+            if not self.grab():
+                return False
+        return True
+
+    @abstractmethod
+    def close(self):
+        """Release the container."""
+
+
+class OpenCVDecoder(VideoDecoder):
+    """``cv2.VideoCapture`` with grab/retrieve."""
+
+    name = "opencv"
+
+    def __init__(self, path: str, max_width: int = 0, seek_frames: int = 300, hw_accel=False):
+        super().__init__(max_width, seek_frames)
+        self.cap = None
+        if hw_accel:
+            self.cap = cv2.VideoCapture(
+                path,
+                cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY],
+            )
+            if not self.cap.isOpened():
+                self.cap.release()
+                self.cap = None
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_count = max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._set_source_size(
+            int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+
+    def grab(self) -> bool:
+        if not self.cap.isOpened() or not self.cap.grab():
+            return False
+        self.index += 1
+        return True
+
+    def retrieve(self) -> Optional[np.ndarray]:
+        ok, frame = self.cap.retrieve()
+        if not ok or frame is None:
+            return None
+        if self.size is not None and frame.shape[1] > self.size[0]:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def seek(self, frame_index: int) -> bool:
+        if self.frame_count and frame_index >= self.frame_count:
+            return False
+        if not self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index):
+            return False
+        self.index = frame_index - 1
+        return True
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVDecoder(VideoDecoder):
+    """PyAV decoder with threaded decoding and scaling from YUV."""
+
+    name = "pyav"
+
+    def __init__(
+        self,
+        source: Union[str, BinaryIO],
+        max_width: int = 0,
+        seek_frames: int = 300,
+        threads: int = 0,
+    ):
+        super().__init__(max_width, seek_frames)
+        self.container = av.open(source)
+        try:
+            self.stream = self.container.streams.video[0]
+        except IndexError:
+            self.container.close()
+            raise ValueError(f"No video stream in {source}")
+        # Frame and slice threading
+        self.stream.thread_type = "AUTO"
+        if threads:
+            self.stream.codec_context.thread_count = threads
+        rate = self.stream.average_rate or self.stream.guessed_rate
+        self.fps = float(rate) if rate else 25.0
+        self.frame_count = self.stream.frames or 0
+        self._set_source_size(self.stream.codec_context.width, self.stream.codec_context.height)
+        self._start_pts = self.stream.start_time or 0
+        self._frames = self.container.decode(self.stream)
+        self._frame = None
+        # Frame decoded while seeking, returned by the next grab
+        self._pending = None
+
+    def grab(self) -> bool:
+        # Decodes the frame; only the conversion in retrieve() is skipped
+        if self._pending is not None:
+            self._frame, self._pending = self._pending, None
+        else:
+            try:
+                self._frame = next(self._frames)
+            except (StopIteration, av.error.FFmpegError):
+                return False
+        # Indices follow timestamps, so frames missing from the stream leave gaps
+        self.index = max(self.index + 1, self._frame_index(self._frame, self.index + 1))
+        return True
+
+    def retrieve(self) -> Optional[np.ndarray]:
+        if self._frame is None:
+            return None
+        if self.size is None and self._frame.format.name == "yuv420p":
+            # OpenCV's YUV conversion is faster than swscale's at full size
+            return cv2.cvtColor(self._frame.to_ndarray(), cv2.COLOR_YUV2BGR_I420)
+        width, height = self.size if self.size is not None else (None, None)
+        return self._frame.to_ndarray(format="bgr24", width=width, height=height)
+
+    def seek(self, frame_index: int) -> bool:
+        time_base = self.stream.time_base
+        if not time_base or (self.frame_count and frame_index >= self.frame_count):
+            return False
+        target = self._start_pts + int(frame_index / self.fps / time_base)
+        try:
+            # Lands on the keyframe at or before the target
+            self.container.seek(target, stream=self.stream, backward=True, any_frame=False)
+        except av.error.FFmpegError:
+            return False
+        self._frames = self.container.decode(self.stream)
+        self._pending = None
+        # Decode (without converting) up to the target frame
+        last = None
+        for frame in self._frames:
+            if self._frame_index(frame, frame_index) >= frame_index:
+                self._pending = frame
+                break
+            last = frame
+        if self._pending is None and last is not None:
+            # The video ended before the target
+            self.index = self._frame_index(last, self.index)
+        else:
+            self.index = frame_index - 1
+        return True
+
+    def _frame_index(self, frame, default: int) -> int:
+        """Frame index from the presentation timestamp (``default`` without one)."""
+        if frame.pts is None or not self.stream.time_base:
+            return default
+        return round(float((frame.pts - self._start_pts) * self.stream.time_base) * self.fps)
+
+    def close(self):
+        self.container.close()
@@ -2,26 +2,17 @@
 
 from __future__ import annotations
 
-import sys
-from pathlib import Path
+import math
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
 import cv2
 import numpy as np
-import torch
-from typing import List, Dict, Any
-
-# Add YOLOv7 to path
-yolov7_path = Path(__file__).parent.parent / "external" / "yolov7"
-if yolov7_path.exists():
-    sys.path.insert(0, str(yolov7_path))
 
-try:
-    from models.experimental import attempt_load
-    from utils.general import non_max_suppression, scale_coords
-    from utils.torch_utils import select_device
-    from utils.datasets import letterbox
-except ImportError:
-    print("Warning: YOLOv7 modules not found. Ensure external/yolov7 is cloned.")
-    attempt_load = None
+from backend.crops import CropRef, crop_pixels
+from backend.inference import load_backend
+from backend.ops import letterbox_geometry, scale_coords
+from backend.preprocess import BatchPreprocessor, letterbox_into
 
 # OCR import
 try:
@@ -32,6 +23,28 @@ except ImportError:
     OCR_AVAILABLE = False
     print("Warning: EasyOCR not installed. OCR will be disabled.")
 
+try:
+    # Recognizer-only entry point, used to batch OCR over tight plate crops
+    from easyocr.recognition import get_text as ocr_get_text
+except ImportError:
+    ocr_get_text = None
+
+# Batched OCR calls EasyOCR internals (get_text and these Reader attributes), which
+# are only known to work with these versions; others use per-crop readtext()
+OCR_BATCH_VERSIONS = ("1.6.", "1.7.")
+OCR_READER_ATTRS = ("character", "lang_char", "recognizer", "converter", "device")
+
+# Input height of EasyOCR's recognition network
+OCR_IMG_HEIGHT = 64
+
+
+def batch_ocr_supported(reader) -> bool:
+    """Whether ``run_ocr_batch`` can call EasyOCR's recognizer directly for ``reader``."""
+    version = getattr(easyocr, "__version__", "")
+    if ocr_get_text is None or not version.startswith(OCR_BATCH_VERSIONS):
+        return False
+    return all(hasattr(reader, name) for name in OCR_READER_ATTRS)
+
 
 class PlateDetector:
     """YOLOv7-based plate detector with OCR integration."""
@@ -43,105 +56,88 @@ class PlateDetector:
         conf_threshold: float = 0.25,
         iou_threshold: float = 0.45,
         img_size: int = 640,
+        backend: Optional[str] = None,
+        precision: str = "fp32",
+        ocr: bool = True,
+        threads: int = 0,
     ):
         """Initialize detector.
 
         Args:
-            yolov7_weights: Path to YOLOv7 weights file.
+            yolov7_weights: Path to YOLOv7 weights file (``.pt`` or ``.onnx``).
             device: CUDA device ('0', '1', etc.) or 'cpu'. Defaults to 'cpu'.
             conf_threshold: Confidence threshold for detections.
             iou_threshold: IoU threshold for NMS.
             img_size: Input image size.
+            backend: Inference backend, 'torch' or 'onnx'. Defaults to 'onnx' for
+                ``.onnx`` weights and 'torch' otherwise.
+            precision: 'fp32', or 'int8' to load the quantized ONNX model made by
+                ``scripts/quantize_model.py`` for these weights.
+            ocr: Initialize the EasyOCR reader. Disable for detection-only use
+                (e.g. evaluation); OCR calls then return "NO_OCR".
+            threads: CPU threads for inference (0: all cores).
         """
-        # Safe device selection - check CUDA availability
-        if attempt_load:
-            if device != "cpu":
-                # Check if CUDA is available before using GPU
-                try:
-                    import torch
-
-                    if not torch.cuda.is_available():
-                        print(
-                            f"Warning: CUDA not available. Switching from device '{device}' to 'cpu'"
-                        )
-                        device = "cpu"
-                except Exception:
-                    device = "cpu"
-            self.device = select_device(device)
-        else:
-            self.device = "cpu"
-
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
         self.img_size = img_size
 
-        # Load model
-        if attempt_load and Path(yolov7_weights).exists():
-            # Patch torch.load for PyTorch 2.6+ compatibility BEFORE attempting to load
-            import torch
-
-            original_load = torch.load
-
-            def patched_load(*args, **kwargs):
-                # Force weights_only=False for YOLOv7 compatibility
-                kwargs["weights_only"] = False
-                return original_load(*args, **kwargs)
-
-            torch.load = patched_load
-
-            try:
-                self.model = attempt_load(yolov7_weights, map_location=self.device)
-                self.model.eval()
-                print(f"Model loaded: {yolov7_weights} on {self.device}")
-            except Exception as e:
-                print(f"Error loading model: {e}")
-                raise
-            finally:
-                # Restore original torch.load
-                torch.load = original_load
+        # Load model (torch or ONNX Runtime backend, optionally INT8)
+        try:
+            self.model = load_backend(yolov7_weights, device, backend, precision, threads)
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            raise
+        if self.model is not None:
+            self.device = self.model.device
+            print(f"Model loaded: {self.model.weights} on {self.device} ({self.model.name})")
         else:
-            self.model = None
-            print(f"Warning: Model not loaded. Weights not found or YOLOv7 not available.")
+            self.device = "cpu"
+        # Per-thread preprocessing buffers (video jobs and live frames run concurrently)
+        self._local = threading.local()
 
         # Load OCR reader
         self.ocr_reader = None
-        if OCR_AVAILABLE:
+        if ocr and OCR_AVAILABLE:
             try:
                 self.ocr_reader = easyocr.Reader(["en"], gpu=(str(self.device) != "cpu"))
                 print("OCR reader initialized")
             except Exception as e:
                 print(f"Warning: OCR reader failed to initialize: {e}")
-
-    def preprocess(self, img: np.ndarray) -> torch.Tensor:
+        self.ocr_batch = self.ocr_reader is not None and batch_ocr_supported(self.ocr_reader)
+        if self.ocr_reader is not None and not self.ocr_batch:
+            print(
+                f"Warning: batched OCR not supported with EasyOCR "
+                f"{getattr(easyocr, '__version__', '?')}; OCR runs per crop"
+            )
+
+    def preprocess(
+        self,
+        img: np.ndarray,
+        auto: bool = True,
+        new_shape: Optional[Union[int, Tuple[int, int]]] = None,
+    ) -> np.ndarray:
         """Preprocess image for YOLOv7 input.
 
         Args:
             img: OpenCV image (BGR, HWC format).
+            auto: Use YOLOv7's minimum-rectangle letterbox. Pass False to pad to
+                a full ``img_size`` square so differently shaped frames share a shape.
+            new_shape: Letterbox target size. Defaults to ``img_size``.
 
         Returns:
-            Preprocessed tensor (1, 3, H, W).
+            Normalized RGB array (3, H, W), float32.
         """
-        # Letterbox resize
-        img_resized = letterbox(img, self.img_size, stride=32)[0]
-
-        # Convert BGR to RGB
-        img_rgb = img_resized[:, :, ::-1].transpose(2, 0, 1)
-        img_rgb = np.ascontiguousarray(img_rgb)
-
-        # To tensor and normalize
-        img_tensor = torch.from_numpy(img_rgb).to(self.device)
-        img_tensor = img_tensor.float() / 255.0
-
-        if img_tensor.ndimension() == 3:
-            img_tensor = img_tensor.unsqueeze(0)
-
-        return img_tensor
+        geometry = letterbox_geometry(img.shape[:2], new_shape or self.img_size, auto, 32)
+        (new_w, new_h), (top, bottom, left, right) = geometry
+        out = np.empty((3, new_h + top + bottom, new_w + left + right), dtype=np.float32)
+        letterbox_into(img, out, geometry)
+        return out
 
-    def run_ocr(self, plate_crop: np.ndarray) -> tuple[str, float]:
+    def run_ocr(self, plate_crop: Union[np.ndarray, CropRef]) -> tuple[str, float]:
         """Run OCR on plate crop.
 
         Args:
-            plate_crop: Cropped plate image.
+            plate_crop: Cropped plate image or ``CropRef``.
 
         Returns:
             (plate_text, confidence)
@@ -151,7 +147,7 @@ class PlateDetector:
 
         try:
             # Convert BGR to RGB
-            img_rgb = cv2.cvtColor(plate_crop, cv2.COLOR_BGR2RGB)
+            img_rgb = cv2.cvtColor(crop_pixels(plate_crop), cv2.COLOR_BGR2RGB)
             results = self.ocr_reader.readtext(img_rgb, detail=1)
 
             if results:
@@ -167,6 +163,72 @@ class PlateDetector:
             print(f"OCR error: {e}")
             return "ERROR", 0.0
 
+    def run_ocr_batch(
+        self, plate_crops: List[Union[np.ndarray, CropRef]]
+    ) -> List[tuple[str, float]]:
+        """Run OCR on many plate crops with one batched recognizer call.
+
+        Crops are already tight plate boxes, so EasyOCR's text detector (CRAFT)
+        is skipped: each crop is converted to grayscale, resized to the
+        recognizer's input height and the whole list is recognized as one batch.
+        This uses EasyOCR internals, so it falls back to ``run_ocr`` per crop
+        when ``batch_ocr_supported`` rejected the installed EasyOCR, or if the
+        recognizer call fails.
+
+        Args:
+            plate_crops: Cropped plate images (BGR) or ``CropRef`` objects.
+
+        Returns:
+            (plate_text, confidence) for each crop, in input order.
+        """
+        if self.ocr_reader is None:
+            return [("NO_OCR", 0.0)] * len(plate_crops)
+        if not plate_crops:
+            return []
+        if not self.ocr_batch:
+            return [self.run_ocr(crop) for crop in plate_crops]
+
+        try:
+            reader = self.ocr_reader
+            image_list = []
+            max_ratio = 1.0
+            for crop in plate_crops:
+                grey = cv2.cvtColor(crop_pixels(crop), cv2.COLOR_BGR2GRAY)
+                h, w = grey.shape[:2]
+                ratio = w / h
+                max_ratio = max(max_ratio, ratio)
+                resized = cv2.resize(
+                    grey,
+                    (max(1, int(OCR_IMG_HEIGHT * ratio)), OCR_IMG_HEIGHT),
+                    interpolation=cv2.INTER_AREA,
+                )
+                # The whole crop is the text box
+                image_list.append(([[0, 0], [w, 0], [w, h], [0, h]], resized))
+
+            ignore_char = "".join(set(reader.character) - set(reader.lang_char))
+            results = ocr_get_text(
+                reader.character,
+                OCR_IMG_HEIGHT,
+                int(math.ceil(max_ratio)) * OCR_IMG_HEIGHT,
+                reader.recognizer,
+                reader.converter,
+                image_list,
+                ignore_char=ignore_char,
+                batch_size=len(image_list),
+                workers=0,
+                device=reader.device,
+            )
+        except Exception as e:
+            print(f"Batched OCR error, falling back to per-crop OCR: {e}")
+            return [self.run_ocr(crop) for crop in plate_crops]
+
+        texts = []
+        # get_text returns (box, text, confidence) in input order
+        for _, text, conf in results:
+            text = text.strip().upper()
+            texts.append((text, float(conf)) if text else ("UNKNOWN", 0.0))
+        return texts
+
     def detect(self, img: np.ndarray) -> List[Dict[str, Any]]:
         """Detect plates in image and run OCR.
 
@@ -179,56 +241,102 @@ class PlateDetector:
                 - confidence: detection confidence
                 - plate_text: OCR result
                 - ocr_confidence: OCR confidence
-                - plate_crop: cropped plate image
+                - plate_crop: ``CropRef`` to the plate region of ``img`` (pixels via
+                  ``array()``, cached JPEG/base64 via ``jpeg()``/``base64()``)
         """
-        if self.model is None:
-            return []
-
-        original_img = img.copy()
-        h, w = img.shape[:2]
-
-        # Preprocess
-        img_tensor = self.preprocess(img)
-
-        # Inference
-        with torch.no_grad():
-            pred = self.model(img_tensor)[0]
-
-        # NMS
-        pred = non_max_suppression(
-            pred, self.conf_threshold, self.iou_threshold, classes=None, agnostic=False
-        )[0]
-
-        results = []
+        return self.detect_batch([img])[0]
 
-        if pred is not None and len(pred):
-            # Scale boxes back to original image
-            pred[:, :4] = scale_coords(img_tensor.shape[2:], pred[:, :4], img.shape).round()
+    def detect_batch(
+        self, images: List[np.ndarray], ocr: bool = True
+    ) -> List[List[Dict[str, Any]]]:
+        """Detect plates in several images with a single forward pass.
 
-            for *xyxy, conf, cls in pred:
-                x1, y1, x2, y2 = map(int, xyxy)
+        All images are letterboxed into one (N, 3, H, W) batch, run through the
+        model once and filtered with one batched NMS call. Boxes are then scaled
+        back to each source image.
 
-                # Clip coordinates
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(w, x2), min(h, y2)
+        Args:
+            images: Input images (BGR format). Frames of the same shape (e.g. from
+                one video) keep the minimum-rectangle letterbox used by ``detect``.
+            ocr: Run OCR on the crops. Pass False to leave ``plate_text`` empty
+                and call ``run_ocr_batch`` separately (e.g. from a worker pool).
 
-                # Crop plate
-                plate_crop = original_img[y1:y2, x1:x2]
+        Returns:
+            One list of detection dicts per input image, in input order, with the
+            same keys as ``detect``.
+        """
+        if self.model is None or not images:
+            return [[] for _ in images]
 
-                if plate_crop.size == 0:
-                    continue
+        if self.model.input_shape is not None:
+            # Fixed-size graph (e.g. ONNX export): pad every image to its input shape
+            new_shape, auto = self.model.input_shape, False
+        else:
+            # Minimum-rectangle letterbox; mixed shapes fall back to a full square
+            new_shape, auto = self.img_size, True
+        # Letterboxed straight into this thread's reusable input buffer
+        batch = self._batch_preprocessor()(images, new_shape, auto)
+
+        # Inference + NMS (one array per image)
+        preds = self.model(batch, self.conf_threshold, self.iou_threshold)
+
+        batch_results = [
+            self._postprocess(img, det, batch.shape[2:]) for img, det in zip(images, preds)
+        ]
+
+        if not ocr:
+            return batch_results
+
+        # One batched OCR call for every crop across all frames
+        flat_results = [result for results in batch_results for result in results]
+        ocr_results = self.run_ocr_batch([result["plate_crop"] for result in flat_results])
+        for result, (plate_text, ocr_conf) in zip(flat_results, ocr_results):
+            result["plate_text"] = plate_text
+            result["ocr_confidence"] = ocr_conf
+
+        return batch_results
+
+    def _batch_preprocessor(self) -> BatchPreprocessor:
+        """This thread's batch preprocessor (buffers from the backend's allocator)."""
+        preprocessor = getattr(self._local, "preprocessor", None)
+        if preprocessor is None:
+            preprocessor = BatchPreprocessor(getattr(self.model, "allocate", None))
+            self._local.preprocessor = preprocessor
+        return preprocessor
+
+    def _postprocess(self, img: np.ndarray, pred: np.ndarray, input_shape) -> List[Dict[str, Any]]:
+        """Scale one image's NMS output back to the source image and crop plates.
+
+        OCR fields are left empty; ``detect_batch`` fills them in one batched call.
+        """
+        results: List[Dict[str, Any]] = []
+        if pred is None or not len(pred):
+            return results
 
-                # Run OCR
-                plate_text, ocr_conf = self.run_ocr(plate_crop)
+        h, w = img.shape[:2]
 
-                results.append(
-                    {
-                        "bbox": [x1, y1, x2, y2],
-                        "confidence": float(conf),
-                        "plate_text": plate_text,
-                        "ocr_confidence": ocr_conf,
-                        "plate_crop": plate_crop,
-                    }
-                )
+        # Scale boxes back to original image
+        pred[:, :4] = scale_coords(input_shape, pred[:, :4], img.shape).round()
+
+        for *xyxy, conf, cls in pred:
+            x1, y1, x2, y2 = map(int, xyxy)
+
+            # Clip coordinates
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+
+            if x2 <= x1 or y2 <= y1:
+                continue
+
+            results.append(
+                {
+                    "bbox": [x1, y1, x2, y2],
+                    "confidence": float(conf),
+                    "plate_text": None,
+                    "ocr_confidence": 0.0,
+                    # Reference into the frame; no copy until needed
+                    "plate_crop": CropRef(img, [x1, y1, x2, y2]),
+                }
+            )
 
         return results
@@ -0,0 +1,37 @@
+"""Field selection for detection list responses.
+
+``GET /api/detections`` takes a ``fields`` query parameter (comma separated,
+e.g. ``fields=id,plate_number,confidence,camera_id``) and each backend reads
+only the columns those fields need (SQL ``load_only``, Mongo projection).
+Without it, lists get every field except the raw ``plate_image`` value, so
+crop payloads in legacy base64 rows are never read or sent.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+
+def parse_fields(
+    value: Optional[str], available: Sequence[str], default: Sequence[str]
+) -> Tuple[str, ...]:
+    """Parse a ``fields`` query parameter.
+
+    Args:
+        value: Comma separated field names, or None/empty for ``default``.
+        available: Every field the model serializes.
+        default: Fields returned when ``value`` is empty.
+
+    Returns:
+        Field names in the order requested, without duplicates.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    if not value:
+        return tuple(default)
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return fields or tuple(default)
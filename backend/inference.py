@@ -0,0 +1,247 @@
+"""Inference backends for PlateDetector.
+
+A backend takes a preprocessed (N, 3, H, W) float32 batch and returns one
+(n, 6) array of [x1, y1, x2, y2, confidence, class] per image after NMS, in
+letterboxed input coordinates. A backend may define ``allocate(shape)`` to
+provide the input buffers (see ``backend.preprocess``).
+
+- ``torch``: YOLOv7 PyTorch checkpoint (``.pt``) run with ``external/yolov7``.
+- ``onnx``: ONNX graph exported with ``scripts/export_onnx.py`` run with ONNX
+  Runtime. Neither PyTorch nor the YOLOv7 sources are needed for detection.
+
+The backend is picked from the weights file extension unless given explicitly
+(``DETECTOR_BACKEND``). With ``precision="int8"`` the INT8 graph written by
+``scripts/quantize_model.py`` (``<name>.int8.onnx``) is loaded instead.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend import ops
+
+try:
+    import onnxruntime as ort
+
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+BACKENDS = ("torch", "onnx")
+PRECISIONS = ("fp32", "int8")
+
+YOLOV7_PATH = Path(__file__).parent.parent / "external" / "yolov7"
+
+
+def backend_for_weights(weights: str) -> str:
+    """Default backend for a weights file, by extension."""
+    return "onnx" if Path(weights).suffix.lower() == ".onnx" else "torch"
+
+
+def int8_weights_path(weights: str) -> Path:
+    """Path of the INT8 ONNX graph for a model, e.g. ``best.pt`` -> ``best.int8.onnx``."""
+    path = Path(weights)
+    stem = path.stem if path.suffix.lower() in (".pt", ".onnx") else path.name
+    if stem.endswith(".int8"):
+        return path.with_name(f"{stem}.onnx")
+    return path.with_name(f"{stem}.int8.onnx")
+
+
+def load_backend(
+    weights: str,
+    device: str = "cpu",
+    backend: Optional[str] = None,
+    precision: str = "fp32",
+    threads: int = 0,
+):
+    """Load an inference backend.
+
+    Args:
+        weights: Path to ``.pt`` or ``.onnx`` weights.
+        device: CUDA device ('0', '1', etc.) or 'cpu'.
+        backend: 'torch' or 'onnx'. Defaults to the one matching ``weights``.
+        precision: 'fp32', or 'int8' to load the quantized ONNX graph next to
+            ``weights`` (falls back to ``weights`` with a warning if missing).
+        threads: CPU threads per forward pass (0: the runtime's default, all
+            cores). Lower it when several processes share the machine.
+
+    Returns:
+        Backend instance, or None if the weights or the backend's runtime are
+        not available.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    if precision == "int8":
+        int8_weights = int8_weights_path(weights)
+        if int8_weights.exists():
+            # INT8 models are ONNX graphs quantized for ONNX Runtime
+            weights, backend = str(int8_weights), "onnx"
+        else:
+            print(
+                f"Warning: INT8 model not found: {int8_weights}. "
+                f"Run scripts/quantize_model.py; using {weights}"
+            )
+
+    backend = backend or backend_for_weights(weights)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {BACKENDS}")
+
+    if not Path(weights).exists():
+        print(f"Warning: Model not loaded. Weights not found: {weights}")
+        return None
+
+    if backend == "onnx":
+        if not ORT_AVAILABLE:
+            print("Warning: onnxruntime not installed. ONNX backend unavailable.")
+            return None
+        return OnnxBackend(weights, device, threads)
+
+    yolov7 = _import_yolov7()
+    if yolov7 is None:
+        print("Warning: Model not loaded. YOLOv7 not available.")
+        return None
+    return TorchBackend(weights, device, yolov7, threads)
+
+
+class TorchBackend:
+    """YOLOv7 PyTorch checkpoint."""
+
+    name = "torch"
+    # The model is fully convolutional, so any stride-aligned input shape works
+    input_shape: Optional[Tuple[int, int]] = None
+
+    def __init__(self, weights: str, device: str, yolov7, threads: int = 0):
+        import torch
+
+        self.weights = weights
+        if threads:
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self._nms = yolov7.non_max_suppression
+
+        # Safe device selection - check CUDA availability
+        if device != "cpu" and not torch.cuda.is_available():
+            print(f"Warning: CUDA not available. Switching from device '{device}' to 'cpu'")
+            device = "cpu"
+        self.device = yolov7.select_device(device)
+
+        # Patch torch.load for PyTorch 2.6+ compatibility BEFORE attempting to load
+        original_load = torch.load
+
+        def patched_load(*args, **kwargs):
+            # Force weights_only=False for YOLOv7 compatibility
+            kwargs["weights_only"] = False
+            return original_load(*args, **kwargs)
+
+        torch.load = patched_load
+
+        try:
+            self.model = yolov7.attempt_load(weights, map_location=self.device)
+            self.model.eval()
+        finally:
+            # Restore original torch.load
+            torch.load = original_load
+
+    def allocate(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Input buffer; page-locked on CUDA so host-to-device copies are async."""
+        torch = self._torch
+        pinned = self.device.type == "cuda"
+        return torch.empty(shape, dtype=torch.float32, pin_memory=pinned).numpy()
+
+    def __call__(
+        self, batch: np.ndarray, conf_threshold: float, iou_threshold: float
+    ) -> List[np.ndarray]:
+        torch = self._torch
+        with torch.no_grad():
+            pred = self.model(torch.from_numpy(batch).to(self.device, non_blocking=True))[0]
+        preds = self._nms(pred, conf_threshold, iou_threshold, classes=None, agnostic=False)
+        return [det.cpu().numpy() for det in preds]
+
+
+class OnnxBackend:
+    """YOLOv7 ONNX graph run with ONNX Runtime."""
+
+    name = "onnx"
+
+    def __init__(self, weights: str, device: str, threads: int = 0):
+        self.weights = weights
+        providers = ["CPUExecutionProvider"]
+        if device != "cpu":
+            if "CUDAExecutionProvider" in ort.get_available_providers():
+                providers.insert(0, "CUDAExecutionProvider")
+            else:
+                print(f"Warning: CUDA not available. Switching from device '{device}' to 'cpu'")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(weights, options, providers=providers)
+        self.device = (
+            "cuda" if self.session.get_providers()[0] == "CUDAExecutionProvider" else "cpu"
+        )
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if model_input.type == "tensor(float16)" else np.float32
+        batch_dim, _, height, width = model_input.shape
+        # Exported graphs bake in the Detect grid, so H x W is normally fixed
+        self.input_shape = (
+            (height, width) if isinstance(height, int) and isinstance(width, int) else None
+        )
+        # Graphs exported without a dynamic batch axis are run in chunks
+        self.max_batch = batch_dim if isinstance(batch_dim, int) else None
+
+        output = self.session.get_outputs()[0]
+        if len(output.shape) != 3:
+            raise ValueError(
+                f"{weights}: expected a (batch, anchors, 5 + classes) output; "
+                "export with scripts/export_onnx.py (Detect grid included)"
+            )
+
+    def __call__(
+        self, batch: np.ndarray, conf_threshold: float, iou_threshold: float
+    ) -> List[np.ndarray]:
+        batch = batch.astype(self.input_dtype, copy=False)
+        step = self.max_batch or len(batch)
+        preds = []
+        for start in range(0, len(batch), step):
+            chunk = batch[start : start + step]
+            if len(chunk) < step and self.max_batch:
+                # A fixed batch axis takes full chunks only: pad the last one
+                padded = np.zeros((step,) + chunk.shape[1:], dtype=chunk.dtype)
+                padded[: len(chunk)] = chunk
+                pred = self.session.run(None, {self.input_name: padded})[0][: len(chunk)]
+            else:
+                pred = self.session.run(None, {self.input_name: chunk})[0]
+            preds.extend(
+                ops.non_max_suppression(
+                    pred.astype(np.float32, copy=False), conf_threshold, iou_threshold
+                )
+            )
+        return preds
+
+
+def _import_yolov7():
+    """Import the YOLOv7 helpers used by the torch backend, or None."""
+    if YOLOV7_PATH.exists() and str(YOLOV7_PATH) not in sys.path:
+        sys.path.insert(0, str(YOLOV7_PATH))
+    try:
+        from models.experimental import attempt_load
+        from utils.general import non_max_suppression
+        from utils.torch_utils import select_device
+    except ImportError:
+        print("Warning: YOLOv7 modules not found. Ensure external/yolov7 is cloned.")
+        return None
+
+    return SimpleNamespace(
+        attempt_load=attempt_load,
+        non_max_suppression=non_max_suppression,
+        select_device=select_device,
+    )
@@ -0,0 +1,374 @@
+"""Server-side camera ingestion driven by the camera table.
+
+Every active camera with an ``rtsp_url`` gets a ``CameraReader``: one thread
+decodes the stream with OpenCV and keeps only the newest sampled frame, and
+a second thread runs detection, tracking and OCR on it and persists finished
+plate tracks. Decoding never waits on inference, so a slow detector drops
+stale frames instead of building up a backlog in the RTSP buffer.
+
+Streams that fail to open or stop delivering frames are reopened with
+exponential backoff. ``CameraIngestService`` reloads the camera list
+periodically and starts, restarts or stops readers to match it. Any source
+``cv2.VideoCapture`` accepts works as ``rtsp_url``; local files are read at
+their native frame rate (and looped) so they can stand in for a camera.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backend.gate import MotionGate, Roi, parse_roi
+from backend.tracker import PlateTracker
+
+# One detection result list per image (e.g. InferenceBroker.detect)
+DetectFn = Callable[[List[np.ndarray]], List[List[Dict[str, Any]]]]
+# (crops) -> [(text, confidence)] (e.g. PlateDetector.run_ocr_batch)
+OcrFn = Callable[[List[Any]], List[Tuple[str, float]]]
+# (track records with plate_crop, camera_id) -> None
+Sink = Callable[[List[Dict[str, Any]], str], None]
+# (camera ROI) -> motion gate for that camera
+GateFactory = Callable[[Optional[Roi]], MotionGate]
+
+CONNECTING = "connecting"
+STREAMING = "streaming"
+BACKOFF = "backoff"
+STOPPED = "stopped"
+
+
+class CameraReader:
+    """Decode one camera stream and run sampled frames through the detector."""
+
+    def __init__(
+        self,
+        camera_id: str,
+        url: str,
+        detect: DetectFn,
+        ocr: OcrFn,
+        sink: Sink,
+        sample_fps: float = 2.0,
+        min_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        tracker: Optional[PlateTracker] = None,
+        gate: Optional[MotionGate] = None,
+    ):
+        """Initialize reader.
+
+        Args:
+            camera_id: Camera identifier stored with detections.
+            url: RTSP URL (or any other ``cv2.VideoCapture`` source).
+            detect: Batched detection without OCR.
+            ocr: Batched OCR of plate crops.
+            sink: Persists finished track records.
+            sample_fps: Frames per second sent to the detector (0: every frame).
+            min_backoff: First reconnect delay in seconds, doubled per failure.
+            max_backoff: Longest reconnect delay in seconds.
+            tracker: Plate tracker for this camera.
+            gate: Motion gate; sampled frames it rejects skip detection.
+        """
+        self.camera_id = camera_id
+        self.url = url
+        self.detect = detect
+        self.ocr = ocr
+        self.sink = sink
+        self.sample_fps = sample_fps
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.tracker = tracker or PlateTracker()
+        self.gate = gate
+        self.roi = gate.roi if gate is not None else None
+
+        self.state = STOPPED
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.detections = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self.last_frame_at: Optional[float] = None
+
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        # Newest sampled frame waiting for detection: (frame, timestamp)
+        self._latest: Optional[Tuple[np.ndarray, float]] = None
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the decode and processing threads."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._read, name=f"ingest-read-{self.camera_id}", daemon=True),
+            threading.Thread(
+                target=self._process, name=f"ingest-detect-{self.camera_id}", daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop both threads and persist the camera's open tracks."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.state = STOPPED
+        self._persist(self.tracker.flush())
+
+    def status(self) -> Dict[str, Any]:
+        """Reader state and counters."""
+        return {
+            "camera_id": self.camera_id,
+            "state": self.state,
+            "sample_fps": self.sample_fps,
+            "frames_read": self.frames_read,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "detections": self.detections,
+            "reconnects": self.reconnects,
+            "gate": self.gate.stats() if self.gate is not None else None,
+            "last_error": self.last_error,
+            "last_frame_at": self.last_frame_at,
+        }
+
+    # -- decode thread -------------------------------------------------------
+
+    def _read(self):
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            self.state = CONNECTING
+            cap = cv2.VideoCapture(self.url)
+            try:
+                if not cap.isOpened():
+                    self.last_error = "Could not open stream"
+                elif self._stream(cap):
+                    # Frames arrived, so the next failure starts a fresh backoff
+                    backoff = self.min_backoff
+            finally:
+                cap.release()
+            if self._stop.is_set():
+                break
+
+            self.state = BACKOFF
+            self.reconnects += 1
+            print(f"Warning: camera {self.camera_id} disconnected, retrying in {backoff:.0f}s")
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _stream(self, cap: cv2.VideoCapture) -> bool:
+        """Read until the stream fails or the reader stops. Returns True if any frame arrived."""
+        # Local files have no clock of their own: play them back in real time
+        native_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        realtime = os.path.isfile(self.url)
+        interval = 1.0 / self.sample_fps if self.sample_fps > 0 else 0.0
+        started = time.monotonic()
+        next_sample = 0.0
+        frames = 0
+
+        while not self._stop.is_set():
+            # grab() without retrieve() skips decoding frames that are not sampled
+            if not cap.grab():
+                self.last_error = "Stream ended" if frames else "No frames received"
+                return frames > 0
+            frames += 1
+            self.frames_read += 1
+            self.state = STREAMING
+            now = time.monotonic()
+            if realtime:
+                due = started + frames / native_fps
+                if due > now:
+                    time.sleep(due - now)
+                    now = due
+
+            elapsed = now - started
+            if elapsed < next_sample:
+                continue
+            next_sample += interval
+            if next_sample < elapsed:
+                # Fell behind the sampling clock: resume from now instead of catching up
+                next_sample = elapsed + interval
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+
+            self.last_frame_at = time.time()
+            with self._cond:
+                if self._latest is not None:
+                    self.frames_dropped += 1
+                self._latest = (frame, self.last_frame_at)
+                self._cond.notify()
+        return frames > 0
+
+    # -- processing thread ---------------------------------------------------
+
+    def _process(self):
+        while True:
+            with self._cond:
+                while self._latest is None and not self._stop.is_set():
+                    # Wake up now and then so idle tracks still get finished
+                    if not self._cond.wait(timeout=self.tracker.max_age):
+                        break
+                if self._stop.is_set():
+                    return
+                item, self._latest = self._latest, None
+
+            try:
+                if item is None:
+                    self._persist(self.tracker.expire(time.time()))
+                else:
+                    self._detect(*item)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Warning: camera {self.camera_id} processing failed: {e}")
+
+    def _detect(self, frame: np.ndarray, timestamp: float):
+        if self.gate is not None and not self.gate.check(frame):
+            # Nothing moved: no detection, but tracks still age out
+            self._persist(self.tracker.expire(timestamp))
+            return
+        results = self.detect([frame])[0]
+        requests, finished = self.tracker.update(results, timestamp)
+        if requests:
+            self.tracker.apply_ocr(requests, self.ocr([r["plate_crop"] for _, r in requests]))
+        self.frames_processed += 1
+        self._persist(finished)
+
+    def _persist(self, tracks):
+        records = [track.to_record() for track in tracks]
+        if records:
+            self.sink(records, self.camera_id)
+            self.detections += len(records)
+
+
+class CameraIngestService:
+    """Keep one ``CameraReader`` running per active camera."""
+
+    def __init__(
+        self,
+        load_cameras: Callable[[], List[Dict[str, Any]]],
+        detect: DetectFn,
+        ocr: OcrFn,
+        sink: Sink,
+        default_sample_fps: float = 2.0,
+        refresh_interval: float = 30.0,
+        max_backoff: float = 30.0,
+        gate_factory: Optional[GateFactory] = None,
+    ):
+        """Initialize service.
+
+        Args:
+            load_cameras: Returns camera dicts (``Camera.to_dict`` shape) with
+                ``camera_id``, ``rtsp_url``, ``is_active`` and ``sample_fps``.
+            detect: Batched detection without OCR, shared by all cameras.
+            ocr: Batched OCR of plate crops.
+            sink: Persists finished track records for a camera.
+            default_sample_fps: Sampling rate for cameras without ``sample_fps``.
+            refresh_interval: Seconds between camera list reloads.
+            max_backoff: Longest reconnect delay in seconds.
+            gate_factory: Creates a camera's motion gate from its ``roi``
+                (None: no gating).
+        """
+        self.load_cameras = load_cameras
+        self.detect = detect
+        self.ocr = ocr
+        self.sink = sink
+        self.default_sample_fps = default_sample_fps
+        self.refresh_interval = refresh_interval
+        self.max_backoff = max_backoff
+        self.gate_factory = gate_factory
+
+        self.readers: Dict[str, CameraReader] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start readers for the current cameras and the periodic refresh."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the refresh loop and every reader."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+        with self._lock:
+            readers, self.readers = list(self.readers.values()), {}
+        for reader in readers:
+            reader.stop()
+
+    def refresh(self):
+        """Start, restart or stop readers to match the camera list."""
+        with self._refresh_lock:
+            self._sync()
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Status of every running reader."""
+        with self._lock:
+            return [reader.status() for reader in self.readers.values()]
+
+    def _sync(self):
+        wanted = {}
+        for camera in self.load_cameras():
+            if camera.get("is_active") and camera.get("rtsp_url"):
+                sample_fps = camera.get("sample_fps")
+                if sample_fps is None:
+                    sample_fps = self.default_sample_fps
+                roi = None
+                if self.gate_factory is not None:
+                    try:
+                        roi = parse_roi(camera.get("roi"))
+                    except ValueError as e:
+                        print(f"Warning: ignoring roi of camera {camera['camera_id']}: {e}")
+                wanted[camera["camera_id"]] = (camera["rtsp_url"], float(sample_fps), roi)
+
+        with self._lock:
+            stale = [
+                reader
+                for camera_id, reader in self.readers.items()
+                if (reader.url, reader.sample_fps, reader.roi) != wanted.get(camera_id)
+            ]
+            for reader in stale:
+                del self.readers[reader.camera_id]
+        for reader in stale:
+            print(f"Stopping ingest for camera {reader.camera_id}")
+            reader.stop()
+
+        with self._lock:
+            for camera_id, (url, sample_fps, roi) in wanted.items():
+                if camera_id in self.readers:
+                    continue
+                print(f"Starting ingest for camera {camera_id} at {sample_fps:g} fps")
+                reader = CameraReader(
+                    camera_id,
+                    url,
+                    self.detect,
+                    self.ocr,
+                    self.sink,
+                    sample_fps=sample_fps,
+                    max_backoff=self.max_backoff,
+                    gate=self.gate_factory(roi) if self.gate_factory else None,
+                )
+                self.readers[camera_id] = reader
+                reader.start()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Warning: camera list refresh failed: {e}")
+            self._stop.wait(self.refresh_interval)
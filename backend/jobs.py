@@ -0,0 +1,376 @@
+"""Background video jobs with persisted progress.
+
+Video uploads are queued and processed by a local pool of worker threads
+instead of on the request thread. Each job's state is written to
+``<jobs_dir>/<job_id>.json`` after every committed batch, so jobs that were
+queued or running when the process stopped are picked up again on restart,
+resuming from the last committed frame. Jobs whose upload was still arriving
+(``backend.upload``) fail instead, since the rest of the video is gone.
+
+Finished jobs are kept for ``retention_seconds`` and at most ``max_finished``
+of them; older ones are forgotten and their state files and uploads removed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+
+from backend.upload import StreamingUpload
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Signature of the function that processes a job: (job, on_progress, cancel) -> summary
+JobRunner = Callable[
+    [Dict[str, Any], Callable[[int, int, List[Dict[str, Any]]], None], threading.Event],
+    Dict[str, Any],
+]
+
+
+class VideoJobManager:
+    """Queue, run and track video processing jobs."""
+
+    def __init__(
+        self,
+        jobs_dir: Path,
+        runner: JobRunner,
+        workers: int = 1,
+        retention_seconds: Optional[float] = 86400.0,
+        max_finished: Optional[int] = 1000,
+        max_plates: int = 1000,
+    ):
+        """Initialize manager.
+
+        Args:
+            jobs_dir: Directory holding one JSON state file per job.
+            runner: Processes one job. Called with the job dict, a progress
+                callback ``(committed_frame, done_frame, records)`` and a cancel
+                event, and returns the ``VideoPipeline.run`` summary. It must
+                resume from ``job["committed_frame"] + 1``.
+            workers: Number of worker threads.
+            retention_seconds: Forget finished jobs this long after they
+                finished (None: no age limit).
+            max_finished: Most finished jobs kept; the oldest are forgotten
+                first (None: no limit).
+            max_plates: Most distinct plate texts listed in a job's ``plates``.
+        """
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self.max_finished = max_finished
+        self.max_plates = max_plates
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start the worker threads and re-queue unfinished jobs from disk."""
+        if self._threads:
+            return
+
+        for state_file in sorted(self.jobs_dir.glob("*.json")):
+            try:
+                job = json.loads(state_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read job state {state_file}: {e}")
+                continue
+            self._jobs[job["id"]] = job
+            if job.get("uploading") and job["status"] in (QUEUED, RUNNING):
+                job["uploading"] = False
+                job["error"] = "Upload interrupted by a restart"
+                self._finish(job, FAILED)
+            elif job["status"] in (QUEUED, RUNNING):
+                if job["status"] == RUNNING:
+                    job["resumed"] = job.get("resumed", 0) + 1
+                    resume_frame = job["committed_frame"] + 1
+                    print(f"Resuming video job {job['id']} at frame {resume_frame}")
+                job["status"] = QUEUED
+                self._save(job)
+                self._enqueue(job["id"])
+        with self._lock:
+            self._prune()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"video-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(
+        self,
+        video_path: Path,
+        params: Dict[str, Any],
+        job_id: Optional[str] = None,
+        upload: Optional[StreamingUpload] = None,
+    ) -> Dict[str, Any]:
+        """Queue a video for processing.
+
+        Args:
+            video_path: Uploaded video. Deleted once the job finishes.
+            params: Runner parameters (e.g. camera_id, sample_rate).
+            job_id: Optional id, e.g. one already used to name the upload.
+            upload: Upload still being written to ``video_path``; the runner
+                finds it as ``job["_upload"]``. Call ``finish_upload`` when
+                it is complete.
+
+        Returns:
+            Public job dict.
+        """
+        job = {
+            "id": job_id or uuid.uuid4().hex,
+            "status": QUEUED,
+            "video_path": str(video_path),
+            "params": params,
+            "total_frames": _count_frames(str(video_path)) if upload is None else 0,
+            "uploading": upload is not None,
+            "committed_frame": -1,
+            "frames_done": 0,
+            "detections": 0,
+            "plates": [],
+            "resumed": 0,
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        if upload is not None:
+            job["_upload"] = upload
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._save(job)
+        self._enqueue(job["id"])
+        return self.to_dict(job)
+
+    def finish_upload(self, job_id: str):
+        """Record that a job's streaming upload is complete (or failed)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or "_upload" not in job:
+                return
+            upload = job["_upload"]
+            job["uploading"] = False
+            job["upload"] = upload.status()
+            if upload.error is None and not job["total_frames"]:
+                job["total_frames"] = _count_frames(job["video_path"])
+            if upload.error is not None and job["status"] == QUEUED:
+                job["error"] = f"Upload failed: {upload.error}"
+                self._finish(job, FAILED)
+            else:
+                if job["status"] not in (QUEUED, RUNNING):
+                    # Cancelled while the upload was still arriving
+                    job.pop("_upload")
+                self._save(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get public job dict, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self.to_dict(job) if job else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job.
+
+        Running jobs stop decoding and finish persisting frames already in
+        flight before being marked cancelled.
+
+        Returns:
+            Public job dict, or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == QUEUED:
+                self._finish(job, CANCELLED)
+            elif job["status"] == RUNNING:
+                self._cancel_events[job_id].set()
+            return self.to_dict(job)
+
+    @staticmethod
+    def to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert job state to API response dict (with progress and ETA)."""
+        total = job.get("total_frames") or 0
+        done = job["frames_done"]
+        eta = None
+        rate = job.get("_rate")
+        if job["status"] == RUNNING and rate and total:
+            eta = round(max(0, total - done) / rate, 1)
+        time_to_first_detection = None
+        if job.get("first_detection_at"):
+            time_to_first_detection = round(
+                (
+                    datetime.fromisoformat(job["first_detection_at"])
+                    - datetime.fromisoformat(job["created_at"])
+                ).total_seconds(),
+                3,
+            )
+        upload = job.get("_upload")
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "camera_id": job["params"].get("camera_id"),
+            "total_frames": total,
+            "frames_done": done,
+            "progress": round(min(1.0, done / total), 4) if total else None,
+            "eta_seconds": eta,
+            "detections": job["detections"],
+            # Each stored detection is one plate track
+            "unique_plates": job["detections"],
+            "plates": job["plates"],
+            "resumed": job.get("resumed", 0),
+            # Seconds from submission (the start of a streaming upload) to the
+            # first stored detection
+            "time_to_first_detection": time_to_first_detection,
+            "upload": upload.status() if upload is not None else job.get("upload"),
+            "result": job["result"],
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    # -- internals -----------------------------------------------------------
+
+    def _enqueue(self, job_id: str):
+        self._cancel_events[job_id] = threading.Event()
+        self._queue.put(job_id)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != QUEUED:
+                    continue
+                job["status"] = RUNNING
+                job["started_at"] = job["started_at"] or datetime.utcnow().isoformat()
+                self._save(job)
+                cancel = self._cancel_events[job_id]
+            self._run(job, cancel)
+
+    def _run(self, job: Dict[str, Any], cancel: threading.Event):
+        run_started = time.monotonic()
+        frames_at_start = job["frames_done"]
+        plates = set(job["plates"])
+
+        def on_progress(committed_frame: int, done_frame: int, records: List[Dict[str, Any]]):
+            with self._lock:
+                job["committed_frame"] = committed_frame
+                job["frames_done"] = max(job["frames_done"], done_frame + 1)
+                job["detections"] += len(records)
+                if records and not job.get("first_detection_at"):
+                    job["first_detection_at"] = datetime.utcnow().isoformat()
+                # Only new plates re-sort the list, and only up to max_plates of them
+                new_plates = {r["plate_text"] for r in records if r.get("plate_text")} - plates
+                if new_plates and len(plates) < self.max_plates:
+                    plates.update(sorted(new_plates)[: self.max_plates - len(plates)])
+                    job["plates"] = sorted(plates)
+                elapsed = time.monotonic() - run_started
+                if elapsed > 0:
+                    job["_rate"] = (job["frames_done"] - frames_at_start) / elapsed
+                self._save(job)
+
+        try:
+            summary = self.runner(job, on_progress, cancel)
+        except Exception as e:
+            print(f"Video job {job['id']} failed: {e}")
+            with self._lock:
+                job["error"] = str(e)
+                self._finish(job, FAILED)
+            return
+
+        with self._lock:
+            job["result"] = {
+                "total_frames": summary["total_frames"],
+                "processed_frames": summary["processed_frames"],
+                "tracks": summary["tracks"],
+                "pipeline": summary["pipeline"],
+                "effective_stride": summary["effective_stride"],
+            }
+            for key in ("gate", "sampling", "first_detection_seconds"):
+                if key in summary:
+                    job["result"][key] = summary[key]
+            if summary["cancelled"]:
+                self._finish(job, CANCELLED)
+            else:
+                job["frames_done"] = job["total_frames"] = summary["total_frames"]
+                self._finish(job, COMPLETED)
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        """Mark a job finished and remove its upload. Caller holds the lock."""
+        job["status"] = status
+        job["finished_at"] = datetime.utcnow().isoformat()
+        job.pop("_rate", None)
+        if "_upload" in job and not job["uploading"]:
+            job.pop("_upload")
+        self._save(job)
+        try:
+            Path(job["video_path"]).unlink(missing_ok=True)
+        except OSError:
+            pass
+        self._prune()
+
+    def _prune(self):
+        """Forget finished jobs past the age or count limit. Caller holds the lock."""
+        finished = sorted(
+            (
+                job
+                for job in self._jobs.values()
+                if job["status"] not in (QUEUED, RUNNING) and not job.get("uploading")
+            ),
+            key=lambda job: job.get("finished_at") or job["created_at"],
+        )
+        expired = []
+        if self.max_finished is not None and len(finished) > self.max_finished:
+            expired = finished[: len(finished) - self.max_finished]
+            finished = finished[len(expired) :]
+        if self.retention_seconds is not None:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+            expired += [
+                job
+                for job in finished
+                if datetime.fromisoformat(job.get("finished_at") or job["created_at"]) < cutoff
+            ]
+        for job in expired:
+            del self._jobs[job["id"]]
+            self._cancel_events.pop(job["id"], None)
+            for path in (self.jobs_dir / f"{job['id']}.json", Path(job["video_path"])):
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def _save(self, job: Dict[str, Any]):
+        """Atomically write job state to disk. Caller holds the lock."""
+        state = {k: v for k, v in job.items() if not k.startswith("_")}
+        path = self.jobs_dir / f"{job['id']}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _count_frames(video_path: str) -> int:
+    """Frame count from the container header (0 if unknown)."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+    finally:
+        cap.release()
@@ -0,0 +1,238 @@
+"""Live WebSocket frame protocol helpers.
+
+Clients send ``video_frame`` events whose ``frame`` (or ``frames``) values are
+raw JPEG/WebP bytes, which Socket.IO carries as binary attachments instead of
+base64 text. Base64 strings are still accepted for older clients. An optional
+integer ``seq`` numbers the frames and is echoed in each result.
+
+Results are JSON by default. With ``"format": "msgpack"`` each
+``detection_result`` is a single msgpack-encoded binary payload, and plate
+crops are sent as raw JPEG bytes rather than base64.
+
+``LiveScheduler`` keeps live latency bounded when the detector is slower than
+the client: only the newest pending payload per stream is processed and
+older ones are dropped without being decoded.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from backend.crops import CropRef
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    print("Warning: msgpack not installed. Live results will be sent as JSON.")
+
+
+def decode_frame(frame: Union[bytes, bytearray, memoryview, str]) -> Optional[np.ndarray]:
+    """Decode one frame (binary image bytes or base64 string) to a BGR image.
+
+    Returns:
+        Image, or None if the data is not a decodable image.
+    """
+    if isinstance(frame, str):
+        try:
+            frame = base64.b64decode(frame)
+        except (binascii.Error, ValueError):
+            return None
+    if not isinstance(frame, (bytes, bytearray, memoryview)) or not len(frame):
+        return None
+    return cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+
+
+def parse_frames(data: Dict[str, Any], max_frames: int) -> Tuple[List[np.ndarray], Optional[str]]:
+    """Decode the frames of a ``video_frame`` payload.
+
+    Args:
+        data: Event payload with ``frame`` or ``frames``.
+        max_frames: Most frames a payload may carry.
+
+    Returns:
+        (images, error): decoded images, or an error message if any frame is
+        missing or invalid, or there are more than ``max_frames``.
+    """
+    frames = data.get("frames") or [data.get("frame")]
+    if not all(frames):
+        return [], "No frame provided"
+    if len(frames) > max_frames:
+        return [], f"Too many frames: {len(frames)} sent, at most {max_frames} per payload"
+
+    images = []
+    for frame in frames:
+        img = decode_frame(frame)
+        if img is None:
+            return [], "Invalid frame data"
+        images.append(img)
+    return images, None
+
+
+def result_format(data: Dict[str, Any]) -> str:
+    """Requested result format, falling back to JSON without msgpack."""
+    fmt = data.get("format", "json")
+    if fmt == "msgpack" and MSGPACK_AVAILABLE:
+        return "msgpack"
+    return "json"
+
+
+def crop_payload(crop: CropRef, fmt: str) -> Union[bytes, str, None]:
+    """Plate crop for a result: raw JPEG bytes for msgpack, base64 for JSON."""
+    return crop.jpeg() if fmt == "msgpack" else crop.base64()
+
+
+def encode_result(payload: Dict[str, Any], fmt: str) -> Union[Dict[str, Any], bytes]:
+    """Encode a ``detection_result`` payload in the requested format."""
+    if fmt == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True)
+    return payload
+
+
+class _Stream:
+    """Scheduling state of one live stream."""
+
+    __slots__ = ("pending", "pending_frames", "busy", "dropped", "dropped_total", "ema", "last")
+
+    def __init__(self):
+        self.pending: Optional[Dict[str, Any]] = None
+        self.pending_frames = 0
+        self.busy = False
+        self.dropped = 0
+        self.dropped_total = 0
+        # Smoothed processing time (seconds) and start time of the last payload
+        self.ema: Optional[float] = None
+        self.last = 0.0
+
+
+class LiveScheduler:
+    """Latest-frame-wins scheduling of live payloads per stream.
+
+    Socket.IO handles events concurrently, so without scheduling every frame
+    is detected in arrival order and a backlog builds up whenever inference is
+    slower than the client's frame rate. Here the handler that finds a stream
+    idle becomes its worker and processes payloads until none are pending;
+    handlers arriving meanwhile only replace the pending payload, so the
+    stream runs at the rate inference allows and stale frames are dropped.
+
+    Usage::
+
+        if scheduler.submit(key, data):
+            while (item := scheduler.next(key)) is not None:
+                data, dropped = item
+                start = time.perf_counter()
+                ...  # detect and emit
+                scheduler.record(key, time.perf_counter() - start)
+    """
+
+    def __init__(self, max_fps: float = 0.0, smoothing: float = 0.2):
+        """Initialize scheduler.
+
+        Args:
+            max_fps: Cap on payloads processed per second per stream (0: no cap).
+            smoothing: Weight of the newest sample in the processing time average.
+        """
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.smoothing = smoothing
+        self._streams: Dict[Hashable, _Stream] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, data: Dict[str, Any]) -> bool:
+        """Queue a payload as the stream's newest, dropping any older pending one.
+
+        Returns:
+            True if the caller should process the stream (it was idle).
+        """
+        frames = data.get("frames")
+        n = len(frames) if isinstance(frames, list) and frames else 1
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = _Stream()
+            if stream.pending is not None:
+                stream.dropped += stream.pending_frames
+                stream.dropped_total += stream.pending_frames
+            stream.pending, stream.pending_frames = data, n
+            if stream.busy:
+                return False
+            stream.busy = True
+            return True
+
+    def next(self, key: Hashable) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Take the stream's newest payload, waiting out the fps cap.
+
+        Returns:
+            (payload, frames dropped since the previous payload), or None when
+            nothing is pending; the stream is then idle again.
+        """
+        while True:
+            with self._lock:
+                stream = self._streams.get(key)
+                if stream is None or stream.pending is None:
+                    if stream is not None:
+                        stream.busy = False
+                    return None
+                wait = stream.last + self.min_interval - time.monotonic()
+                if wait <= 0:
+                    data, dropped = stream.pending, stream.dropped
+                    stream.pending, stream.pending_frames, stream.dropped = None, 0, 0
+                    stream.last = time.monotonic()
+                    return data, dropped
+            # Newer frames arriving meanwhile replace the pending one
+            time.sleep(wait)
+
+    def record(self, key: Hashable, seconds: float):
+        """Record how long processing one payload took."""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                if stream.ema is None:
+                    stream.ema = seconds
+                else:
+                    stream.ema += self.smoothing * (seconds - stream.ema)
+
+    def stats(self, key: Hashable) -> Dict[str, Any]:
+        """Dropped-frame total and processing rate of a stream.
+
+        ``processing_fps`` is the rate the stream can sustain given measured
+        processing time and the fps cap; clients can send at this rate to avoid
+        sending frames that will be dropped.
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                return {"dropped_total": 0, "processing_ms": None, "processing_fps": None}
+            interval = max(stream.ema or 0.0, self.min_interval)
+            return {
+                "dropped_total": stream.dropped_total,
+                "processing_ms": None if stream.ema is None else round(stream.ema * 1000, 1),
+                "processing_fps": round(1.0 / interval, 2) if interval > 0 else None,
+            }
+
+    def streams(self) -> List[Hashable]:
+        """Keys of the streams currently known."""
+        with self._lock:
+            return list(self._streams)
+
+    def discard(self, owner: Hashable) -> List[Hashable]:
+        """Forget every stream whose key is ``owner`` or an (owner, ...) tuple.
+
+        Returns:
+            The keys of the forgotten streams.
+        """
+        discarded = []
+        with self._lock:
+            for key in list(self._streams):
+                if key == owner or (isinstance(key, tuple) and key and key[0] == owner):
+                    del self._streams[key]
+                    discarded.append(key)
+        return discarded
@@ -1,7 +1,12 @@
 """Database models for plate detection system."""
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, func, inspect, text
+from sqlalchemy.orm import column_property, load_only
 from datetime import datetime
+import json
+
+from backend.crop_store import crop_url
 
 db = SQLAlchemy()
 
@@ -10,6 +15,13 @@ class Detection(db.Model):
     """Model for storing detected license plates."""
 
     __tablename__ = "detections"
+    # History queries filter by camera or plate over a time range
+    __table_args__ = (
+        db.Index("ix_detections_camera_created", "camera_id", "created_at"),
+        db.Index("ix_detections_plate_created", "plate_number", "created_at"),
+        # The crop sweep looks up which stored crops rows still reference
+        db.Index("ix_detections_plate_image", "plate_image"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     plate_number = db.Column(db.String(20))
@@ -19,28 +31,101 @@ class Detection(db.Model):
     bbox_y1 = db.Column(db.Float)
     bbox_x2 = db.Column(db.Float)
     bbox_y2 = db.Column(db.Float)
+    # Crop store key of the plate crop (older rows: base64 JPEG)
     plate_image = db.Column(db.String(255))
+    # Enough of plate_image to hold a key; lists read this instead of legacy payloads
+    plate_image_key = column_property(func.substr(plate_image, 1, 64))
+    # Plate track this detection summarizes (one row per track)
+    track_id = db.Column(db.String(32))
+    first_seen = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime)
+    frames_seen = db.Column(db.Integer)
+    # When the detection was recorded (UTC)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        """Convert model to dictionary."""
+    @staticmethod
+    def row_from_result(result, camera_id, plate_image):
+        """Column values for a detection, e.g. for a bulk ``insert(Detection)``.
+
+        Takes a PlateDetector result or PlateTracker record. Track records also
+        carry ``track_id``, ``frames_seen`` and epoch-second ``first_seen``/
+        ``last_seen`` times.
+        """
+        bbox = result.get("bbox", [0, 0, 0, 0])
+        try:
+            x1, y1, x2, y2 = (float(v) for v in bbox[:4])
+        except Exception:
+            x1 = y1 = x2 = y2 = 0.0
+        first_seen = result.get("first_seen")
+        last_seen = result.get("last_seen")
         return {
-            "id": self.id,
-            "plate_number": self.plate_number,
-            "confidence": float(self.confidence),
-            "camera_id": self.camera_id,
-            "bbox": {
-                "x1": self.bbox_x1,
-                "y1": self.bbox_y1,
-                "x2": self.bbox_x2,
-                "y2": self.bbox_y2,
-            },
-            "plate_image": self.plate_image,
+            "plate_number": result.get("plate_text"),
+            "confidence": float(result.get("confidence", 0.0)),
+            "camera_id": camera_id,
+            "bbox_x1": x1,
+            "bbox_y1": y1,
+            "bbox_x2": x2,
+            "bbox_y2": y2,
+            "plate_image": plate_image,
+            "track_id": result.get("track_id"),
+            "first_seen": datetime.utcfromtimestamp(first_seen) if first_seen is not None else None,
+            "last_seen": datetime.utcfromtimestamp(last_seen) if last_seen is not None else None,
+            "frames_seen": result.get("frames_seen"),
+            "created_at": datetime.utcnow(),
         }
 
+    @classmethod
+    def from_result(cls, result, camera_id, plate_image):
+        """Create a detection from a PlateDetector result or PlateTracker record."""
+        return cls(**cls.row_from_result(result, camera_id, plate_image))
+
+    def to_dict(self, fields=None):
+        """Convert model to dictionary.
+
+        Args:
+            fields: Fields to include (default: all of ``DETECTION_FIELDS``).
+                Only their columns are accessed, so rows loaded through
+                ``Detection.load_fields`` are not lazy-loaded further.
+        """
+        return {field: DETECTION_FIELDS[field][1](self) for field in fields or DETECTION_FIELDS}
+
+    @staticmethod
+    def load_fields(query, fields):
+        """Restrict a detection query to the columns ``fields`` read."""
+        columns = {"id"}.union(*(DETECTION_FIELDS[field][0] for field in fields))
+        return query.options(load_only(*(getattr(Detection, c) for c in sorted(columns))))
+
     def __repr__(self):
         return f"<Detection {self.id}: {self.plate_number}>"
 
 
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# API fields of a detection: (columns read, value)
+DETECTION_FIELDS = {
+    "id": (("id",), lambda d: d.id),
+    "plate_number": (("plate_number",), lambda d: d.plate_number),
+    "confidence": (("confidence",), lambda d: float(d.confidence)),
+    "camera_id": (("camera_id",), lambda d: d.camera_id),
+    "bbox": (
+        ("bbox_x1", "bbox_y1", "bbox_x2", "bbox_y2"),
+        lambda d: {"x1": d.bbox_x1, "y1": d.bbox_y1, "x2": d.bbox_x2, "y2": d.bbox_y2},
+    ),
+    "plate_image": (("plate_image",), lambda d: d.plate_image),
+    "plate_image_url": (("plate_image_key",), lambda d: crop_url(d.plate_image_key)),
+    "track_id": (("track_id",), lambda d: d.track_id),
+    "first_seen": (("first_seen",), lambda d: _isoformat(d.first_seen)),
+    "last_seen": (("last_seen",), lambda d: _isoformat(d.last_seen)),
+    "frames_seen": (("frames_seen",), lambda d: d.frames_seen),
+    "created_at": (("created_at",), lambda d: _isoformat(d.created_at)),
+}
+
+# Fields listed by default: everything but the raw crop value
+DEFAULT_LIST_FIELDS = tuple(f for f in DETECTION_FIELDS if f != "plate_image")
+
+
 class Camera(db.Model):
     """Model for camera configuration (optional)."""
 
@@ -52,6 +137,10 @@ class Camera(db.Model):
     location = db.Column(db.String(200))
     rtsp_url = db.Column(db.String(500))
     is_active = db.Column(db.Boolean, default=True)
+    # Frames per second the ingest service sends to the detector (None: default)
+    sample_fps = db.Column(db.Float)
+    # Motion gate region of interest: JSON polygon in 0..1 coordinates (None: whole frame)
+    roi = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -63,8 +152,62 @@ class Camera(db.Model):
             "location": self.location,
             "rtsp_url": self.rtsp_url,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat(),
+            "sample_fps": self.sample_fps,
+            "roi": json.loads(self.roi) if self.roi else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
     def __repr__(self):
         return f"<Camera {self.camera_id}: {self.name}>"
+
+
+# Time columns added to existing tables are filled from the first non-null of these
+# columns (those the table has), else with the time of the upgrade: detections from
+# before the schema had any time column get that instead, so date filters still list
+# them (their real time is unknown)
+BACKFILL = {("detections", "created_at"): ("last_seen", "first_seen")}
+
+
+def ensure_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    ``db.create_all()`` only creates missing tables, so existing databases get
+    new (nullable) columns through ``ALTER TABLE``, filled as ``BACKFILL``
+    describes, and missing indexes. Call inside an app context after
+    ``db.create_all()``.
+    """
+    inspector = inspect(db.engine)
+    for model in (Detection, Camera):
+        table = model.__table__
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+                if (table.name, column.name) in BACKFILL:
+                    sources = [
+                        name for name in BACKFILL[table.name, column.name] if name in existing
+                    ]
+                    value = (
+                        f"COALESCE({', '.join(sources)}, :upgraded_at)"
+                        if sources
+                        else ":upgraded_at"
+                    )
+                    conn.execute(
+                        text(f"UPDATE {table.name} SET {column.name} = {value}").bindparams(
+                            bindparam("upgraded_at", datetime.utcnow(), type_=column.type)
+                        )
+                    )
+            existing.add(column.name)
+            print(f"Added column {table.name}.{column.name}")
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                # Builds over existing rows once, which takes a while on large tables
+                index.create(db.engine)
+                print(f"Created index {index.name}")
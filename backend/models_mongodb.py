@@ -7,13 +7,28 @@ Switch between SQL and MongoDB by changing imports in app.py.
 from datetime import datetime
 from bson import ObjectId
 
+from backend.crop_store import crop_url
+
 
 class DetectionMongo:
     """Model for storing detected license plates in MongoDB."""
 
     @staticmethod
-    def create(plate_number, confidence, camera_id, bbox, plate_image):
-        """Create a detection document."""
+    def create(
+        plate_number,
+        confidence,
+        camera_id,
+        bbox,
+        plate_image,
+        track_id=None,
+        first_seen=None,
+        last_seen=None,
+        frames_seen=None,
+    ):
+        """Create a detection document.
+
+        ``first_seen``/``last_seen`` are epoch seconds from a PlateTracker record.
+        """
         return {
             "plate_number": plate_number,
             "confidence": float(confidence),
@@ -25,37 +40,105 @@ class DetectionMongo:
                 "y2": float(bbox[3]),
             },
             "plate_image": plate_image,
+            "track_id": track_id,
+            "first_seen": datetime.utcfromtimestamp(first_seen) if first_seen else None,
+            "last_seen": datetime.utcfromtimestamp(last_seen) if last_seen else None,
+            "frames_seen": frames_seen,
             "created_at": datetime.utcnow(),
         }
 
     @staticmethod
-    def to_dict(doc):
-        """Convert MongoDB document to API response dict."""
+    def from_result(result, camera_id, plate_image):
+        """Create a detection document from a PlateDetector result or track record."""
+        return DetectionMongo.create(
+            plate_number=result.get("plate_text", "UNKNOWN"),
+            confidence=float(result.get("confidence", 0.0)),
+            camera_id=camera_id,
+            bbox=result.get("bbox", [0, 0, 0, 0]),
+            plate_image=plate_image,
+            track_id=result.get("track_id"),
+            first_seen=result.get("first_seen"),
+            last_seen=result.get("last_seen"),
+            frames_seen=result.get("frames_seen"),
+        )
+
+    @staticmethod
+    def to_dict(doc, fields=None):
+        """Convert MongoDB document to API response dict.
+
+        ``fields`` limits the keys returned (default: all of ``DETECTION_FIELDS``);
+        fetch the document with ``DetectionMongo.projection(fields)`` to read only those.
+        """
         if doc is None:
             return None
-        return {
+        data = {
             "id": str(doc["_id"]),
             "plate_number": doc.get("plate_number"),
             "confidence": float(doc.get("confidence", 0)),
             "camera_id": doc.get("camera_id"),
             "bbox": doc.get("bbox", {}),
             "plate_image": doc.get("plate_image"),
+            "plate_image_url": crop_url(doc.get("plate_image_key", doc.get("plate_image"))),
+            "track_id": doc.get("track_id"),
+            "first_seen": doc.get("first_seen").isoformat() if doc.get("first_seen") else None,
+            "last_seen": doc.get("last_seen").isoformat() if doc.get("last_seen") else None,
+            "frames_seen": doc.get("frames_seen"),
             "created_at": doc.get("created_at").isoformat() if doc.get("created_at") else None,
         }
+        return data if fields is None else {field: data[field] for field in fields}
+
+    @staticmethod
+    def projection(fields):
+        """``find`` projection reading only the document keys ``fields`` need."""
+        projection = {}
+        for field in fields:
+            projection.update(DETECTION_PROJECTION[field])
+        return projection
+
+
+# Document keys read by each API field of a detection
+DETECTION_PROJECTION = {
+    "id": {"_id": 1},
+    "plate_number": {"plate_number": 1},
+    "confidence": {"confidence": 1},
+    "camera_id": {"camera_id": 1},
+    "bbox": {"bbox": 1},
+    "plate_image": {"plate_image": 1},
+    # Enough of plate_image to hold a key, so legacy base64 crops are not sent
+    # (aggregation expressions in find projections need MongoDB 4.4+)
+    "plate_image_url": {"plate_image_key": {"$substrCP": ["$plate_image", 0, 64]}},
+    "track_id": {"track_id": 1},
+    "first_seen": {"first_seen": 1},
+    "last_seen": {"last_seen": 1},
+    "frames_seen": {"frames_seen": 1},
+    "created_at": {"created_at": 1},
+}
+DETECTION_FIELDS = tuple(DETECTION_PROJECTION)
+
+# Fields listed by default: everything but the raw crop value
+DEFAULT_LIST_FIELDS = tuple(f for f in DETECTION_FIELDS if f != "plate_image")
 
 
 class CameraMongo:
     """Model for camera configuration in MongoDB."""
 
     @staticmethod
-    def create(camera_id, name, location=None, rtsp_url=None, is_active=True):
-        """Create a camera document."""
+    def create(
+        camera_id, name, location=None, rtsp_url=None, is_active=True, sample_fps=None, roi=None
+    ):
+        """Create a camera document.
+
+        ``sample_fps`` is the ingest service's detection rate (None: default);
+        ``roi`` the motion gate's polygon in 0..1 coordinates (None: whole frame).
+        """
         return {
             "camera_id": camera_id,
             "name": name,
             "location": location,
             "rtsp_url": rtsp_url,
             "is_active": is_active,
+            "sample_fps": sample_fps,
+            "roi": roi,
             "created_at": datetime.utcnow(),
         }
 
@@ -71,5 +154,7 @@ class CameraMongo:
             "location": doc.get("location"),
             "rtsp_url": doc.get("rtsp_url"),
             "is_active": doc.get("is_active", True),
+            "sample_fps": doc.get("sample_fps"),
+            "roi": doc.get("roi"),
             "created_at": doc.get("created_at").isoformat() if doc.get("created_at") else None,
         }
@@ -0,0 +1,176 @@
+"""NumPy/OpenCV versions of YOLOv7's pre- and post-processing.
+
+These mirror ``letterbox``, ``non_max_suppression`` and ``scale_coords`` from
+``external/yolov7/utils`` so that inference backends which do not use PyTorch
+(ONNX Runtime) produce the same detections as the PyTorch path.
+"""
+
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+# Class offset for per-class NMS and YOLOv7's NMS limits
+MAX_WH = 4096
+MAX_NMS = 30000
+MAX_DET = 300
+
+
+def letterbox_geometry(
+    shape: Tuple[int, int],
+    new_shape: Union[int, Tuple[int, int]] = 640,
+    auto: bool = True,
+    stride: int = 32,
+) -> Tuple[Tuple[int, int], Tuple[int, int, int, int]]:
+    """Resized size and padding used by ``letterbox`` for an image of ``shape``.
+
+    Returns:
+        ((resized_w, resized_h), (top, bottom, left, right))
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]
+    if auto:
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    dw /= 2
+    dh /= 2
+
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return new_unpad, (top, bottom, left, right)
+
+
+def letterbox(
+    img: np.ndarray,
+    new_shape: Union[int, Tuple[int, int]] = 640,
+    color: Tuple[int, int, int] = (114, 114, 114),
+    auto: bool = True,
+    stride: int = 32,
+) -> Tuple[np.ndarray, Tuple[float, float], Tuple[float, float]]:
+    """Resize and pad an image to ``new_shape`` keeping its aspect ratio.
+
+    Args:
+        img: OpenCV image (HWC).
+        new_shape: Target size, int or (height, width).
+        color: Padding color.
+        auto: Pad only to the next multiple of ``stride`` (minimum rectangle).
+        stride: Model stride.
+
+    Returns:
+        (padded image, (ratio_w, ratio_h), (pad_w, pad_h))
+    """
+    shape = img.shape[:2]
+    new_unpad, (top, bottom, left, right) = letterbox_geometry(shape, new_shape, auto, stride)
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+
+    if shape[::-1] != new_unpad:
+        img = cv2.resize(img, new_unpad, interpolation=cv2.INTER_LINEAR)
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return img, (r, r), ((left + right) / 2, (top + bottom) / 2)
+
+
+def xywh2xyxy(x: np.ndarray) -> np.ndarray:
+    """Convert [x, y, w, h] center boxes to [x1, y1, x2, y2]."""
+    y = np.empty_like(x)
+    y[:, 0] = x[:, 0] - x[:, 2] / 2
+    y[:, 1] = x[:, 1] - x[:, 3] / 2
+    y[:, 2] = x[:, 0] + x[:, 2] / 2
+    y[:, 3] = x[:, 1] + x[:, 3] / 2
+    return y
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression.
+
+    Returns:
+        Indices of kept boxes, highest score first.
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def non_max_suppression(
+    prediction: np.ndarray,
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.45,
+    agnostic: bool = False,
+) -> List[np.ndarray]:
+    """Filter raw YOLOv7 output, matching ``utils.general.non_max_suppression``.
+
+    Args:
+        prediction: Model output of shape (N, anchors, 5 + classes), boxes as
+            center x, center y, width, height.
+        conf_threshold: Minimum object x class confidence.
+        iou_threshold: IoU threshold for NMS.
+        agnostic: Suppress across classes.
+
+    Returns:
+        One (n, 6) array per image: x1, y1, x2, y2, confidence, class.
+    """
+    nc = prediction.shape[2] - 5
+    output = []
+    for x in prediction:
+        x = x[x[:, 4] > conf_threshold]
+        if not x.shape[0]:
+            output.append(np.zeros((0, 6), dtype=np.float32))
+            continue
+
+        x = x.copy()
+        if nc == 1:
+            # Single-class models have no class loss, so class confidence is uninformative
+            x[:, 5:] = x[:, 4:5]
+        else:
+            x[:, 5:] *= x[:, 4:5]
+
+        box = xywh2xyxy(x[:, :4])
+        j = x[:, 5:].argmax(1)
+        conf = x[np.arange(len(x)), 5 + j]
+        x = np.concatenate((box, conf[:, None], j[:, None].astype(np.float32)), 1)
+        x = x[conf > conf_threshold]
+        if not x.shape[0]:
+            output.append(np.zeros((0, 6), dtype=np.float32))
+            continue
+        if x.shape[0] > MAX_NMS:
+            x = x[x[:, 4].argsort()[::-1][:MAX_NMS]]
+
+        offsets = x[:, 5:6] * (0 if agnostic else MAX_WH)
+        keep = nms(x[:, :4] + offsets, x[:, 4], iou_threshold)[:MAX_DET]
+        output.append(x[keep])
+    return output
+
+
+def scale_coords(
+    img1_shape: Sequence[int], coords: np.ndarray, img0_shape: Sequence[int]
+) -> np.ndarray:
+    """Rescale [x1, y1, x2, y2] boxes from letterboxed ``img1_shape`` to ``img0_shape``.
+
+    Modifies ``coords`` in place and returns it.
+    """
+    gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+    pad_w = (img1_shape[1] - img0_shape[1] * gain) / 2
+    pad_h = (img1_shape[0] - img0_shape[0] * gain) / 2
+    coords[:, [0, 2]] -= pad_w
+    coords[:, [1, 3]] -= pad_h
+    coords[:, :4] /= gain
+    coords[:, [0, 2]] = coords[:, [0, 2]].clip(0, img0_shape[1])
+    coords[:, [1, 3]] = coords[:, [1, 3]].clip(0, img0_shape[0])
+    return coords
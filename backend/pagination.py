@@ -0,0 +1,82 @@
+"""Keyset (cursor) pagination of detection lists.
+
+``page``/``per_page`` paging makes the database skip every row before the
+page, and each response also counted the whole table, so both grew with
+history size. Lists now page on the primary key instead: each response
+carries an opaque ``next_cursor`` (the last id it returned) and the next
+request continues with ``id < cursor``, which an index lookup answers in the
+same time at any depth. Totals are only computed on request (``total=approx``
+or ``total=exact``).
+
+Lists also filter by time (``date_from``/``date_to`` on ``created_at``) and
+plate text, which the ``(camera_id, created_at)`` and
+``(plate_number, created_at)`` indexes serve.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+TOTAL_MODES = ("none", "approx", "exact")
+
+# Approximate totals of filtered lists count at most this many rows
+APPROX_COUNT_LIMIT = 10000
+
+
+def encode_cursor(last_id: Any) -> str:
+    """Opaque cursor continuing a list after ``last_id``."""
+    data = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Id a cursor from ``encode_cursor`` continues after.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(data)["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_total_mode(value: Optional[str], default: str = "none") -> str:
+    """Validate a ``total`` query parameter.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    mode = value or default
+    if mode not in TOTAL_MODES:
+        raise ValueError(f"Unknown total mode '{mode}', expected one of {', '.join(TOTAL_MODES)}")
+    return mode
+
+
+def parse_datetime(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """Parse an ISO 8601 date filter into naive UTC, as detection times are stored.
+
+    Args:
+        value: ISO date or datetime; naive values are taken as UTC.
+        end_of_day: Make a bare date (``2024-05-01``) include that whole day,
+            for inclusive upper bounds.
+
+    Raises:
+        ValueError: If the value is not ISO 8601.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid date '{value}', expected ISO 8601") from e
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1) - timedelta(microseconds=1)
+    return parsed
@@ -0,0 +1,540 @@
+"""Staged video processing pipeline.
+
+Frames flow through five stages connected by bounded queues, so decoding,
+model compute, OCR and database I/O overlap instead of waiting on each other:
+
+    decode -> [frames] -> batched inference + tracking -> [crops] -> OCR pool
+           -> [records] -> batched persistence
+
+A full queue blocks its producer (backpressure), which keeps memory bounded
+when one stage is slower than the others.
+
+Decoding goes through a ``VideoDecoder`` (``backend.decoder``): frames that
+are not sampled are only grabbed, never converted, and long gaps are seeked
+over.
+
+Detections are linked into plate tracks in frame order right after inference.
+Only new or improved track crops go to OCR, and one record per finished track
+is persisted. Persistence handles batches in inference order, so a track's
+OCR has always completed by the time it is stored.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Union
+
+from backend.decoder import VideoDecoder, open_decoder
+from backend.gate import MotionGate
+from backend.sampler import AdaptiveSampler
+from backend.tracker import PlateTracker
+
+# Marks the end of a stream on every queue
+_SENTINEL = object()
+
+# How often blocked queue operations re-check for a pipeline failure (seconds)
+_POLL_INTERVAL = 0.1
+
+
+class StageStats:
+    """Work counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, seconds: float):
+        """Record ``items`` processed in ``seconds`` of busy time."""
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        """Convert stats to a response dict."""
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / wall_seconds, 2) if wall_seconds else 0.0,
+            "utilization": round(self.busy_seconds / wall_seconds, 3) if wall_seconds else 0.0,
+        }
+
+
+class StageQueue(queue.Queue):
+    """Bounded queue that samples its depth on every put."""
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize)
+        self.name = name
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def _put(self, item):
+        super()._put(item)
+        depth = len(self.queue)
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert depth stats to a response dict."""
+        avg = self._depth_total / self._depth_samples if self._depth_samples else 0.0
+        return {"capacity": self.maxsize, "max_depth": self.max_depth, "avg_depth": round(avg, 2)}
+
+
+class VideoPipeline:
+    """Run a video file through decode, detect, OCR and persistence stages."""
+
+    def __init__(
+        self,
+        detector,
+        sink: Callable[[List[Dict[str, Any]]], None],
+        batch_size: int = 8,
+        ocr_workers: int = 2,
+        queue_size: int = 32,
+        persist_batch_size: int = 64,
+        persist_interval: float = 1.0,
+        track_max_age: float = 1.5,
+        decoder_factory: Callable[[str], VideoDecoder] = open_decoder,
+    ):
+        """Initialize pipeline.
+
+        Args:
+            detector: PlateDetector used for inference and OCR.
+            sink: Called from the persistence thread with a list of track
+                records (``PlateTracker`` records, with the best crop as
+                ``plate_crop``). Must set up its own app/DB context.
+            batch_size: Frames per forward pass.
+            ocr_workers: Threads in the OCR pool.
+            queue_size: Capacity of each inter-stage queue.
+            persist_batch_size: Records per sink call.
+            persist_interval: Max seconds a record waits before being flushed.
+            track_max_age: Seconds of video a plate may go unseen before its
+                track is finished.
+            decoder_factory: Opens a video path as a ``VideoDecoder`` (e.g.
+                ``open_decoder`` with backend and resolution options bound).
+        """
+        self.detector = detector
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.ocr_workers = max(1, ocr_workers)
+        self.queue_size = max(1, queue_size)
+        self.persist_batch_size = max(1, persist_batch_size)
+        self.persist_interval = persist_interval
+        self.track_max_age = track_max_age
+        self.decoder_factory = decoder_factory
+
+    def run(
+        self,
+        video_path: Union[str, BinaryIO],
+        sample_rate: int = 5,
+        start_frame: int = 0,
+        on_progress: Optional[Callable[[int, int, List[Dict[str, Any]]], None]] = None,
+        cancel: Optional[threading.Event] = None,
+        base_timestamp: Optional[float] = None,
+        gate: Optional[MotionGate] = None,
+        sampler: Optional[AdaptiveSampler] = None,
+        end_frame: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Process a video file and block until every stage has finished.
+
+        Args:
+            video_path: Path to the video file, or a readable binary file
+                object if the decoder supports it (e.g. a streaming upload).
+            sample_rate: Process every ``sample_rate``-th frame.
+            start_frame: Frame index to start decoding from (used to resume).
+                Frame indices stay absolute, so sampling is unchanged.
+            on_progress: Called from the persistence thread after each flush with
+                the committed frame index (every track that started at or before
+                it has been persisted, so it is safe to resume after), the last
+                processed frame index and the flushed records.
+            cancel: Event that stops decoding; frames already decoded are still
+                processed and persisted.
+            base_timestamp: Epoch seconds of frame 0, used for track
+                ``first_seen``/``last_seen``. Defaults to now.
+            gate: Motion gate applied to sampled frames; frames it rejects
+                skip inference.
+            sampler: Adaptive sampler choosing frames from detection activity;
+                replaces ``sample_rate`` when given.
+            end_frame: Stop before this frame index, as if the video ended
+                there (tracks still open are finished). None: the whole video.
+
+        Returns:
+            Dict with ``total_frames``, ``processed_frames``, ``detections`` (plate
+            text per track, in order of appearance), ``tracks``,
+            ``committed_frame``, ``cancelled``, ``effective_stride`` (frames
+            decoded per frame detected), a ``pipeline`` block of per-stage
+            throughput and queue depth stats and, with a gate or sampler, its
+            ``gate`` or ``sampling`` stats, and ``first_detection_seconds``
+            (wall time to the first frame with a plate) if any was found.
+
+        Raises:
+            Exception: The first error raised by any stage.
+        """
+        return _PipelineRun(
+            self,
+            video_path,
+            max(1, sample_rate),
+            start_frame,
+            on_progress,
+            cancel,
+            time.time() if base_timestamp is None else base_timestamp,
+            gate,
+            sampler,
+            end_frame,
+        ).run()
+
+
+class _PipelineRun:
+    """State for a single ``VideoPipeline.run`` call."""
+
+    def __init__(
+        self,
+        pipeline: VideoPipeline,
+        video_path: Union[str, BinaryIO],
+        sample_rate: int,
+        start_frame: int,
+        on_progress: Optional[Callable[[int, int, List[Dict[str, Any]]], None]],
+        cancel: Optional[threading.Event],
+        base_timestamp: float,
+        gate: Optional[MotionGate] = None,
+        sampler: Optional[AdaptiveSampler] = None,
+        end_frame: Optional[int] = None,
+    ):
+        self.p = pipeline
+        self.video_path = video_path
+        self.sample_rate = sample_rate
+        self.start_frame = max(0, start_frame)
+        self.on_progress = on_progress
+        self.cancel = cancel or threading.Event()
+        self.base_timestamp = base_timestamp
+        self.gate = gate
+        self.sampler = sampler
+        self.end_frame = end_frame
+        self.tracker = PlateTracker(max_age=pipeline.track_max_age)
+
+        self.frames_q = StageQueue("frames", pipeline.queue_size)
+        self.crops_q = StageQueue("crops", pipeline.queue_size)
+        self.records_q = StageQueue("records", pipeline.queue_size)
+        self.stats = {name: StageStats(name) for name in ("decode", "inference", "ocr", "persist")}
+
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.total_frames = 0
+        self.processed_frames = 0
+        self.decoder: Optional[VideoDecoder] = None
+        self.started = time.perf_counter()
+        # Seconds from the start of the run to the first frame with a plate
+        self.first_detection: Optional[float] = None
+        # Resume point: every track starting at or before this frame is persisted
+        self.committed_frame = self.start_frame - 1
+        self.done_frame = self.start_frame - 1
+        self.detections: List[tuple[int, str]] = []
+
+    # -- queue helpers -------------------------------------------------------
+
+    def _put(self, q: StageQueue, item) -> bool:
+        """Put with backpressure; gives up if the pipeline has failed."""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: StageQueue, timeout: Optional[float] = None):
+        """Get the next item, or the sentinel if the pipeline has failed.
+
+        Returns None if ``timeout`` expires first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.stop.is_set():
+                return _SENTINEL
+            wait = _POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+            try:
+                return q.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _fail(self, exc: BaseException):
+        if self.error is None:
+            self.error = exc
+        self.stop.set()
+
+    # -- stages --------------------------------------------------------------
+
+    def _decode(self):
+        decoder = None
+        try:
+            decoder = self.p.decoder_factory(self.video_path)
+            self.decoder = decoder
+            # Skipped frames are only grabbed (or seeked over), never converted
+            decoder.skip_to(self.start_frame)
+            busy = 0.0
+            while not self.cancel.is_set():
+                start = time.perf_counter()
+                target = self._next_sample(decoder.index + 1)
+                if self.end_frame is not None and target >= self.end_frame:
+                    # Frames up to the end were covered, sampled or not
+                    self.total_frames = self.end_frame
+                    break
+                if target - (decoder.index + 1) >= decoder.seek_frames:
+                    decoder.seek(target)
+                if not decoder.grab():
+                    break
+                busy += time.perf_counter() - start
+                frame_index = decoder.index
+                # Checked per frame: adaptive sampling may pull the next sample
+                # closer, and may wait here for inference feedback
+                if not self._sample(frame_index):
+                    continue
+                start = time.perf_counter()
+                frame = decoder.retrieve()
+                self.stats["decode"].add(1, busy + time.perf_counter() - start)
+                busy = 0.0
+                if not self._gate(frame_index, frame):
+                    continue
+                timestamp = self.base_timestamp + frame_index / decoder.fps
+                if not self._put(self.frames_q, (frame_index, frame, timestamp)):
+                    break
+            self.total_frames = max(self.total_frames, decoder.index + 1)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if decoder is not None:
+                decoder.close()
+            self._put(self.frames_q, _SENTINEL)
+
+    def _next_sample(self, frame_index: int) -> int:
+        """First frame at or after ``frame_index`` that may be sampled."""
+        if self.sampler is not None:
+            return max(frame_index, self.sampler.next_frame(frame_index))
+        return -(-frame_index // self.sample_rate) * self.sample_rate
+
+    def _sample(self, frame_index: int) -> bool:
+        """Whether a grabbed frame is decoded for inference."""
+        if self.sampler is None:
+            return frame_index % self.sample_rate == 0
+        return self.sampler.sample(frame_index, self.stop)
+
+    def _gate(self, frame_index: int, frame) -> bool:
+        """Whether a sampled frame goes to inference."""
+        if frame is not None and (self.gate is None or self.gate.check(frame)):
+            return True
+        if self.sampler is not None:
+            # Nothing moved, which counts as an idle frame
+            self.sampler.observe(frame_index, False)
+        return False
+
+    def _infer(self):
+        seq = 0
+        last_frame = self.start_frame - 1
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < self.p.batch_size:
+                    if batch and self.sampler is not None:
+                        # Don't wait for a full batch: the sampler needs
+                        # feedback on these frames to pick the next ones
+                        try:
+                            item = self.frames_q.get_nowait()
+                        except queue.Empty:
+                            break
+                    else:
+                        item = self._get(self.frames_q)
+                    if item is _SENTINEL:
+                        done = True
+                        break
+                    batch.append(item)
+                if not batch:
+                    break
+
+                start = time.perf_counter()
+                frames = [frame for _, frame, _ in batch]
+                batch_results = self.p.detector.detect_batch(frames, ocr=False)
+                if self.first_detection is None and any(batch_results):
+                    self.first_detection = time.perf_counter() - self.started
+
+                # Tracking must see frames in order, so it runs on this thread
+                requests, finished = [], []
+                for (idx, _, timestamp), results in zip(batch, batch_results):
+                    for result in results:
+                        result["frame_index"] = idx
+                        if self.decoder.scale != 1.0:
+                            # Boxes in source video coordinates
+                            result["bbox"] = [
+                                int(round(v * self.decoder.scale)) for v in result["bbox"]
+                            ]
+                    frame_requests, frame_finished = self.tracker.update(results, timestamp)
+                    requests.extend(frame_requests)
+                    finished.extend(frame_finished)
+                    if self.sampler is not None:
+                        self.sampler.observe(idx, bool(results or self.tracker.tracks))
+                self.stats["inference"].add(len(batch), time.perf_counter() - start)
+                self.processed_frames += len(batch)
+                last_frame = batch[-1][0]
+
+                item = (seq, self._watermark(last_frame), last_frame, requests, finished)
+                if not self._put(self.crops_q, item):
+                    break
+                seq += 1
+
+            if not self.stop.is_set():
+                # End of video: every open track is finished
+                self._put(self.crops_q, (seq, last_frame, last_frame, [], self.tracker.flush()))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.p.ocr_workers):
+                self._put(self.crops_q, _SENTINEL)
+
+    def _watermark(self, last_frame: int) -> int:
+        """Last frame that is safe to resume after once this batch is persisted.
+
+        Tracks still open started at or after their first frame and are not yet
+        stored, so resuming must re-read from the earliest of them.
+        """
+        open_since = [t.first_frame for t in self.tracker.tracks if t.first_frame is not None]
+        return min([last_frame] + [frame - 1 for frame in open_since])
+
+    def _ocr(self):
+        try:
+            while True:
+                item = self._get(self.crops_q)
+                if item is _SENTINEL:
+                    break
+                seq, watermark, last_frame, requests, finished = item
+
+                start = time.perf_counter()
+                crops = [result["plate_crop"] for _, result in requests]
+                self.tracker.apply_ocr(requests, self.p.detector.run_ocr_batch(crops))
+                self.stats["ocr"].add(len(crops), time.perf_counter() - start)
+
+                # Batches without finished tracks are forwarded too so the
+                # commit watermark advances
+                if not self._put(self.records_q, (seq, watermark, last_frame, finished)):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(self.records_q, _SENTINEL)
+
+    def _persist(self):
+        finished_workers = 0
+        pending: List[Dict[str, Any]] = []
+        # OCR workers may finish batches out of order; handle them in sequence
+        waiting: Dict[int, tuple[int, int, list]] = {}
+        next_seq = 0
+        ready_watermark: Optional[int] = None
+        deadline = time.monotonic() + self.p.persist_interval
+        try:
+            while finished_workers < self.p.ocr_workers:
+                item = self._get(self.records_q, timeout=max(0.0, deadline - time.monotonic()))
+                if item is _SENTINEL:
+                    if self.stop.is_set():
+                        return
+                    finished_workers += 1
+                elif item is not None:
+                    waiting[item[0]] = item[1:]
+                    while next_seq in waiting:
+                        ready_watermark, self.done_frame, finished = waiting.pop(next_seq)
+                        # Earlier batches (and their OCR) are done, so records are final
+                        pending.extend(track.to_record() for track in finished)
+                        next_seq += 1
+
+                if ready_watermark is not None and (
+                    len(pending) >= self.p.persist_batch_size
+                    or time.monotonic() >= deadline
+                    or finished_workers == self.p.ocr_workers
+                ):
+                    self._flush(pending)
+                    self.committed_frame = max(self.committed_frame, ready_watermark)
+                    if self.on_progress is not None:
+                        self.on_progress(self.committed_frame, self.done_frame, pending)
+                    pending = []
+                    ready_watermark = None
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.p.persist_interval
+        except Exception as e:
+            self._fail(e)
+
+    def _flush(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        start = time.perf_counter()
+        self.p.sink(records)
+        self.stats["persist"].add(len(records), time.perf_counter() - start)
+        self.detections.extend((r["frame_index"], r["plate_text"]) for r in records)
+
+    # -- driver --------------------------------------------------------------
+
+    def run(self) -> Dict[str, Any]:
+        started = self.started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._decode, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._infer, name="pipeline-inference", daemon=True),
+            threading.Thread(target=self._persist, name="pipeline-persist", daemon=True),
+        ]
+        threads += [
+            threading.Thread(target=self._ocr, name=f"pipeline-ocr-{i}", daemon=True)
+            for i in range(self.p.ocr_workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+        if self.error is not None:
+            raise self.error
+
+        self.detections.sort(key=lambda d: d[0])
+        result = {
+            "total_frames": self.total_frames,
+            "processed_frames": self.processed_frames,
+            "detections": [text for _, text in self.detections],
+            "tracks": len(self.detections),
+            "committed_frame": self.committed_frame,
+            "cancelled": self.cancel.is_set(),
+            "effective_stride": (
+                round((self.total_frames - self.start_frame) / self.processed_frames, 2)
+                if self.processed_frames
+                else None
+            ),
+            "pipeline": {
+                "wall_seconds": round(wall_seconds, 3),
+                "decoder": (
+                    {
+                        "backend": self.decoder.name,
+                        "source_size": [self.decoder.width, self.decoder.height],
+                        "decode_size": list(
+                            self.decoder.size or (self.decoder.width, self.decoder.height)
+                        ),
+                    }
+                    if self.decoder is not None
+                    else None
+                ),
+                "stages": {name: stats.to_dict(wall_seconds) for name, stats in self.stats.items()},
+                "queues": {
+                    q.name: q.to_dict() for q in (self.frames_q, self.crops_q, self.records_q)
+                },
+            },
+        }
+        if self.gate is not None:
+            result["gate"] = self.gate.stats()
+        if self.sampler is not None:
+            result["sampling"] = self.sampler.stats()
+        if self.first_detection is not None:
+            result["first_detection_seconds"] = round(self.first_detection, 3)
+        return result
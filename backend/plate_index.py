@@ -0,0 +1,191 @@
+"""Fuzzy plate search tolerant of OCR character confusions.
+
+OCR regularly reads ``0`` as ``O``, ``1`` as ``I``, ``8`` as ``B`` and so on,
+so an exact ``plate_number`` lookup misses real sightings. ``PlateIndex``
+keeps every distinct plate text in memory, keyed by a normalized form in
+which confusable characters are folded together (``normalize_plate``), and
+indexes those keys in a BK-tree. A search for ``query`` within edit distance
+``d`` only visits subtrees whose distance band can contain a match (triangle
+inequality), so it touches a small part of the index instead of every plate.
+
+The index is loaded from the database at startup and updated as detections
+are written and deleted.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# OCR confusions folded to one character: letters map to the digit they are mistaken for
+CONFUSABLES = str.maketrans(
+    {"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1", "B": "8", "S": "5", "Z": "2", "G": "6"}
+)
+
+# Texts the detector stores when there was no readable plate
+PLACEHOLDERS = frozenset({"UNKNOWN", "NO_OCR"})
+
+
+def normalize_plate(text: Optional[str]) -> str:
+    """Search key of a plate text: uppercase alphanumerics with confusables folded."""
+    if not text:
+        return ""
+    text = "".join(c for c in text.upper() if c.isalnum())
+    return text.translate(CONFUSABLES)
+
+
+def _pattern(a: str) -> Tuple[Dict[str, int], int]:
+    """Bit masks of each character's positions in ``a``, and its length."""
+    masks: Dict[str, int] = {}
+    for i, c in enumerate(a):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks, len(a)
+
+
+def _distance(pattern: Tuple[Dict[str, int], int], b: str) -> int:
+    """Levenshtein distance from a ``_pattern`` to ``b``.
+
+    Bit-parallel (Myers/Hyyrö): one column of the DP matrix per character of
+    ``b`` as a few integer operations, several times faster in Python than
+    filling the matrix cell by cell.
+    """
+    masks, m = pattern
+    if m == 0:
+        return len(b)
+    full = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    for c in b:
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    return _distance(_pattern(a), b)
+
+
+class _Node:
+    """BK-tree node: one normalized key and its plate texts with detection counts."""
+
+    __slots__ = ("key", "plates", "children")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.plates: Dict[str, int] = {}
+        # Edit distance to this key -> subtree
+        self.children: Dict[int, _Node] = {}
+
+
+class PlateIndex:
+    """BK-tree over normalized plate texts with incremental updates."""
+
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._nodes: Dict[str, _Node] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for node in self._nodes.values() if node.plates)
+
+    def add(self, plate_text: Optional[str], count: int = 1):
+        """Record ``count`` detections of a plate text."""
+        if not plate_text or plate_text in PLACEHOLDERS:
+            return
+        key = normalize_plate(plate_text)
+        if not key:
+            return
+        with self._lock:
+            node = self._nodes.get(key)
+            if node is None:
+                node = self._insert(key)
+            node.plates[plate_text] = node.plates.get(plate_text, 0) + count
+
+    def add_many(self, plate_texts: Iterable[Optional[str]]):
+        """Record one detection of each plate text."""
+        for plate_text in plate_texts:
+            self.add(plate_text)
+
+    def remove(self, plate_text: Optional[str], count: int = 1):
+        """Forget ``count`` detections of a plate text (e.g. after a delete).
+
+        Nodes stay in the tree as routing points; a key without plates is
+        just never returned.
+        """
+        with self._lock:
+            node = self._nodes.get(normalize_plate(plate_text))
+            if node is None:
+                return
+            remaining = node.plates.get(plate_text, 0) - count
+            if remaining > 0:
+                node.plates[plate_text] = remaining
+            else:
+                node.plates.pop(plate_text, None)
+
+    def search(self, query: str, max_distance: int = 2, limit: int = 20) -> List[Dict]:
+        """Plate texts within ``max_distance`` edits of ``query`` after normalization.
+
+        Args:
+            query: Plate text as typed or read by OCR.
+            max_distance: Most edits between normalized texts.
+            limit: Most results.
+
+        Returns:
+            Dicts with ``plate_number``, ``distance`` (between normalized texts)
+            and ``detections``, closest first, then by raw edit distance to the
+            query and by number of detections.
+        """
+        key = normalize_plate(query)
+        if not key:
+            return []
+        pattern = _pattern(key)
+        results = []
+        with self._lock:
+            stack = [self._root] if self._root is not None else []
+            while stack:
+                node = stack.pop()
+                distance = _distance(pattern, node.key)
+                if distance <= max_distance:
+                    for plate_text, count in node.plates.items():
+                        results.append((distance, plate_text, count))
+                # Matches under a child at distance d satisfy |d - distance| <= max_distance
+                for child_distance, child in node.children.items():
+                    if abs(child_distance - distance) <= max_distance:
+                        stack.append(child)
+
+        raw = _pattern(query.strip().upper())
+        results.sort(key=lambda r: (r[0], _distance(raw, r[1]), -r[2], r[1]))
+        return [
+            {"plate_number": plate_text, "distance": distance, "detections": count}
+            for distance, plate_text, count in results[:limit]
+        ]
+
+    def _insert(self, key: str) -> _Node:
+        """Add a node for a new key. Caller holds the lock."""
+        new = _Node(key)
+        self._nodes[key] = new
+        if self._root is None:
+            self._root = new
+            return new
+        pattern = _pattern(key)
+        node = self._root
+        while True:
+            distance = _distance(pattern, node.key)
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = new
+                return new
+            node = child
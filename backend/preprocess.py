@@ -0,0 +1,160 @@
+"""Batched detector input preprocessing into reusable buffers.
+
+``PlateDetector.preprocess`` used to build each input through a chain of
+temporaries (letterboxed copy, RGB/CHW view, contiguous copy, tensor, float
+tensor, normalized tensor). ``BatchPreprocessor`` instead writes every frame
+of a batch straight into one preallocated (N, 3, H, W) float32 buffer:
+
+- the resize goes into a reused per-shape scratch image,
+- BGR -> RGB, HWC -> CHW and the 1/255 scale happen in one write per
+  channel into the buffer's interior,
+- only the padding strips are filled, with YOLOv7's gray (114).
+
+Buffers are kept per input shape and grown to the largest batch seen, so a
+steady stream of same-sized frames allocates nothing after the first batch.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from backend.ops import letterbox_geometry
+
+# YOLOv7 letterbox padding (114, 114, 114), normalized
+PAD_VALUE = 114 / 255.0
+SCALE = np.float32(1 / 255.0)
+
+# ((resized_w, resized_h), (top, bottom, left, right)) from letterbox_geometry
+Geometry = Tuple[Tuple[int, int], Tuple[int, int, int, int]]
+
+# Allocates a float32 array of the given shape (e.g. in pinned memory)
+Allocator = Callable[[Tuple[int, ...]], np.ndarray]
+
+
+def _allocate(shape: Tuple[int, ...]) -> np.ndarray:
+    return np.empty(shape, dtype=np.float32)
+
+
+def letterbox_into(
+    img: np.ndarray,
+    out: np.ndarray,
+    geometry: Optional[Geometry] = None,
+    scratch: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Letterbox a BGR image into a (3, H, W) float32 array as normalized RGB.
+
+    Args:
+        img: OpenCV image (BGR, HWC format).
+        out: Destination (3, H, W) float32 array.
+        geometry: ``letterbox_geometry`` result for ``img``; its padded size must
+            equal H x W. Defaults to a full letterbox to H x W.
+        scratch: Optional reusable uint8 buffer for the resized image.
+
+    Returns:
+        The resized image (``scratch`` if it was used).
+    """
+    if geometry is None:
+        geometry = letterbox_geometry(img.shape[:2], out.shape[1:], auto=False)
+    (new_w, new_h), (top, bottom, left, right) = geometry
+
+    if (img.shape[1], img.shape[0]) != (new_w, new_h):
+        if scratch is not None and scratch.shape[:2] == (new_h, new_w):
+            resized = cv2.resize(img, (new_w, new_h), dst=scratch, interpolation=cv2.INTER_LINEAR)
+        else:
+            resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    else:
+        resized = img
+
+    # Padding strips only; the interior is overwritten below
+    out[:, :top] = PAD_VALUE
+    out[:, top + new_h :] = PAD_VALUE
+    out[:, top : top + new_h, :left] = PAD_VALUE
+    out[:, top : top + new_h, left + new_w :] = PAD_VALUE
+
+    # BGR -> RGB, HWC -> CHW and normalization in one write per channel
+    for channel in range(3):
+        np.multiply(
+            resized[:, :, 2 - channel],
+            SCALE,
+            out=out[channel, top : top + new_h, left : left + new_w],
+            casting="unsafe",
+        )
+    return resized
+
+
+class BatchPreprocessor:
+    """Letterbox image batches into reused (N, 3, H, W) float32 buffers.
+
+    The returned batch is a view into an internal buffer that is overwritten
+    by the next call, so consume it (run inference) before preprocessing the
+    next batch. Not thread-safe: use one instance per thread.
+    """
+
+    def __init__(self, allocate: Optional[Allocator] = None, max_shapes: int = 8):
+        """Initialize preprocessor.
+
+        Args:
+            allocate: Allocates batch buffers (default: ``np.empty``). Backends
+                can pass pinned host memory for faster device copies.
+            max_shapes: Number of distinct input shapes to keep buffers for.
+        """
+        self.allocate = allocate or _allocate
+        self.max_shapes = max_shapes
+        self._buffers: Dict[Tuple[int, int], np.ndarray] = {}
+        self._scratch: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __call__(
+        self,
+        images: List[np.ndarray],
+        new_shape: Union[int, Tuple[int, int]] = 640,
+        auto: bool = True,
+        stride: int = 32,
+    ) -> np.ndarray:
+        """Preprocess a batch of BGR images.
+
+        Args:
+            images: Input images (BGR, HWC format).
+            new_shape: Letterbox target size, int or (height, width).
+            auto: Use the minimum-rectangle letterbox. Only valid when all images
+                share a shape; otherwise every image is padded to ``new_shape``.
+            stride: Model stride.
+
+        Returns:
+            Normalized RGB batch (N, 3, H, W), float32.
+        """
+        if auto and any(img.shape[:2] != images[0].shape[:2] for img in images):
+            auto = False
+        geometries = [letterbox_geometry(img.shape[:2], new_shape, auto, stride) for img in images]
+        (new_w, new_h), (top, bottom, left, right) = geometries[0]
+        batch = self._buffer((new_h + top + bottom, new_w + left + right), len(images))
+
+        for img, out, geometry in zip(images, batch, geometries):
+            (w, h), _ = geometry
+            letterbox_into(img, out, geometry, self._scratch_for(h, w, img))
+        return batch
+
+    def _buffer(self, shape: Tuple[int, int], n: int) -> np.ndarray:
+        """Batch buffer view for ``n`` images of ``shape``, grown when needed."""
+        buffer = self._buffers.pop(shape, None)
+        if buffer is None or len(buffer) < n:
+            buffer = self.allocate((n, 3) + shape)
+        # Most recently used last; evict the oldest shape
+        self._buffers[shape] = buffer
+        if len(self._buffers) > self.max_shapes:
+            del self._buffers[next(iter(self._buffers))]
+        return buffer[:n]
+
+    def _scratch_for(self, h: int, w: int, img: np.ndarray) -> Optional[np.ndarray]:
+        """Reusable resize target for an (h, w) resize of ``img``."""
+        if img.shape[:2] == (h, w) or img.ndim != 3:
+            return None
+        key = (h, w)
+        scratch = self._scratch.get(key)
+        if scratch is None or scratch.shape[2] != img.shape[2] or scratch.dtype != img.dtype:
+            if len(self._scratch) >= self.max_shapes:
+                self._scratch.clear()
+            scratch = self._scratch[key] = np.empty((h, w, img.shape[2]), dtype=img.dtype)
+        return scratch
@@ -0,0 +1,128 @@
+"""Activity-driven frame sampling for video jobs.
+
+A fixed ``sample_rate`` spends the same compute on an empty parking lot as
+on a burst of traffic. ``AdaptiveSampler`` starts at ``min_stride`` and
+doubles the stride each time a sampled frame comes back from inference with
+no detections and no open tracks, up to ``max_stride``. As soon as a frame
+has activity it drops back to ``min_stride``, so plates are followed densely
+while they are in view.
+
+The decode stage runs ahead of inference, and the sampler can only react to
+frames whose results are back. To keep that reaction lag bounded, decode may
+not sample more than ``lookahead`` frames past the last observed one while
+results are outstanding.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Dict, Optional
+
+# How often a blocked ``sample`` re-checks its stop event (seconds)
+_POLL_INTERVAL = 0.1
+
+
+def parse_sample_rate(value: Any) -> Any:
+    """Validate a ``sample_rate`` form field.
+
+    Returns:
+        ``"auto"`` for adaptive sampling, otherwise the stride as an int.
+
+    Raises:
+        ValueError: If it is neither ``auto`` nor a positive integer.
+    """
+    if isinstance(value, str) and value.strip().lower() == "auto":
+        return "auto"
+    try:
+        stride = int(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError("sample_rate must be 'auto' or a positive integer") from e
+    if stride < 1:
+        raise ValueError("sample_rate must be 'auto' or a positive integer")
+    return stride
+
+
+class AdaptiveSampler:
+    """Choose which frames to detect from the activity seen in earlier ones."""
+
+    def __init__(
+        self,
+        min_stride: int = 1,
+        max_stride: int = 30,
+        backoff: float = 2.0,
+        lookahead: Optional[int] = None,
+    ):
+        """Initialize sampler.
+
+        Args:
+            min_stride: Stride while plates are in view.
+            max_stride: Largest stride on idle stretches.
+            backoff: Factor the stride grows by per idle sampled frame.
+            lookahead: Frames decode may run past the last observed frame
+                while results are outstanding (default: ``16 * min_stride``).
+        """
+        self.min_stride = max(1, min_stride)
+        self.max_stride = max(self.min_stride, max_stride)
+        self.backoff = max(1.0, backoff)
+        self.lookahead = lookahead if lookahead is not None else 16 * self.min_stride
+
+        self.stride = self.min_stride
+        self.sampled = 0
+        self.active = 0
+        self._next_frame: Optional[int] = None
+        self._observed_frame = -1
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def sample(self, frame_index: int, stop: Optional[threading.Event] = None) -> bool:
+        """Whether to detect a decoded frame. Frames must be offered in order.
+
+        Blocks while the frame is more than ``lookahead`` past the last
+        observed one and results are outstanding. Every frame this returns
+        True for must be passed to ``observe`` exactly once.
+        """
+        with self._cond:
+            if self._next_frame is None:
+                # First frame offered (decoding may start mid-video)
+                self._next_frame = frame_index
+                self._observed_frame = frame_index - 1
+            if frame_index < self._next_frame:
+                return False
+            while self._pending and frame_index - self._observed_frame > self.lookahead:
+                if stop is not None and stop.is_set():
+                    return False
+                self._cond.wait(_POLL_INTERVAL)
+            self._pending += 1
+            self.sampled += 1
+            self._next_frame = frame_index + self.stride
+            return True
+
+    def next_frame(self, frame_index: int) -> int:
+        """Next frame ``sample`` may accept, given decoding is at ``frame_index``."""
+        with self._cond:
+            return frame_index if self._next_frame is None else self._next_frame
+
+    def observe(self, frame_index: int, active: bool):
+        """Feed back whether a sampled frame had detections or open tracks."""
+        with self._cond:
+            self._pending -= 1
+            self._observed_frame = max(self._observed_frame, frame_index)
+            if active:
+                self.active += 1
+                self.stride = self.min_stride
+                self._next_frame = min(self._next_frame, frame_index + self.min_stride)
+            else:
+                self.stride = min(self.max_stride, math.ceil(self.stride * self.backoff))
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Stride bounds, current stride, frames sampled and how many had activity."""
+        with self._cond:
+            return {
+                "min_stride": self.min_stride,
+                "max_stride": self.max_stride,
+                "stride": self.stride,
+                "sampled": self.sampled,
+                "active": self.active,
+            }
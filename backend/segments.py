@@ -0,0 +1,548 @@
+"""Parallel processing of one long video in keyframe-aligned segments.
+
+A video job runs one ``VideoPipeline``: a single decode thread and one model
+instance, so a day of footage keeps one or two cores busy however many the
+machine has. ``SegmentedVideoProcessor`` cuts the video into time segments
+that start on keyframes (so a segment decodes from its first frame without
+reading the previous GOP) and runs them on a pool of worker processes, each
+with its own ``PlateDetector`` and pipeline.
+
+Segments finish in any order. The parent merges them in video order:
+
+- a plate in view across a cut produces two tracks, one ending at the
+  segment's last sampled frame and one starting at the next segment's first.
+  ``stitch_tracks`` joins such pairs (same plate text, or overlapping boxes
+  when unread), so they are stored as one record;
+- records are handed to the sink in timestamp order, one segment behind the
+  merge front, and progress is reported with the same commit watermark as
+  the pipeline, so an interrupted job resumes where it left off.
+
+Workers are forked when the processor is created. The inference libraries
+are imported by then, but the processor should be created before the app
+loads its own model or starts threads: a fork copies only the calling thread,
+so a process with running inference or I/O pools is unsafe to fork. Each
+worker limits its inference and decode threads to its share of the cores.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from backend.decoder import PYAV_AVAILABLE, open_decoder
+from backend.detector import PlateDetector
+from backend.gate import MotionGate
+from backend.pipeline import VideoPipeline
+from backend.plate_index import edit_distance, normalize_plate
+from backend.sampler import AdaptiveSampler
+from backend.tracker import box_iou, crop_quality
+
+if PYAV_AVAILABLE:
+    import av
+
+# (start_frame, end_frame): end exclusive, None for the end of the video
+Segment = Tuple[int, Optional[int]]
+
+# How often the parent re-checks its cancel event while segments run (seconds)
+_POLL_INTERVAL = 0.5
+
+# Detector of a worker process, built by _init_worker
+_worker_detector: Optional[PlateDetector] = None
+
+
+def _probe(video_path: str) -> Tuple[int, float]:
+    """Frame count (0 if unknown) and frame rate of a video."""
+    decoder = open_decoder(video_path, "opencv")
+    try:
+        return decoder.frame_count, decoder.fps
+    finally:
+        decoder.close()
+
+
+def _keyframes_before(video_path: str, frames: Sequence[int], fps: float) -> List[int]:
+    """Index of the keyframe at or before each frame, found by seeking (no decoding)."""
+    keyframes = []
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        time_base = stream.time_base
+        start_pts = stream.start_time or 0
+        for frame in frames:
+            container.seek(
+                start_pts + int(frame / fps / time_base),
+                stream=stream,
+                backward=True,
+                any_frame=False,
+            )
+            for packet in container.demux(stream):
+                if packet.pts is not None and packet.is_keyframe:
+                    keyframes.append(round(float((packet.pts - start_pts) * time_base) * fps))
+                    break
+    return keyframes
+
+
+def plan_segments(
+    video_path: str, count: int, start_frame: int = 0, min_frames: int = 250
+) -> List[Segment]:
+    """Split a video into up to ``count`` segments that start on keyframes.
+
+    Args:
+        video_path: Video file path.
+        count: Wanted number of segments.
+        start_frame: First frame to cover (e.g. to resume); the first segment
+            starts here even if it is not a keyframe.
+        min_frames: Smallest segment worth its startup cost.
+
+    Returns:
+        Consecutive ``(start_frame, end_frame)`` pairs covering the video from
+        ``start_frame``; the last one ends at None (the end of the video).
+        Without PyAV the cuts are evenly spaced (OpenCV seeks frame-accurately
+        by decoding from the previous keyframe). A single segment if the
+        frame count is unknown.
+    """
+    frame_count, fps = _probe(video_path)
+    count = min(count, (frame_count - start_frame) // max(1, min_frames))
+    if count <= 1:
+        return [(start_frame, None)]
+
+    targets = [start_frame + (frame_count - start_frame) * i // count for i in range(1, count)]
+    cuts = targets
+    if PYAV_AVAILABLE:
+        try:
+            cuts = _keyframes_before(video_path, targets, fps)
+        except (av.error.FFmpegError, OSError, IndexError) as e:
+            print(f"Warning: could not find keyframes in {video_path} ({e}); cutting anywhere")
+    cuts = sorted({cut for cut in cuts if start_frame < cut < frame_count})
+    return list(zip([start_frame] + cuts, cuts + [None]))
+
+
+def _plate_key(record: Dict[str, Any]) -> str:
+    text = record.get("plate_text")
+    return "" if text in (None, "UNKNOWN", "NO_OCR") else normalize_plate(text)
+
+
+def _merge_records(earlier: Dict[str, Any], later: Dict[str, Any]) -> Dict[str, Any]:
+    """One record for a track continued by ``later``; keeps the earlier track's id."""
+    merged = dict(earlier)
+    merged.update(
+        last_seen=later["last_seen"],
+        last_frame=later.get("last_frame"),
+        last_bbox=later.get("last_bbox"),
+        frames_seen=earlier.get("frames_seen", 1) + later.get("frames_seen", 1),
+    )
+    if crop_quality(later) > crop_quality(earlier):
+        for key in ("bbox", "confidence", "plate_crop"):
+            merged[key] = later[key]
+    if _plate_key(later) and (
+        not _plate_key(earlier) or later["ocr_confidence"] > earlier["ocr_confidence"]
+    ):
+        merged["plate_text"] = later["plate_text"]
+        merged["ocr_confidence"] = later["ocr_confidence"]
+    return merged
+
+
+def stitch_tracks(
+    earlier: List[Dict[str, Any]],
+    later: List[Dict[str, Any]],
+    max_gap: float = 1.5,
+    iou_threshold: float = 0.1,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Join tracks cut apart at the boundary between two segments.
+
+    A track from ``earlier`` and one from ``later`` are joined if the second
+    starts within ``max_gap`` seconds of the first one's end and they read
+    the same plate (at most one character apart), or, if either is unread,
+    their boxes at the cut overlap by ``iou_threshold``.
+
+    Args:
+        earlier: Track records of a segment (``PlateTracker.to_record``).
+        later: Track records of the next segment.
+        max_gap: Seconds a plate may go unseen across the cut (the tracker's
+            ``max_age``).
+        iou_threshold: Minimum IoU between the earlier track's last box and
+            the later track's first box.
+
+    Returns:
+        (earlier records that were not continued, ``later`` with joined
+        tracks replaced by merged records, number of joins).
+    """
+    candidates = []
+    for i, a in enumerate(earlier):
+        for j, b in enumerate(later):
+            gap = b["first_seen"] - a["last_seen"]
+            if not (0.0 <= gap <= max_gap):
+                continue
+            key_a, key_b = _plate_key(a), _plate_key(b)
+            same_plate = bool(key_a and key_b and edit_distance(key_a, key_b) <= 1)
+            if key_a and key_b and not same_plate:
+                continue
+            iou = float(
+                box_iou(
+                    np.asarray([a.get("last_bbox", a["bbox"])], dtype=np.float64),
+                    np.asarray([b.get("first_bbox", b["bbox"])], dtype=np.float64),
+                )[0, 0]
+            )
+            if same_plate or iou >= iou_threshold:
+                candidates.append((same_plate, iou, -gap, i, j))
+
+    later = list(later)
+    joined_earlier, joined_later = set(), set()
+    for _, _, _, i, j in sorted(candidates, reverse=True):
+        if i in joined_earlier or j in joined_later:
+            continue
+        joined_earlier.add(i)
+        joined_later.add(j)
+        later[j] = _merge_records(earlier[i], later[j])
+    unjoined = [a for i, a in enumerate(earlier) if i not in joined_earlier]
+    return unjoined, later, len(joined_earlier)
+
+
+def _init_worker(detector_config: Dict[str, Any], threads: int):
+    global _worker_detector
+    cv2.setNumThreads(threads)
+    _worker_detector = PlateDetector(**detector_config, threads=threads)
+
+
+def _run_segment(
+    video_path: str, segment: Segment, options: Dict[str, Any], cancel
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Run one segment through a pipeline in a worker process.
+
+    ``cancel`` is the run's shared (manager) event; setting it stops the
+    segment's decoding like a cancel of an in-process pipeline.
+    """
+    started_at = time.time()
+    records: List[Dict[str, Any]] = []
+    stop, done = threading.Event(), threading.Event()
+
+    def watch_cancel():
+        while not done.wait(_POLL_INTERVAL):
+            if cancel.is_set():
+                stop.set()
+                return
+
+    watcher = threading.Thread(target=watch_cancel, name="segment-cancel", daemon=True)
+    watcher.start()
+    pipeline = VideoPipeline(
+        _worker_detector,
+        records.extend,
+        decoder_factory=partial(open_decoder, **options["decoder"]),
+        **options["pipeline"],
+    )
+    gate, sampler = options["gate"], options["sampler"]
+    try:
+        summary = pipeline.run(
+            video_path,
+            options["sample_rate"],
+            start_frame=segment[0],
+            end_frame=segment[1],
+            cancel=stop,
+            base_timestamp=options["base_timestamp"],
+            gate=MotionGate(**gate) if gate is not None else None,
+            sampler=AdaptiveSampler(**sampler) if sampler is not None else None,
+        )
+    finally:
+        done.set()
+        watcher.join()
+    summary["started_at"] = started_at
+    return records, summary
+
+
+class SegmentedVideoProcessor:
+    """Process single videos on a pool of worker processes, segment by segment."""
+
+    def __init__(
+        self,
+        processes: int,
+        detector_config: Dict[str, Any],
+        threads: int = 0,
+        segment_seconds: float = 300.0,
+        segments_per_process: int = 4,
+        min_segment_seconds: float = 10.0,
+    ):
+        """Fork the worker processes.
+
+        Args:
+            processes: Worker processes, each loading its own detector.
+            detector_config: ``PlateDetector`` keyword arguments.
+            threads: Inference and decode threads per worker (0: cores
+                divided by ``processes``).
+            segment_seconds: Longest segment. Shorter segments balance load
+                better and let a cancel take effect sooner.
+            segments_per_process: Segments per worker at least, so workers
+                that finish early pick up more.
+            min_segment_seconds: Shortest segment worth splitting off.
+
+        Raises:
+            ValueError: If the platform can't fork.
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("Parallel video processing needs the fork start method")
+        self.processes = max(1, processes)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.processes)
+        self.segment_seconds = segment_seconds
+        self.segments_per_process = max(1, segments_per_process)
+        self.min_segment_seconds = min_segment_seconds
+        self.broken = False
+        context = multiprocessing.get_context("fork")
+        # Serves the per-run cancel events the workers poll
+        self._manager = context.Manager()
+        self._executor = ProcessPoolExecutor(
+            self.processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(detector_config, self.threads),
+        )
+        # The first submit forks every worker, while this process is still simple
+        self._executor.submit(int)
+
+    def run(
+        self,
+        video_path: str,
+        sink: Callable[[List[Dict[str, Any]]], None],
+        sample_rate: int = 5,
+        start_frame: int = 0,
+        on_progress: Optional[Callable[[int, int, List[Dict[str, Any]]], None]] = None,
+        cancel: Optional[threading.Event] = None,
+        base_timestamp: Optional[float] = None,
+        gate: Optional[Dict[str, Any]] = None,
+        sampler: Optional[Dict[str, Any]] = None,
+        pipeline_options: Optional[Dict[str, Any]] = None,
+        decoder_options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Process a video file in parallel segments; same contract as ``VideoPipeline.run``.
+
+        Args:
+            video_path: Path to the video file.
+            sink: Called from this thread with track records, in timestamp
+                order, after tracks cut by segment boundaries are joined.
+            sample_rate: Process every ``sample_rate``-th frame.
+            start_frame: Frame index to start from (used to resume).
+            on_progress: Called after each merged segment with the committed
+                frame index, the last processed frame index and the records
+                just passed to ``sink``.
+            cancel: Event that stops the run: segments not started yet are
+                dropped, and running ones stop decoding and store what they
+                have, as an in-process pipeline does.
+            base_timestamp: Epoch seconds of frame 0. Defaults to now.
+            gate: ``MotionGate`` keyword arguments (one gate per segment).
+            sampler: ``AdaptiveSampler`` keyword arguments (one per segment);
+                replaces ``sample_rate`` when given.
+            pipeline_options: ``VideoPipeline`` keyword arguments for the
+                per-segment pipelines (e.g. batch_size, ocr_workers).
+            decoder_options: ``open_decoder`` keyword arguments.
+
+        Returns:
+            ``VideoPipeline.run`` summary. ``pipeline`` holds per-stage totals
+            across workers plus ``processes``, ``segments`` and ``stitched``
+            (tracks joined across cuts).
+
+        Raises:
+            Exception: The first error raised by a segment.
+        """
+        started = time.perf_counter()
+        started_at = time.time()
+        cancel = cancel or threading.Event()
+        pipeline_options = dict(pipeline_options or {})
+        decoder_options = dict(decoder_options or {})
+        if not decoder_options.get("threads"):
+            decoder_options["threads"] = self.threads
+        max_gap = pipeline_options.get("track_max_age", 1.5)
+
+        frame_count, fps = _probe(video_path)
+        duration = max(0, frame_count - start_frame) / fps
+        count = max(
+            self.processes * self.segments_per_process,
+            math.ceil(duration / self.segment_seconds),
+        )
+        segments = plan_segments(
+            video_path,
+            count,
+            start_frame,
+            min_frames=max(1, int(self.min_segment_seconds * fps)),
+        )
+        options = {
+            "sample_rate": max(1, sample_rate),
+            "base_timestamp": started_at if base_timestamp is None else base_timestamp,
+            "gate": gate,
+            "sampler": sampler,
+            "pipeline": pipeline_options,
+            "decoder": decoder_options,
+        }
+        # Shared with the workers, which stop their segments once it is set
+        shared_cancel = self._manager.Event()
+        try:
+            futures: Dict[Future, int] = {
+                self._executor.submit(
+                    _run_segment, video_path, segment, options, shared_cancel
+                ): index
+                for index, segment in enumerate(segments)
+            }
+        except BrokenProcessPool:
+            self.broken = True
+            raise
+
+        finished: Dict[int, Tuple[List[Dict[str, Any]], Dict[str, Any]]] = {}
+        summaries: List[Dict[str, Any]] = []
+        # Records of merged segments that may still continue into the next one
+        carry: List[Dict[str, Any]] = []
+        stored: List[Tuple[int, str]] = []
+        stitched = 0
+        committed_frame = start_frame - 1
+        done_frame = start_frame - 1
+
+        def store(records: List[Dict[str, Any]], committed: int, done: int):
+            nonlocal committed_frame, done_frame
+            records = sorted(records, key=lambda r: r["first_seen"])
+            if records:
+                sink(records)
+                stored.extend((r["frame_index"], r["plate_text"]) for r in records)
+            committed_frame, done_frame = max(committed_frame, committed), done
+            if on_progress is not None:
+                on_progress(committed_frame, done_frame, records)
+
+        try:
+            while futures:
+                done, _ = wait(futures, timeout=_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                if cancel.is_set() and not shared_cancel.is_set():
+                    shared_cancel.set()
+                    for future in futures:
+                        future.cancel()
+                for future in done:
+                    index = futures.pop(future)
+                    if not future.cancelled():
+                        finished[index] = future.result()
+
+                # Merge in video order, stopping at the first segment not back yet
+                # and after a segment that was cancelled partway
+                while len(summaries) in finished and not (summaries and summaries[-1]["cancelled"]):
+                    index = len(summaries)
+                    records, summary = finished.pop(index)
+                    summaries.append(summary)
+                    complete, carry, joins = stitch_tracks(carry, records, max_gap)
+                    stitched += joins
+                    # Tracks still held back started in this or an earlier segment
+                    open_since = [r["frame_index"] for r in carry if r["frame_index"] is not None]
+                    watermark = min([segments[index][0] - 1] + [f - 1 for f in open_since])
+                    store(complete, watermark, summary["total_frames"] - 1)
+        except BrokenProcessPool:
+            self.broken = True
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+        if summaries:
+            # Tracks open at the end of the last merged segment are finished
+            store(carry, done_frame, done_frame)
+        return self._summary(
+            summaries,
+            segments,
+            stored,
+            stitched,
+            start_frame,
+            committed_frame,
+            done_frame,
+            cancel.is_set(),
+            time.perf_counter() - started,
+            started_at,
+        )
+
+    def _summary(
+        self,
+        summaries: List[Dict[str, Any]],
+        segments: List[Segment],
+        stored: List[Tuple[int, str]],
+        stitched: int,
+        start_frame: int,
+        committed_frame: int,
+        done_frame: int,
+        cancelled: bool,
+        wall_seconds: float,
+        started_at: float,
+    ) -> Dict[str, Any]:
+        """Combine per-segment summaries into one ``VideoPipeline.run`` summary."""
+        processed = sum(s["processed_frames"] for s in summaries)
+        total_frames = done_frame + 1
+        stored.sort(key=lambda d: d[0])
+
+        stages: Dict[str, Dict[str, float]] = {}
+        for summary in summaries:
+            for name, stage in summary["pipeline"]["stages"].items():
+                totals = stages.setdefault(name, {"items": 0, "busy_seconds": 0.0})
+                totals["items"] += stage["items"]
+                totals["busy_seconds"] += stage["busy_seconds"]
+        for totals in stages.values():
+            totals["busy_seconds"] = round(totals["busy_seconds"], 3)
+            totals["items_per_second"] = (
+                round(totals["items"] / wall_seconds, 2) if wall_seconds else 0.0
+            )
+            # Busy share of all workers' time
+            totals["utilization"] = (
+                round(totals["busy_seconds"] / (wall_seconds * self.processes), 3)
+                if wall_seconds
+                else 0.0
+            )
+
+        result = {
+            "total_frames": total_frames,
+            "processed_frames": processed,
+            "detections": [text for _, text in stored],
+            "tracks": len(stored),
+            "committed_frame": committed_frame,
+            "cancelled": cancelled,
+            "effective_stride": (
+                round((total_frames - start_frame) / processed, 2) if processed else None
+            ),
+            "pipeline": {
+                "wall_seconds": round(wall_seconds, 3),
+                "processes": self.processes,
+                "threads_per_process": self.threads,
+                "segments": len(segments),
+                "segments_done": len(summaries),
+                "stitched": stitched,
+                "decoder": summaries[0]["pipeline"]["decoder"] if summaries else None,
+                "stages": stages,
+            },
+        }
+        gates = [s["gate"] for s in summaries if "gate" in s]
+        if gates:
+            checked = sum(g["checked"] for g in gates)
+            passed = sum(g["passed"] for g in gates)
+            result["gate"] = {
+                "checked": checked,
+                "passed": passed,
+                "skipped": checked - passed,
+                "hit_rate": round(passed / checked, 3) if checked else None,
+                "roi": gates[0]["roi"],
+            }
+        samplings = [s["sampling"] for s in summaries if "sampling" in s]
+        if samplings:
+            result["sampling"] = {
+                "min_stride": samplings[0]["min_stride"],
+                "max_stride": samplings[0]["max_stride"],
+                "sampled": sum(s["sampled"] for s in samplings),
+                "active": sum(s["active"] for s in samplings),
+            }
+        firsts = [
+            s["started_at"] + s["first_detection_seconds"]
+            for s in summaries
+            if "first_detection_seconds" in s
+        ]
+        if firsts:
+            result["first_detection_seconds"] = round(min(firsts) - started_at, 3)
+        return result
+
+    def close(self):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
@@ -0,0 +1,278 @@
+"""Incrementally maintained detection statistics.
+
+``/api/stats`` used to count the whole detections table (total, distinct
+plates, distinct cameras) on every call. ``DetectionStats`` keeps those
+numbers up to date as detections are written instead: plain counters for
+totals, per-camera and per-hour rollups, and ``HyperLogLog`` sketches for
+distinct plates (about 1% error in a few KB, where an exact set would grow
+with the history). Reading the stats is then independent of table size.
+
+The state is saved to a JSON snapshot every few minutes together with a
+watermark, the highest detection id it covers. On startup the snapshot is
+loaded and only detections after the watermark are replayed from the
+database; without a snapshot the whole table is scanned once. Batches written
+while that catch-up runs are held back (``add_batch``) and counted once it
+ends (``finish_catch_up``), unless the catch-up already covered them, so no
+row is counted twice and the watermark never passes a row not yet counted.
+
+Deleting a detection decrements the counters, but a sketch cannot forget a
+plate, so distinct plate counts never go down.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.plate_index import PLACEHOLDERS
+
+
+class HyperLogLog:
+    """Distinct count estimator over 2**p one-byte registers (error ~1.04/sqrt(2**p))."""
+
+    def __init__(self, p: int = 14, registers: Optional[bytes] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(self.registers)}")
+
+    def add(self, value: str):
+        """Add a value (only its hash is kept)."""
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h & (self.m - 1)
+        # Position of the first set bit in the remaining 64 - p bits
+        rank = (64 - self.p) - (h >> self.p).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """Estimated number of distinct values added."""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range: linear counting is more accurate
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_json(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode()
+
+    @classmethod
+    def from_json(cls, data: str, p: int) -> "HyperLogLog":
+        return cls(p, base64.b64decode(data))
+
+
+# Sketch sizes: overall distinct plates, and per camera
+TOTAL_PRECISION = 14
+CAMERA_PRECISION = 11
+
+
+class DetectionStats:
+    """Totals, per-camera and per-hour detection counts with distinct plate estimates."""
+
+    def __init__(self, hours: int = 168):
+        """Initialize stats.
+
+        Args:
+            hours: Hourly buckets kept (default: one week).
+        """
+        self.hours = hours
+        self._lock = threading.Lock()
+        self._reset()
+        # Written batches held back until the startup catch-up ends
+        self.caught_up = False
+        self._deferred: List[Tuple[List[tuple], Any]] = []
+
+    def _reset(self):
+        self.total = 0
+        self.plates = HyperLogLog(TOTAL_PRECISION)
+        # camera_id -> {"detections", "plates" (HyperLogLog), "last_detection"}
+        self.cameras: Dict[str, Dict[str, Any]] = {}
+        # "YYYY-MM-DDTHH:00" (UTC) -> detections
+        self.hourly: Dict[str, int] = {}
+        # Highest detection id counted (int for SQL, ObjectId hex for Mongo)
+        self.watermark: Any = None
+
+    def add(self, plate_number: Optional[str], camera_id: Optional[str], created_at=None, id=None):
+        """Count one stored detection.
+
+        Args:
+            plate_number: Plate text; placeholders count as detections only.
+            camera_id: Camera of the detection.
+            created_at: When it was recorded (naive UTC datetime).
+            id: Detection id, advancing the watermark.
+        """
+        with self._lock:
+            self._add(plate_number, camera_id, created_at, id)
+
+    def add_batch(self, detections: Iterable[tuple], id=None):
+        """Count a batch of newly written detections.
+
+        Until ``finish_catch_up`` the batch is held back, so it can neither be
+        counted twice nor move the watermark past rows the catch-up has not
+        counted yet.
+
+        Args:
+            detections: (plate_number, camera_id, created_at) tuples.
+            id: Highest detection id in the batch.
+        """
+        detections = list(detections)
+        with self._lock:
+            if not self.caught_up:
+                self._deferred.append((detections, id))
+                return
+            for plate_number, camera_id, created_at in detections:
+                self._add(plate_number, camera_id, created_at, id)
+
+    def finish_catch_up(self, newest=None, counted: Optional[Set[Any]] = None):
+        """End the startup catch-up and count the batches held back meanwhile.
+
+        Args:
+            newest: Highest id the catch-up read up to (None if none); held
+                back batches up to it were already counted.
+            counted: Ids the catch-up counted, for ids that are not assigned
+                in insertion order (Mongo ObjectIds are made by the client).
+                Held back batches are then skipped by membership instead of
+                by comparison with ``newest``.
+        """
+        with self._lock:
+            for detections, id in self._deferred:
+                if counted is not None:
+                    skip = id in counted
+                else:
+                    skip = id is not None and newest is not None and id <= newest
+                if skip:
+                    continue
+                for plate_number, camera_id, created_at in detections:
+                    self._add(plate_number, camera_id, created_at, id)
+            self._deferred = []
+            self.caught_up = True
+
+    def _add(self, plate_number, camera_id, created_at, id):
+        """Count one detection. Caller holds the lock."""
+        self.total += 1
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            camera = self.cameras[camera_id] = {
+                "detections": 0,
+                "plates": HyperLogLog(CAMERA_PRECISION),
+                "last_detection": None,
+            }
+        camera["detections"] += 1
+        if plate_number and plate_number not in PLACEHOLDERS:
+            self.plates.add(plate_number)
+            camera["plates"].add(plate_number)
+        if created_at is not None:
+            stamp = created_at.isoformat()
+            if camera["last_detection"] is None or stamp > camera["last_detection"]:
+                camera["last_detection"] = stamp
+            hour = created_at.strftime("%Y-%m-%dT%H:00")
+            self.hourly[hour] = self.hourly.get(hour, 0) + 1
+            self._trim_hours()
+        if id is not None and (self.watermark is None or id > self.watermark):
+            self.watermark = id
+
+    def remove(self, camera_id: Optional[str], created_at=None):
+        """Uncount a deleted detection (distinct plate estimates are unchanged)."""
+        with self._lock:
+            self.total = max(0, self.total - 1)
+            camera = self.cameras.get(camera_id)
+            if camera is not None:
+                camera["detections"] = max(0, camera["detections"] - 1)
+            if created_at is not None:
+                hour = created_at.strftime("%Y-%m-%dT%H:00")
+                if self.hourly.get(hour):
+                    self.hourly[hour] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current stats for the API."""
+        with self._lock:
+            return {
+                "total_detections": self.total,
+                "unique_plates": self.plates.count(),
+                "cameras": sorted(c for c in self.cameras if c is not None),
+                "per_camera": {
+                    camera_id: {
+                        "detections": camera["detections"],
+                        "unique_plates": camera["plates"].count(),
+                        "last_detection": camera["last_detection"],
+                    }
+                    for camera_id, camera in self.cameras.items()
+                    if camera_id is not None
+                },
+                "hourly": [
+                    {"hour": hour, "detections": count}
+                    for hour, count in sorted(self.hourly.items())
+                ],
+            }
+
+    def save(self, path: str):
+        """Write the state to a JSON snapshot (atomically)."""
+        with self._lock:
+            state = {
+                "total": self.total,
+                "plates": self.plates.to_json(),
+                "cameras": {
+                    (camera_id or ""): {
+                        "detections": camera["detections"],
+                        "plates": camera["plates"].to_json(),
+                        "last_detection": camera["last_detection"],
+                    }
+                    for camera_id, camera in self.cameras.items()
+                },
+                "hourly": self.hourly,
+                "watermark": self.watermark,
+                "saved_at": datetime.utcnow().isoformat(),
+            }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def load(self, path: str) -> bool:
+        """Replace the state with a snapshot from ``save``. Returns False if there is none."""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            print(f"Warning: ignoring unreadable stats snapshot {path}: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            self.total = state["total"]
+            self.plates = HyperLogLog.from_json(state["plates"], TOTAL_PRECISION)
+            for camera_id, camera in state["cameras"].items():
+                self.cameras[camera_id or None] = {
+                    "detections": camera["detections"],
+                    "plates": HyperLogLog.from_json(camera["plates"], CAMERA_PRECISION),
+                    "last_detection": camera["last_detection"],
+                }
+            self.hourly = dict(state["hourly"])
+            self.watermark = state["watermark"]
+            self._trim_hours()
+        return True
+
+    def _trim_hours(self):
+        """Keep the newest ``hours`` buckets. Caller holds the lock."""
+        excess = len(self.hourly) - self.hours
+        if excess > 0:
+            for hour in sorted(self.hourly)[:excess]:
+                del self.hourly[hour]
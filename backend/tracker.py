@@ -0,0 +1,266 @@
+"""Per-camera plate tracking to deduplicate detections across frames.
+
+A plate that stays in view for several frames produces one track instead of
+one detection per frame. Boxes are linked across frames by IoU against each
+track's predicted position (a constant-velocity model, the motion half of a
+Kalman filter). OCR is requested only when a track is new or its crop quality
+clearly improves, and a finished track becomes a single record with
+first/last-seen times and its best crop and text.
+"""
+
+from __future__ import annotations
+
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (track, detection result) pairs whose crops should be sent to OCR
+OcrRequests = List[Tuple["Track", Dict[str, Any]]]
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between two sets of [x1, y1, x2, y2] boxes.
+
+    Returns:
+        Array of shape (len(a), len(b)).
+    """
+    a = a[:, None, :]
+    b = b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def crop_quality(result: Dict[str, Any]) -> float:
+    """Score a detection crop for OCR: detector confidence times box size."""
+    x1, y1, x2, y2 = result["bbox"]
+    return float(result["confidence"]) * float(np.sqrt(max(0, x2 - x1) * max(0, y2 - y1)))
+
+
+class Track:
+    """One plate followed across frames."""
+
+    def __init__(self, result: Dict[str, Any], timestamp: float):
+        self.id = uuid.uuid4().hex
+        self.bbox = np.asarray(result["bbox"], dtype=np.float64)
+        self.velocity = np.zeros(4)
+        self.first_seen = self.last_seen = timestamp
+        # Source frame indices, when the caller tags results with them
+        self.first_frame: Optional[int] = result.get("frame_index")
+        self.last_frame = self.first_frame
+        self.first_bbox = list(result["bbox"])
+        self.hits = 1
+
+        # Best crop seen so far (detached, so the source frame can be released)
+        self.best_quality = crop_quality(result)
+        self.best_confidence = float(result["confidence"])
+        self.best_bbox = list(result["bbox"])
+        self.best_crop = result["plate_crop"].detach()
+
+        # Quality of the crop OCR last ran on, and the best reading so far
+        self.ocr_quality = 0.0
+        self.plate_text: Optional[str] = None
+        self.ocr_confidence = 0.0
+
+    def predict(self, timestamp: float) -> np.ndarray:
+        """Box position extrapolated to ``timestamp``."""
+        return self.bbox + self.velocity * (timestamp - self.last_seen)
+
+    def update(self, result: Dict[str, Any], timestamp: float):
+        """Add a matched detection."""
+        bbox = np.asarray(result["bbox"], dtype=np.float64)
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            # Smoothed per-second box velocity
+            self.velocity = 0.5 * self.velocity + 0.5 * (bbox - self.bbox) / dt
+        self.bbox = bbox
+        self.last_seen = timestamp
+        self.last_frame = result.get("frame_index", self.last_frame)
+        self.hits += 1
+
+        quality = crop_quality(result)
+        if quality > self.best_quality:
+            self.best_quality = quality
+            self.best_confidence = float(result["confidence"])
+            self.best_bbox = list(result["bbox"])
+            self.best_crop = result["plate_crop"].detach()
+
+    def to_record(self) -> Dict[str, Any]:
+        """Convert to a detection record (same keys as a PlateDetector result).
+
+        ``first_bbox``/``last_bbox`` and ``last_frame`` locate the track's ends,
+        e.g. to join tracks cut apart by a video segment boundary.
+        """
+        return {
+            "track_id": self.id,
+            "frame_index": self.first_frame,
+            "bbox": self.best_bbox,
+            "confidence": self.best_confidence,
+            "plate_text": self.plate_text or "UNKNOWN",
+            "ocr_confidence": self.ocr_confidence,
+            "plate_crop": self.best_crop,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "frames_seen": self.hits,
+            "first_bbox": self.first_bbox,
+            "last_bbox": [int(round(v)) for v in self.bbox],
+            "last_frame": self.last_frame,
+        }
+
+
+class PlateTracker:
+    """IoU tracker for one camera."""
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: float = 1.5,
+        ocr_improvement: float = 1.25,
+    ):
+        """Initialize tracker.
+
+        Args:
+            iou_threshold: Minimum IoU between a predicted track box and a
+                detection to link them.
+            max_age: Seconds without a match before a track is finished.
+            ocr_improvement: Re-run OCR when a crop's quality exceeds the last
+                OCR'd crop's quality by this factor.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.ocr_improvement = ocr_improvement
+        self.tracks: List[Track] = []
+        self._lock = threading.Lock()
+
+    def update(
+        self, results: List[Dict[str, Any]], timestamp: float
+    ) -> Tuple[OcrRequests, List[Track]]:
+        """Link one frame's detections to tracks.
+
+        Each result gets a ``track_id`` and the track's current ``plate_text``
+        and ``ocr_confidence``.
+
+        Args:
+            results: PlateDetector results for the frame (OCR not required).
+            timestamp: Frame time in seconds; must not decrease between calls.
+
+        Returns:
+            (ocr_requests, finished): detections whose crops should be OCR'd
+            (pass them to ``apply_ocr``), and tracks that ended. Call
+            ``to_record`` on finished tracks once outstanding OCR is applied.
+        """
+        with self._lock:
+            matches = self._match(results, timestamp)
+
+            requests: OcrRequests = []
+            for i, result in enumerate(results):
+                track = matches.get(i)
+                if track is None:
+                    track = Track(result, timestamp)
+                    self.tracks.append(track)
+                else:
+                    track.update(result, timestamp)
+
+                if crop_quality(result) > track.ocr_quality * self.ocr_improvement:
+                    track.ocr_quality = crop_quality(result)
+                    requests.append((track, result))
+
+                result["track_id"] = track.id
+                result["plate_text"] = track.plate_text
+                result["ocr_confidence"] = track.ocr_confidence
+
+            finished = self._expire(timestamp)
+        return requests, finished
+
+    def apply_ocr(self, requests: OcrRequests, ocr_results: List[Tuple[str, float]]):
+        """Store OCR results for ``update``'s requests, keeping each track's best read."""
+        with self._lock:
+            for (track, result), (text, conf) in zip(requests, ocr_results):
+                if track.plate_text is None or conf >= track.ocr_confidence:
+                    track.plate_text = text
+                    track.ocr_confidence = conf
+                result["plate_text"] = track.plate_text
+                result["ocr_confidence"] = track.ocr_confidence
+
+    def expire(self, timestamp: float) -> List[Track]:
+        """Finish tracks not seen within ``max_age`` of ``timestamp``."""
+        with self._lock:
+            return self._expire(timestamp)
+
+    def flush(self) -> List[Track]:
+        """Finish every open track (e.g. at the end of a video)."""
+        with self._lock:
+            finished, self.tracks = self.tracks, []
+            return finished
+
+    def _match(self, results: List[Dict[str, Any]], timestamp: float) -> Dict[int, Track]:
+        """Greedy IoU assignment of detections to predicted track boxes."""
+        if not results or not self.tracks:
+            return {}
+        predicted = np.stack([track.predict(timestamp) for track in self.tracks])
+        detected = np.asarray([result["bbox"] for result in results], dtype=np.float64)
+        iou = box_iou(detected, predicted)
+
+        matches: Dict[int, Track] = {}
+        used_tracks = set()
+        for flat in np.argsort(-iou, axis=None):
+            det_idx, track_idx = np.unravel_index(flat, iou.shape)
+            if iou[det_idx, track_idx] < self.iou_threshold:
+                break
+            if det_idx in matches or track_idx in used_tracks:
+                continue
+            matches[int(det_idx)] = self.tracks[track_idx]
+            used_tracks.add(track_idx)
+        return matches
+
+    def _expire(self, timestamp: float) -> List[Track]:
+        finished = [t for t in self.tracks if timestamp - t.last_seen > self.max_age]
+        if finished:
+            self.tracks = [t for t in self.tracks if timestamp - t.last_seen <= self.max_age]
+        return finished
+
+
+class TrackerRegistry:
+    """One PlateTracker per camera_id, created on first use."""
+
+    def __init__(self, **tracker_kwargs):
+        self.tracker_kwargs = tracker_kwargs
+        self._trackers: Dict[str, PlateTracker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, camera_id: str) -> PlateTracker:
+        """Get (or create) the tracker for a camera."""
+        with self._lock:
+            tracker = self._trackers.get(camera_id)
+            if tracker is None:
+                tracker = self._trackers[camera_id] = PlateTracker(**self.tracker_kwargs)
+            return tracker
+
+    def expire(self, timestamp: float) -> List[Tuple[str, Track]]:
+        """Finish stale tracks on every camera.
+
+        Returns:
+            (camera_id, track) pairs.
+        """
+        with self._lock:
+            trackers = list(self._trackers.items())
+        return [
+            (camera_id, track)
+            for camera_id, tracker in trackers
+            for track in tracker.expire(timestamp)
+        ]
+
+    def flush(self, camera_id: Optional[str] = None) -> List[Tuple[str, Track]]:
+        """Finish every open track of one camera (or of all cameras).
+
+        Returns:
+            (camera_id, track) pairs.
+        """
+        with self._lock:
+            trackers = [item for item in self._trackers.items() if camera_id in (None, item[0])]
+        return [(camera, track) for camera, tracker in trackers for track in tracker.flush()]
@@ -0,0 +1,180 @@
+"""Video uploads that can be decoded while they are still arriving.
+
+A multipart upload is parsed completely (and spooled to a temporary file)
+before the view runs, then copied into ``uploads/`` and only then queued, so
+a large video is written twice and decoding waits for the last byte.
+
+``POST /api/detect/video/stream`` takes the raw video as the request body
+instead. The view queues the job first, then copies the body to the job's
+upload file chunk by chunk through ``StreamingUpload.receive``. Meanwhile the
+job worker decodes the same file through ``StreamingUpload.open``, a reader
+that blocks at the current end of the data until more arrives or the upload
+finishes, so detection starts with the first chunks. That needs a decoder
+that reads from file objects (PyAV). Demuxers learn the file size from the
+request's Content-Length. Containers whose index sits at the end of the file
+(MP4 without ``faststart``, AVI) are still decoded correctly, but only once
+that part has arrived; faststart MP4, MKV/WebM and MPEG-TS start right away.
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+# How often a blocked reader re-checks its cancel event (seconds)
+_POLL_INTERVAL = 0.1
+
+
+class StreamingUpload:
+    """An upload file being written by one thread and read by others."""
+
+    def __init__(self, path: Path, expected_size: Optional[int] = None, chunk_size: int = 1 << 20):
+        """Create the upload file.
+
+        Args:
+            path: Upload file path (unique per job).
+            expected_size: Final size (the request's Content-Length), which
+                lets readers learn the file size before the upload completes.
+            chunk_size: Bytes copied from the request per write.
+        """
+        self.path = Path(path)
+        self.expected_size = expected_size
+        self.chunk_size = chunk_size
+        self.bytes_received = 0
+        self.complete = False
+        self.error: Optional[str] = None
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self._file = open(self.path, "wb")
+        self._cond = threading.Condition()
+
+    def receive(self, stream: BinaryIO) -> int:
+        """Copy a request body into the upload file. Returns bytes received.
+
+        Raises:
+            Exception: Whatever reading the request raised (e.g. the client
+                disconnected); readers then fail with an ``OSError``.
+        """
+        try:
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                self._file.write(chunk)
+                self._file.flush()
+                with self._cond:
+                    self.bytes_received += len(chunk)
+                    self._cond.notify_all()
+        except BaseException as e:
+            self._finish(str(e) or type(e).__name__)
+            raise
+        self._finish(None)
+        return self.bytes_received
+
+    def _finish(self, error: Optional[str]):
+        self._file.close()
+        with self._cond:
+            self.complete = True
+            self.error = error
+            self.finished = time.monotonic()
+            self._cond.notify_all()
+
+    def wait(self, cancel: Optional[threading.Event] = None) -> bool:
+        """Block until the upload is complete. Returns True if it succeeded."""
+        with self._cond:
+            while not self.complete:
+                if cancel is not None and cancel.is_set():
+                    return False
+                self._cond.wait(_POLL_INTERVAL)
+            return self.error is None
+
+    def open(self, cancel: Optional[threading.Event] = None) -> BinaryIO:
+        """Readable, seekable view of the upload that waits for data still to come.
+
+        Args:
+            cancel: Makes blocked reads return end of file once set.
+        """
+        return io.BufferedReader(_UploadReader(self, cancel), buffer_size=self.chunk_size)
+
+    def status(self) -> Dict[str, Any]:
+        """Bytes received, whether the upload is complete, and how long it took."""
+        with self._cond:
+            end = self.finished if self.finished is not None else time.monotonic()
+            return {
+                "bytes_received": self.bytes_received,
+                "complete": self.complete,
+                "seconds": round(end - self.started, 3),
+                "error": self.error,
+            }
+
+
+class _UploadReader(io.RawIOBase):
+    """Reads an upload file, blocking at the end until more data is written."""
+
+    def __init__(self, upload: StreamingUpload, cancel: Optional[threading.Event]):
+        super().__init__()
+        self.upload = upload
+        self.cancel = cancel
+        self._file = open(upload.path, "rb")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        available = self._wait(lambda: self.upload.bytes_received > self._pos)
+        if available is None:
+            return 0
+        available -= self._pos
+        if available <= 0:
+            return 0
+        self._file.seek(self._pos)
+        n = self._file.readinto(memoryview(buffer)[:available])
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_END:
+            # Demuxers ask for the size up front; without a Content-Length it
+            # is only known once the upload is complete
+            size = self.upload.expected_size
+            if size is None:
+                size = self._wait(lambda: False)
+            base = size if size is not None else self.upload.bytes_received
+        elif whence == io.SEEK_CUR:
+            base = self._pos
+        else:
+            base = 0
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+    def _wait(self, ready) -> Optional[int]:
+        """Wait until ``ready()`` or the upload is complete; returns bytes received.
+
+        Returns None if cancelled first.
+
+        Raises:
+            OSError: If the upload failed.
+        """
+        upload = self.upload
+        with upload._cond:
+            while not (ready() or upload.complete):
+                if self.cancel is not None and self.cancel.is_set():
+                    return None
+                upload._cond.wait(_POLL_INTERVAL)
+            if upload.error is not None and upload.bytes_received <= self._pos:
+                raise OSError(f"Upload failed: {upload.error}")
+            return upload.bytes_received
@@ -0,0 +1,303 @@
+"""Write-behind batching of detection inserts.
+
+Detections used to be written one row (or one frame's worth of rows) at a
+time from whichever thread produced them. ``DetectionWriter`` buffers items
+from every producer (API requests, live streams, camera ingest, video jobs)
+and writes them with one bulk insert per flush, on a background thread,
+whenever ``batch_size`` items are pending or the oldest has waited
+``flush_interval`` seconds.
+
+Callers that need durability (e.g. a video job about to checkpoint its
+progress, or a request returning ids) pass ``wait=True`` and block until
+their items are written. ``mode="sync"`` disables buffering and writes in the
+caller's thread.
+
+A failed write is retried with exponential backoff (up to 30 s), except for
+the items of ``wait=True`` callers in the failed batch: those are dropped and
+the error is raised to the caller. A ``write_many`` that stored only part of
+a batch (e.g. an unordered Mongo ``insert_many``, which keeps going past a bad
+document) raises ``PartialWriteError`` with the indices it stored; those
+items are never written again, and a waiting caller gets a
+``PartialWriteError`` listing which of its own items were stored. Any other
+error from ``add(wait=True)`` means none of its items were written or will
+be, so the caller can retry them without duplicating rows. The items of one
+waited ``add`` always go to the same ``write_many`` call, even beyond
+``batch_size``. If the buffer exceeds ``max_pending`` the oldest items are
+dropped with a warning.
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Bulk-inserts a list of items (e.g. insert_many or an executemany INSERT)
+WriteMany = Callable[[List[Any]], None]
+
+MODES = ("async", "sync")
+
+
+class PartialWriteError(Exception):
+    """A bulk write that stored only some of its items.
+
+    Attributes:
+        written: Indices of the stored items, into the ``write_many`` batch
+            (or, raised from ``add``, into the caller's items).
+        cause: The underlying write error.
+    """
+
+    def __init__(self, written: Sequence[int], cause: BaseException):
+        super().__init__(str(cause))
+        self.written = list(written)
+        self.cause = cause
+
+
+class _Ticket:
+    """Completion of the items of one ``add(wait=True)`` call."""
+
+    __slots__ = ("event", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class DetectionWriter:
+    """Buffer detection items and bulk-insert them on size or time thresholds."""
+
+    def __init__(
+        self,
+        write_many: WriteMany,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        mode: str = "async",
+        max_pending: int = 50000,
+    ):
+        """Initialize writer.
+
+        Args:
+            write_many: Bulk-inserts a list of items. Runs on the writer thread
+                (``async``) or the caller's thread (``sync``), so it must set up
+                its own app/DB context.
+            batch_size: Flush once this many items are pending; also the most
+                items per ``write_many`` call.
+            flush_interval: Flush once the oldest pending item is this old (s).
+            mode: ``async`` (write-behind) or ``sync`` (write on ``add``).
+            max_pending: Most items kept while writes keep failing.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown write mode '{mode}', expected one of {MODES}")
+        self.write_many = write_many
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.mode = mode
+        self.max_pending = max(self.batch_size, max_pending)
+
+        self._pending: List[Any] = []
+        # Tickets waiting on items up to an index of the pending list:
+        # (start, end, ticket), where [start, end) are the ticket's own items
+        self._tickets: List[tuple] = []
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_error: Optional[str] = None
+
+        if mode == "async":
+            self._thread = threading.Thread(target=self._work, name="db-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def add(self, items: Sequence[Any], wait: bool = False):
+        """Queue items for insertion.
+
+        Args:
+            items: Items for ``write_many``.
+            wait: Block until these items are written.
+
+        Raises:
+            PartialWriteError: With ``wait`` (or in ``sync`` mode), if only the
+                listed items were written; the rest are no longer queued.
+            Exception: With ``wait`` (or in ``sync`` mode), the write error;
+                the items were not written and are no longer queued.
+        """
+        if not items:
+            return
+        if self.mode == "sync" or self._closed:
+            with self._write_lock:
+                self._write(list(items))
+            return
+
+        ticket = _Ticket() if wait else None
+        with self._cond:
+            # The first pending item starts the flush timer
+            start_timer = self._oldest is None
+            if start_timer:
+                self._oldest = time.monotonic()
+            start = len(self._pending)
+            self._pending.extend(items)
+            if ticket is not None:
+                self._tickets.append((start, len(self._pending), ticket))
+            if start_timer or wait or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if ticket is not None:
+            ticket.event.wait()
+            if ticket.error is not None:
+                raise ticket.error
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written.
+
+        Returns:
+            False if the timeout expired or the write failed.
+        """
+        if self.mode == "sync":
+            return True
+        ticket = _Ticket()
+        with self._cond:
+            # Owns no items: a failed write is reported but nothing is dropped
+            self._tickets.append((len(self._pending), len(self._pending), ticket))
+            self._cond.notify()
+        return ticket.event.wait(timeout) and ticket.error is None
+
+    def close(self):
+        """Write pending items and stop the writer thread."""
+        if self._thread is None or self._closed:
+            return
+        self.flush(timeout=10.0)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(5.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Write counters."""
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "mode": self.mode,
+            "pending": pending,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "last_error": self.last_error,
+        }
+
+    # -- internals -----------------------------------------------------------
+
+    def _work(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                while not self._due(backoff):
+                    if self._closed:
+                        return
+                    timeout = None
+                    if self._oldest is not None:
+                        delay = backoff or self.flush_interval
+                        timeout = max(0.0, self._oldest + delay - time.monotonic())
+                    self._cond.wait(timeout)
+                # A waited add is never split across writes
+                size = self.batch_size
+                for start, end, _ in self._tickets:
+                    if start < size < end:
+                        size = end
+                batch = self._pending[:size]
+
+            try:
+                with self._write_lock:
+                    self._write(batch)
+            except Exception as e:
+                # Waiting callers see the error and their items are dropped, as
+                # are items a partial write stored; the rest are kept for a retry
+                # after a backoff
+                backoff = min(max(backoff * 2, 1.0), 30.0)
+                stored = set(e.written) if isinstance(e, PartialWriteError) else set()
+                with self._cond:
+                    failed = [t for t in self._tickets if t[1] <= len(batch)]
+                    removed = set(stored)
+                    for start, end, ticket in failed:
+                        removed.update(range(start, end))
+                        if isinstance(e, PartialWriteError):
+                            written = [i - start for i in range(start, end) if i in stored]
+                            self._release(ticket, PartialWriteError(written, e.cause))
+                        else:
+                            self._release(ticket, e)
+                    self._pending = [
+                        item for i, item in enumerate(self._pending) if i not in removed
+                    ]
+                    self._tickets = [
+                        (start - len(removed), end - len(removed), ticket)
+                        for start, end, ticket in self._tickets[len(failed) :]
+                    ]
+                    self._oldest = time.monotonic() if self._pending else None
+                    self._trim()
+                continue
+
+            backoff = 0.0
+            with self._cond:
+                del self._pending[: len(batch)]
+                self._oldest = time.monotonic() if self._pending else None
+                remaining = []
+                for start, end, ticket in self._tickets:
+                    if end <= len(batch):
+                        self._release(ticket, None)
+                    else:
+                        remaining.append((start - len(batch), end - len(batch), ticket))
+                self._tickets = remaining
+
+    def _due(self, backoff: float) -> bool:
+        """Whether a flush should run now. Caller holds the condition."""
+        if not self._pending:
+            # Nothing to write: release flush() callers right away
+            for _, _, ticket in self._tickets:
+                self._release(ticket, None)
+            self._tickets = []
+            return False
+        if backoff:
+            return time.monotonic() >= self._oldest + backoff
+        return (
+            len(self._pending) >= self.batch_size
+            or bool(self._tickets)
+            or self._closed
+            or time.monotonic() >= self._oldest + self.flush_interval
+        )
+
+    def _write(self, batch: List[Any]):
+        try:
+            self.write_many(batch)
+        except Exception as e:
+            if isinstance(e, PartialWriteError):
+                self.written += len(e.written)
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"Warning: writing {len(batch)} detections failed: {e}")
+            raise
+        self.written += len(batch)
+        self.flushes += 1
+
+    def _trim(self):
+        """Drop the oldest items beyond ``max_pending``. Caller holds the condition."""
+        excess = len(self._pending) - self.max_pending
+        if excess > 0:
+            del self._pending[:excess]
+            self.dropped += excess
+            self._tickets = [
+                (max(0, start - excess), max(0, end - excess), ticket)
+                for start, end, ticket in self._tickets
+            ]
+            print(f"Warning: dropped {excess} unwritten detections")
+
+    @staticmethod
+    def _release(ticket: _Ticket, error: Optional[BaseException]):
+        ticket.error = error
+        ticket.event.set()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import {
   Box, Card, CardContent, Typography, Table, TableBody, TableCell,
   TableContainer, TableHead, TableRow, Paper, Chip, IconButton,
@@ -16,6 +16,12 @@ const DetectionHistory = () => {
   const [cameras, setCameras] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  // cursors.current[n] continues the list at page n (page 0 needs none)
+  const cursors = useRef([null]);
+
+  useEffect(() => {
+    cursors.current = [null];
+  }, [rowsPerPage, cameraFilter]);
 
   useEffect(() => {
     fetchDetections();
@@ -27,18 +33,28 @@ const DetectionHistory = () => {
     
     try {
       const params = {
-        page: page + 1,
-        per_page: rowsPerPage
+        per_page: rowsPerPage,
+        total: 'approx',
+        // Only what the table shows
+        fields: 'id,plate_number,camera_id,confidence,created_at,bbox'
       };
       
       if (cameraFilter !== 'all') {
         params.camera_id = cameraFilter;
       }
+      if (cursors.current[page]) {
+        params.cursor = cursors.current[page];
+      }
 
       const response = await axios.get('http://localhost:5000/api/detections', { params });
       
-      setDetections(response.data.detections || []);
-      setTotalCount(response.data.total || 0);
+      const { detections: rows = [], next_cursor: nextCursor, total = 0 } = response.data;
+      setDetections(rows);
+      cursors.current[page + 1] = nextCursor;
+      // The total is an estimate; keep "next" enabled exactly while there is a next page
+      setTotalCount(nextCursor
+        ? Math.max(total, (page + 1) * rowsPerPage + 1)
+        : page * rowsPerPage + rows.length);
       
       // Extract unique cameras
       const uniqueCameras = [...new Set(response.data.detections.map(d => d.camera_id))];
@@ -90,7 +106,7 @@ const DetectionHistory = () => {
               select
               label="Camera"
               value={cameraFilter}
-              onChange={(e) => setCameraFilter(e.target.value)}
+              onChange={(e) => { setCameraFilter(e.target.value); setPage(0); }}
               size="small"
               sx={{ minWidth: 150 }}
             >
@@ -144,7 +160,7 @@ const DetectionHistory = () => {
                       color={det.confidence > 0.8 ? 'success' : 'warning'}
                     />
                   </TableCell>
-                  <TableCell>{formatDate(det.timestamp)}</TableCell>
+                  <TableCell>{formatDate(det.created_at)}</TableCell>
                   <TableCell>
                     <Typography variant="caption">
                       [{det.bbox.x1}, {det.bbox.y1}, {det.bbox.x2}, {det.bbox.y2}]
@@ -4,6 +4,7 @@ import {
 } from '@mui/material';
 import { Videocam, VideocamOff, CameraAlt } from '@mui/icons-material';
 import io from 'socket.io-client';
+import { decode } from '@msgpack/msgpack';
 
 const LiveDetection = () => {
   const videoRef = useRef(null);
@@ -13,17 +14,37 @@ const LiveDetection = () => {
   const [detections, setDetections] = useState([]);
   const [error, setError] = useState('');
   const [mediaStream, setMediaStream] = useState(null);
+  // Refs so the frame interval sees current values, not its first render's
+  const socketRef = useRef(null);
+  const streamingRef = useRef(false);
+  const seqRef = useRef(0);
+  const lastSeqRef = useRef(-1);
+  // Delay between frames, slowed to the rate the server reports it can process
+  const frameDelayRef = useRef(200);
 
   useEffect(() => {
     // Connect to WebSocket
     const newSocket = io('http://localhost:5000');
     setSocket(newSocket);
+    socketRef.current = newSocket;
 
     newSocket.on('connection_response', (data) => {
       console.log('Connected to server:', data);
     });
 
-    newSocket.on('detection_result', (data) => {
+    newSocket.on('detection_result', (message) => {
+      // msgpack results arrive as binary, JSON results as objects
+      const data = message instanceof ArrayBuffer ? decode(new Uint8Array(message)) : message;
+
+      // Drop results for frames older than the latest one shown
+      if (typeof data.seq === 'number') {
+        if (data.seq <= lastSeqRef.current) return;
+        lastSeqRef.current = data.seq;
+      }
+      if (data.processing_fps) {
+        frameDelayRef.current = Math.max(200, 1000 / data.processing_fps);
+      }
+
       setDetections(prev => [data, ...prev].slice(0, 10)); // Keep last 10 detections
       
       // Draw bounding boxes on canvas
@@ -52,6 +73,7 @@ const LiveDetection = () => {
         videoRef.current.srcObject = stream;
         setMediaStream(stream);
         setIsStreaming(true);
+        streamingRef.current = true;
         setError('');
         
         // Start sending frames
@@ -68,12 +90,13 @@ const LiveDetection = () => {
       setMediaStream(null);
     }
     setIsStreaming(false);
+    streamingRef.current = false;
   };
 
   const sendFrames = () => {
-    const interval = setInterval(() => {
-      if (!isStreaming || !videoRef.current || !socket) {
-        clearInterval(interval);
+    const sendFrame = () => {
+      const socket = socketRef.current;
+      if (!streamingRef.current || !videoRef.current || !socket) {
         return;
       }
 
@@ -83,20 +106,22 @@ const LiveDetection = () => {
       const ctx = canvas.getContext('2d');
       ctx.drawImage(videoRef.current, 0, 0);
 
-      canvas.toBlob((blob) => {
+      canvas.toBlob(async (blob) => {
         if (blob) {
-          const reader = new FileReader();
-          reader.onloadend = () => {
-            const base64data = reader.result.split(',')[1];
-            socket.emit('video_frame', {
-              frame: base64data,
-              camera_id: 'webcam'
-            });
-          };
-          reader.readAsDataURL(blob);
+          // Raw JPEG bytes go out as a binary attachment, not base64 text
+          const frame = await blob.arrayBuffer();
+          socket.emit('video_frame', {
+            frame,
+            seq: seqRef.current++,
+            camera_id: 'webcam',
+            format: 'msgpack'
+          });
         }
       }, 'image/jpeg', 0.8);
-    }, 200); // Send frame every 200ms (5 FPS)
+      // At most 5 FPS, less when inference is slower
+      setTimeout(sendFrame, frameDelayRef.current);
+    };
+    sendFrame();
   };
 
   const drawDetections = (detectionList) => {
@@ -54,7 +54,7 @@ const Statistics = () => {
 
   const cameraData = stats.cameras.map(cam => ({
     camera: cam,
-    detections: Math.floor(Math.random() * 100) // Placeholder - replace with actual data
+    detections: stats.per_camera?.[cam]?.detections || 0
   }));
 
   return (
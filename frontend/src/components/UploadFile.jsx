@@ -11,6 +11,30 @@ const UploadFile = () => {
   const [uploading, setUploading] = useState(false);
   const [results, setResults] = useState(null);
   const [error, setError] = useState('');
+  const [jobProgress, setJobProgress] = useState(null);
+
+  const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+  // Video uploads are processed as background jobs; poll until finished
+  const pollJob = async (jobId) => {
+    while (true) {
+      const { data: job } = await axios.get(`http://localhost:5000/api/jobs/${jobId}`);
+      setJobProgress(job);
+      if (job.status === 'completed' || job.status === 'cancelled') {
+        return {
+          success: job.status === 'completed',
+          unique_plates: job.unique_plates,
+          total_frames: job.result?.total_frames,
+          processed_frames: job.result?.processed_frames,
+          detections: job.plates
+        };
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Video processing failed');
+      }
+      await sleep(1000);
+    }
+  };
 
   const handleFileSelect = (event) => {
     const file = event.target.files[0];
@@ -29,19 +53,27 @@ const UploadFile = () => {
 
     setUploading(true);
     setError('');
-
-    const formData = new FormData();
-    formData.append('file', selectedFile);
-    formData.append('camera_id', 'upload');
+    setJobProgress(null);
 
     try {
-      const isVideo = selectedFile.type.startsWith('video/');
-      const endpoint = isVideo ? '/api/detect/video' : '/api/detect';
-      
-      const response = await axios.post(`http://localhost:5000${endpoint}`, formData, {
+      if (selectedFile.type.startsWith('video/')) {
+        // Sent as the raw body so detection starts while the video is still uploading
+        const params = new URLSearchParams({ camera_id: 'upload', filename: selectedFile.name });
+        const response = await axios.post(
+          `http://localhost:5000/api/detect/video/stream?${params}`,
+          selectedFile,
+          { headers: { 'Content-Type': selectedFile.type } }
+        );
+        setResults(await pollJob(response.data.job_id));
+        return;
+      }
+
+      const formData = new FormData();
+      formData.append('file', selectedFile);
+      formData.append('camera_id', 'upload');
+      const response = await axios.post('http://localhost:5000/api/detect', formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
-
       setResults(response.data);
     } catch (err) {
       setError(err.response?.data?.error || err.message || 'Upload failed');
@@ -108,7 +140,20 @@ const UploadFile = () => {
                 {uploading ? 'Processing...' : 'Upload and Detect'}
               </Button>
 
-              {uploading && <LinearProgress sx={{ mt: 2 }} />}
+              {uploading && (
+                jobProgress?.progress != null ? (
+                  <Box sx={{ mt: 2 }}>
+                    <LinearProgress variant="determinate" value={jobProgress.progress * 100} />
+                    <Typography variant="caption" color="text.secondary">
+                      {jobProgress.frames_done} / {jobProgress.total_frames} frames
+                      {' \u2022 '}{jobProgress.detections} detections
+                      {jobProgress.eta_seconds != null && ` \u2022 ~${Math.ceil(jobProgress.eta_seconds)}s left`}
+                    </Typography>
+                  </Box>
+                ) : (
+                  <LinearProgress sx={{ mt: 2 }} />
+                )
+              )}
 
               {error && (
                 <Alert severity="error" sx={{ mt: 2 }}>
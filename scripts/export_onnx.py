@@ -0,0 +1,138 @@
+"""
+Export a YOLOv7 checkpoint to ONNX for the ONNX Runtime detector backend.
+
+The exported graph includes the Detect grid, so its single output has shape
+(batch, anchors, 5 + classes) like the PyTorch model's first output, and its
+batch axis is dynamic so the backend can run whole frame batches at once.
+
+Usage:
+    python scripts/export_onnx.py --weights models/yolov7.pt
+    MODEL_WEIGHTS=models/yolov7.onnx python backend/app.py
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.inference import ORT_AVAILABLE, TorchBackend, _import_yolov7  # noqa: E402
+
+
+def export_onnx(
+    model, output_path, img_size=640, opset=13, dynamic_batch=True, dynamic_shape=False
+):
+    """
+    Export a loaded YOLOv7 model to ONNX.
+
+    Args:
+        model: YOLOv7 model in eval mode (returns (pred, features)).
+        output_path: Destination .onnx file
+        img_size: Square input size baked into the graph
+        opset: ONNX opset version
+        dynamic_batch: Export with a dynamic batch axis
+        dynamic_shape: Also make height and width dynamic, so video frames can use
+            the minimum-rectangle letterbox instead of a full square
+    """
+    import torch
+
+    class GridOutput(torch.nn.Module):
+        """Keep only the decoded (batch, anchors, 5 + classes) output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, x):
+            return self.model(x)[0]
+
+    dummy = torch.zeros(1, 3, img_size, img_size)
+    dynamic_axes = {"images": {}, "output": {}}
+    if dynamic_batch:
+        dynamic_axes["images"][0] = dynamic_axes["output"][0] = "batch"
+    if dynamic_shape:
+        dynamic_axes["images"].update({2: "height", 3: "width"})
+        dynamic_axes["output"][1] = "anchors"
+    with torch.no_grad():
+        torch.onnx.export(
+            GridOutput(model).eval(),
+            dummy,
+            str(output_path),
+            opset_version=opset,
+            input_names=["images"],
+            output_names=["output"],
+            dynamic_axes=dynamic_axes,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+
+
+def check_onnx(model, output_path, img_size=640, batch_size=2):
+    """
+    Compare ONNX Runtime output with the PyTorch model on a random batch.
+
+    Returns:
+        Maximum absolute difference between the two outputs.
+    """
+    import onnxruntime as ort
+    import torch
+
+    batch = np.random.rand(batch_size, 3, img_size, img_size).astype(np.float32)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(batch))[0].numpy()
+    session = ort.InferenceSession(str(output_path), providers=["CPUExecutionProvider"])
+    actual = session.run(None, {"images": batch})[0]
+    return float(np.abs(expected - actual).max())
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Export YOLOv7 weights to ONNX")
+    parser.add_argument("--weights", default="models/yolov7.pt", help="YOLOv7 .pt checkpoint")
+    parser.add_argument("--output", help="Output .onnx path (default: weights with .onnx)")
+    parser.add_argument("--img-size", type=int, default=640, help="Square input size")
+    parser.add_argument(
+        "--opset", type=int, default=13, help="ONNX opset (13+ for per-channel INT8)"
+    )
+    parser.add_argument(
+        "--static-batch", action="store_true", help="Fix the batch axis to 1 instead"
+    )
+    parser.add_argument(
+        "--dynamic-shape", action="store_true", help="Export dynamic input height/width"
+    )
+    args = parser.parse_args()
+
+    weights = Path(args.weights)
+    output_path = Path(args.output) if args.output else weights.with_suffix(".onnx")
+    if not weights.exists():
+        print(f"❌ Weights not found: {weights}")
+        sys.exit(1)
+
+    yolov7 = _import_yolov7()
+    if yolov7 is None:
+        sys.exit(1)
+    model = TorchBackend(str(weights), "cpu", yolov7).model.float()
+
+    print(f"📦 Exporting {weights} -> {output_path} ({args.img_size}x{args.img_size})")
+    export_onnx(
+        model, output_path, args.img_size, args.opset, not args.static_batch, args.dynamic_shape
+    )
+    print(f"✅ Export complete: {output_path}")
+    print(f"📊 File size: {output_path.stat().st_size / (1024*1024):.2f} MB")
+
+    if ORT_AVAILABLE:
+        diff = check_onnx(model, output_path, args.img_size)
+        print(f"🔍 Max abs difference vs PyTorch: {diff:.6f}")
+    else:
+        print("⚠️  onnxruntime not installed; skipping output check")
+
+    print()
+    print("Next steps:")
+    print(f"   MODEL_WEIGHTS={output_path}")
+    print("   python backend/app.py")
+
+
+if __name__ == "__main__":
+    main()
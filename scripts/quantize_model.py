@@ -0,0 +1,206 @@
+"""
+Quantize a YOLOv7 ONNX model to INT8 for faster CPU inference.
+
+Static quantization (default) calibrates activation ranges on a sample of
+dataset images from data.yaml. Dynamic quantization needs no images but only
+quantizes weights ahead of time. In both modes only Conv layers are
+quantized; the Detect grid decoding stays in float so box coordinates keep
+full precision.
+
+The output is written next to the input as <name>.int8.onnx, which is what
+PlateDetector(precision="int8") / MODEL_PRECISION=int8 loads.
+
+Usage:
+    python scripts/export_onnx.py --weights models/best.pt
+    python scripts/quantize_model.py --model models/best.onnx --data data/plates/data.yaml
+    python src/evaluate.py --weights models/best.onnx --compare-weights models/best.int8.onnx \
+        --data data/plates/data.yaml
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.inference import int8_weights_path  # noqa: E402
+from backend.preprocess import letterbox_into  # noqa: E402
+from src.utils import split_images  # noqa: E402
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+except ImportError:
+    print("❌ onnxruntime is required: pip install onnxruntime")
+    sys.exit(1)
+
+
+def load_input(image_path, input_shape):
+    """Read an image and preprocess it like PlateDetector (1, 3, H, W)."""
+    img = cv2.imread(str(image_path))
+    if img is None:
+        return None
+    batch = np.empty((1, 3) + tuple(input_shape), dtype=np.float32)
+    letterbox_into(img, batch[0])
+    return batch
+
+
+class PlateCalibrationReader(CalibrationDataReader):
+    """Feeds calibration images to ONNX Runtime's calibrator one at a time."""
+
+    def __init__(self, image_paths, input_name, input_shape):
+        self.input_name = input_name
+        self.input_shape = input_shape
+        self._paths = iter(image_paths)
+
+    def get_next(self):
+        for path in self._paths:
+            batch = load_input(path, self.input_shape)
+            if batch is not None:
+                return {self.input_name: batch}
+        return None
+
+
+def model_input(model_path, img_size):
+    """Input name and (H, W) of a model, using img_size for dynamic axes."""
+    session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    model_in = session.get_inputs()[0]
+    height, width = model_in.shape[2:]
+    if not (isinstance(height, int) and isinstance(width, int)):
+        height = width = img_size
+    return model_in.name, (height, width)
+
+
+def model_opset(model_path):
+    """Default-domain opset version of an ONNX model."""
+    import onnx
+
+    model = onnx.load(str(model_path), load_external_data=False)
+    return next((o.version for o in model.opset_import if o.domain in ("", "ai.onnx")), 0)
+
+
+def calibration_images(data_yaml, splits, num_images, seed=0):
+    """Sample calibration images from the first dataset split that has any."""
+    for split in splits:
+        images = split_images(data_yaml, split)
+        if images:
+            random.Random(seed).shuffle(images)
+            print(f"🖼️  Calibrating on {min(num_images, len(images))} images from '{split}'")
+            return images[:num_images]
+    return []
+
+
+def benchmark(model_path, batches, runs=10):
+    """Mean single-frame latency of a model in milliseconds."""
+    session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    session.run(None, {input_name: batches[0]})  # warm-up
+    start = time.perf_counter()
+    for i in range(runs):
+        session.run(None, {input_name: batches[i % len(batches)]})
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Quantize a YOLOv7 ONNX model to INT8")
+    parser.add_argument("--model", default="models/yolov7.onnx", help="FP32 ONNX model")
+    parser.add_argument("--output", help="Output path (default: <model>.int8.onnx)")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--data", default="data/plates/data.yaml", help="Dataset yaml")
+    parser.add_argument(
+        "--splits", nargs="+", default=["val", "train"], help="Splits to calibrate on, in order"
+    )
+    parser.add_argument("--calib-images", type=int, default=100, help="Calibration images")
+    parser.add_argument("--img-size", type=int, default=640, help="Size for dynamic inputs")
+    args = parser.parse_args()
+
+    model_path = Path(args.model)
+    output_path = Path(args.output) if args.output else int8_weights_path(str(model_path))
+    if model_path.suffix.lower() != ".onnx" or not model_path.exists():
+        print(f"❌ ONNX model not found: {model_path}")
+        print("   Export one first: python scripts/export_onnx.py --weights models/yolov7.pt")
+        sys.exit(1)
+
+    input_name, input_shape = model_input(model_path, args.img_size)
+    images = calibration_images(args.data, args.splits, args.calib_images)
+    if args.mode == "static" and not images:
+        print(f"❌ No calibration images found for {args.data} ({', '.join(args.splits)})")
+        print("   Use --mode dynamic to quantize without calibration data")
+        sys.exit(1)
+
+    # Per-channel weight scales need DequantizeLinear's axis attribute (opset 13)
+    per_channel = model_opset(model_path) >= 13
+    if not per_channel:
+        print("⚠️  Opset < 13: using per-tensor weight scales (re-export with --opset 13)")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Shape inference + graph optimization before quantization
+        prepared = Path(tmp_dir) / "prepared.onnx"
+        try:
+            quant_pre_process(str(model_path), str(prepared))
+        except Exception as e:
+            print(f"⚠️  Pre-processing skipped: {e}")
+            prepared = model_path
+
+        print(f"⚙️  {args.mode.capitalize()} INT8 quantization: {model_path} -> {output_path}")
+        if args.mode == "static":
+            quantize_static(
+                str(prepared),
+                str(output_path),
+                PlateCalibrationReader(images, input_name, input_shape),
+                quant_format=QuantFormat.QDQ,
+                op_types_to_quantize=["Conv"],
+                per_channel=per_channel,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                calibrate_method=CalibrationMethod.MinMax,
+            )
+        else:
+            quantize_dynamic(
+                str(prepared),
+                str(output_path),
+                op_types_to_quantize=["Conv"],
+                per_channel=per_channel,
+                weight_type=QuantType.QUInt8,
+            )
+
+    fp32_mb = model_path.stat().st_size / (1024 * 1024)
+    int8_mb = output_path.stat().st_size / (1024 * 1024)
+    print(f"✅ Quantized model: {output_path}")
+    print(f"📊 Size: {fp32_mb:.2f} MB -> {int8_mb:.2f} MB")
+
+    batches = [b for b in (load_input(p, input_shape) for p in images[:10]) if b is not None]
+    if not batches:
+        batches = [np.random.rand(1, 3, *input_shape).astype(np.float32)]
+    fp32_ms = benchmark(model_path, batches)
+    int8_ms = benchmark(output_path, batches)
+    print(f"⏱️  CPU latency: {fp32_ms:.1f} ms -> {int8_ms:.1f} ms ({fp32_ms / int8_ms:.2f}x)")
+
+    print()
+    print("Next steps:")
+    print("1. Check the accuracy delta:")
+    print(
+        f"   python src/evaluate.py --weights {model_path} --compare-weights {output_path} "
+        f"--data {args.data}"
+    )
+    print("2. Enable it in .env:")
+    print("   MODEL_PRECISION=int8")
+
+
+if __name__ == "__main__":
+    main()
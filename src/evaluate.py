@@ -8,6 +8,10 @@ Computes:
 
 Usage:
 python src/evaluate.py --weights models/best.pt --data data/plates/data.yaml --img-size 640
+
+Compare two models through the backend's PlateDetector (e.g. FP32 vs INT8):
+python src/evaluate.py --weights models/best.onnx --compare-weights models/best.int8.onnx \
+    --data data/plates/data.yaml
 """
 
 from __future__ import annotations
@@ -18,9 +22,16 @@ import sys
 import time
 from pathlib import Path
 import json
+from typing import Dict, List, Sequence, Tuple
 import pandas as pd
 import numpy as np
 
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.utils import read_yolo_labels, split_images
+
 
 def run_yolov7_test(
     yolov7_dir: Path,
@@ -116,6 +127,155 @@ def parse_yolov7_results(results_file: Path) -> dict:
     return {}
 
 
+def box_iou(box: Sequence[float], boxes: np.ndarray) -> np.ndarray:
+    """IoU between one (x1,y1,x2,y2) box and an (n, 4) array of boxes."""
+    iw = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    ih = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = iw * ih
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def detection_metrics(
+    images: List[Tuple[List[Tuple[Sequence[float], float]], List[Sequence[float]]]],
+    iou_thres: float = 0.5,
+    score_thres: float = 0.25,
+) -> Dict[str, float]:
+    """Precision/recall/F1 at a score threshold and AP@iou_thres over all scores.
+
+    Args:
+        images: Per image, (predictions as (box, score), ground-truth boxes).
+        iou_thres: IoU for a prediction to match a ground-truth box.
+        score_thres: Score threshold for precision, recall and F1.
+
+    Returns:
+        Dict with precision, recall, f1 and mAP@0.5 (single class).
+    """
+    scores, hits = [], []
+    num_gt = 0
+    for preds, gts in images:
+        num_gt += len(gts)
+        gt_boxes = np.asarray(gts, dtype=np.float64).reshape(-1, 4)
+        matched = np.zeros(len(gt_boxes), dtype=bool)
+        # Greedy matching, highest score first
+        for box, score in sorted(preds, key=lambda p: -p[1]):
+            hit = False
+            if len(gt_boxes):
+                iou = box_iou(box, gt_boxes)
+                iou[matched] = 0
+                best = int(iou.argmax())
+                if iou[best] >= iou_thres:
+                    matched[best] = hit = True
+            scores.append(score)
+            hits.append(hit)
+
+    scores = np.asarray(scores)
+    hits = np.asarray(hits, dtype=bool)
+    order = np.argsort(-scores, kind="stable")
+    tp = np.cumsum(hits[order])
+    fp = np.cumsum(~hits[order])
+    recall_curve = tp / max(num_gt, 1)
+    precision_curve = tp / np.maximum(tp + fp, 1)
+
+    # 101-point interpolated AP (as in YOLOv7 test.py)
+    ap = 0.0
+    if len(scores) and num_gt:
+        mrec = np.concatenate(([0.0], recall_curve, [recall_curve[-1] + 0.01]))
+        mpre = np.concatenate(([1.0], precision_curve, [0.0]))
+        mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+        x = np.linspace(0, 1, 101)
+        ap = float(np.trapezoid(np.interp(x, mrec, mpre), x))
+
+    above = scores >= score_thres
+    tp_at = int(hits[above].sum())
+    precision = tp_at / max(int(above.sum()), 1)
+    recall = tp_at / max(num_gt, 1)
+    f1 = 2 * precision * recall / max(precision + recall, 1e-9)
+    return {"precision": precision, "recall": recall, "f1": f1, "mAP@0.5": ap}
+
+
+def evaluate_detector(
+    weights: Path,
+    image_paths: List[Path],
+    img_size: int,
+    conf_thres: float,
+    iou_thres: float,
+    device: str,
+    score_thres: float = 0.25,
+):
+    """Evaluate a model through the backend's PlateDetector (any backend/precision).
+
+    Returns:
+        (metrics, latency) dicts for ``generate_report``.
+    """
+    import cv2
+    from backend.detector import PlateDetector
+
+    detector = PlateDetector(
+        yolov7_weights=str(weights),
+        device=device,
+        conf_threshold=conf_thres,
+        iou_threshold=iou_thres,
+        img_size=img_size,
+        ocr=False,
+    )
+    if detector.model is None:
+        raise RuntimeError(f"Could not load model: {weights}")
+
+    images = []
+    latencies = []
+    for i, image_path in enumerate(image_paths):
+        img = cv2.imread(str(image_path))
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        start = time.perf_counter()
+        results = detector.detect_batch([img], ocr=False)[0]
+        # The first frame includes backend warm-up
+        if i > 0:
+            latencies.append(time.perf_counter() - start)
+        preds = [(r["bbox"], r["confidence"]) for r in results]
+        images.append((preds, read_yolo_labels(image_path, w, h)))
+
+    metrics = detection_metrics(images, 0.5, score_thres)
+    latency = {}
+    if latencies:
+        latency = {
+            "mean_latency_ms": np.mean(latencies) * 1000,
+            "p95_latency_ms": np.percentile(latencies, 95) * 1000,
+            "throughput_fps": 1.0 / np.mean(latencies),
+        }
+    return metrics, latency
+
+
+def generate_comparison_report(
+    baseline: Tuple[str, dict, dict], candidate: Tuple[str, dict, dict], output_path: Path
+):
+    """Generate a markdown table comparing two models' metrics and latency."""
+    base_name, base_metrics, base_latency = baseline
+    cand_name, cand_metrics, cand_latency = candidate
+
+    report = []
+    report.append("# Model Comparison Report\n")
+    report.append(f"- Baseline: `{base_name}`")
+    report.append(f"- Candidate: `{cand_name}`\n")
+    report.append("| Metric | Baseline | Candidate | Delta |")
+    report.append("|--------|----------|-----------|-------|")
+    for values_a, values_b in ((base_metrics, cand_metrics), (base_latency, cand_latency)):
+        for k, a in values_a.items():
+            b = values_b.get(k, 0.0)
+            report.append(f"| {k} | {a:.4f} | {b:.4f} | {b - a:+.4f} |")
+    if base_latency.get("mean_latency_ms") and cand_latency.get("mean_latency_ms"):
+        speedup = base_latency["mean_latency_ms"] / cand_latency["mean_latency_ms"]
+        report.append(f"\nCandidate speedup: {speedup:.2f}x")
+
+    report_text = "\n".join(report)
+    output_path.write_text(report_text, encoding="utf-8")
+    print(f"\nComparison report written to {output_path}")
+    print(report_text)
+
+
 def generate_report(metrics: dict, latency: dict, output_path: Path):
     """Generate evaluation report as markdown table."""
     report = []
@@ -156,9 +316,38 @@ def main():
     )
     parser.add_argument("--latency-iterations", type=int, default=100)
     parser.add_argument("--output", type=Path, default=Path("evaluation_report.md"))
+    parser.add_argument(
+        "--compare-weights",
+        type=Path,
+        help="Compare --weights against this model (e.g. an INT8 .onnx) with PlateDetector",
+    )
+    parser.add_argument("--split", default="test", help="Dataset split for --compare-weights")
+    parser.add_argument(
+        "--score-thres", type=float, default=0.25, help="Score threshold for precision/recall"
+    )
 
     args = parser.parse_args()
 
+    if args.compare_weights:
+        image_paths = split_images(args.data, args.split) or split_images(args.data, "val")
+        if not image_paths:
+            raise FileNotFoundError(f"No images found for split '{args.split}' in {args.data}")
+        print(f"Comparing models on {len(image_paths)} images...")
+        results = []
+        for weights in (args.weights, args.compare_weights):
+            metrics, latency = evaluate_detector(
+                weights,
+                image_paths,
+                args.img_size,
+                args.conf_thres,
+                args.iou_thres,
+                args.device,
+                args.score_thres,
+            )
+            results.append((str(weights), metrics, latency))
+        generate_comparison_report(results[0], results[1], args.output)
+        return
+
     # Run test evaluation
     print("Running test evaluation...")
     run_yolov7_test(
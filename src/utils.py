@@ -2,7 +2,8 @@
 
 from __future__ import annotations
 
-from typing import Tuple
+from pathlib import Path
+from typing import List, Tuple
 
 
 def yolo_label_to_box(
@@ -21,3 +22,51 @@ def yolo_label_to_box(
     x2 = x_center + box_w / 2.0
     y2 = y_center + box_h / 2.0
     return x1, y1, x2, y2
+
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def split_images(data_yaml: Path, split: str) -> List[Path]:
+    """List the images of a dataset split from a YOLOv7 data.yaml.
+
+    Split paths are resolved relative to the yaml file first, then to the
+    current directory (YOLOv7's convention).
+    """
+    import yaml
+
+    data_yaml = Path(data_yaml)
+    config = yaml.safe_load(data_yaml.read_text(encoding="utf-8"))
+    if not config.get(split):
+        return []
+
+    split_dir = Path(config[split])
+    candidates = (
+        [split_dir] if split_dir.is_absolute() else [data_yaml.parent / split_dir, split_dir]
+    )
+    for candidate in candidates:
+        if candidate.is_dir():
+            return sorted(p for p in candidate.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return []
+
+
+def read_yolo_labels(image_path: Path, img_w: int, img_h: int) -> List[Tuple[float, ...]]:
+    """Read the YOLO label file matching an image as pixel boxes (x1,y1,x2,y2).
+
+    Labels live next to the images with ``images`` replaced by ``labels`` in
+    the path, e.g. ``data/images/val/a.jpg`` -> ``data/labels/val/a.txt``.
+    """
+    parts = list(Path(image_path).parts)
+    if "images" in parts:
+        parts[len(parts) - 1 - parts[::-1].index("images")] = "labels"
+    label_path = Path(*parts).with_suffix(".txt")
+    if not label_path.exists():
+        return []
+
+    boxes = []
+    for line in label_path.read_text(encoding="utf-8").splitlines():
+        values = line.split()
+        if len(values) >= 5:
+            _, xc, yc, bw, bh = (float(v) for v in values[:5])
+            boxes.append(yolo_label_to_box(xc, yc, bw, bh, img_w, img_h))
+    return boxes
@@ -0,0 +1,106 @@
+"""Unit tests for the plate crop store."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.crop_store import (
+    CropStore,
+    LocalCropStore,
+    create_crop_store,
+    crop_key,
+    crop_url,
+    is_crop_key,
+    sweep_crops,
+)
+from backend.crops import CropRef
+
+
+class TestLocalCropStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.store = LocalCropStore(str(self.tmp / "crops"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_put_get(self):
+        """Test that stored bytes come back under their SHA-256 key."""
+        data = b"\xff\xd8 plate \xff\xd9"
+        key = self.store.put(data)
+        self.assertEqual(key, hashlib.sha256(data).hexdigest())
+        self.assertTrue(is_crop_key(key))
+        self.assertEqual(crop_url(key), f"/api/crops/{key}")
+        self.assertEqual(self.store.get(key), data)
+        self.assertEqual(
+            self.store.path(key), self.tmp / "crops" / key[:2] / key[2:4] / f"{key}.jpg"
+        )
+
+        # Same bytes, same key and still a single file
+        self.assertEqual(self.store.put(data), key)
+        self.assertEqual(len(list((self.tmp / "crops").rglob("*"))), 3)
+
+        self.assertIsNone(self.store.get(crop_key(b"missing")))
+        self.assertIsNone(self.store.get("../" + key))
+        self.assertIsNone(crop_url("data:image/jpeg;base64,AAAA"))
+
+    def test_put_crop_key_is_stable(self):
+        """Test that the same crop pixels always map to the same key."""
+        frame = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        first = self.store.put_crop(CropRef(frame, [10, 20, 90, 50]))
+        second = self.store.put_crop(CropRef(frame.copy(), [10, 20, 90, 50]))
+        self.assertEqual(first, second)
+        self.assertNotEqual(self.store.put_crop(CropRef(frame, [11, 20, 90, 50])), first)
+
+    def test_sweep(self):
+        """Test that only old crops no row references are swept."""
+        old_time = time.time() - 7200
+        used, orphan, recent, restored = (self.store.put(bytes([i]) * 10) for i in range(4))
+        for key in (used, orphan, restored):
+            os.utime(self.store.path(key), (old_time, old_time))
+        # Storing a crop again (for a new row) restarts its grace period
+        self.assertEqual(self.store.put(bytes([3]) * 10), restored)
+        self.assertEqual(
+            sorted(k for k, _ in self.store.keys()), sorted([used, orphan, recent, restored])
+        )
+
+        lookups = []
+
+        def referenced(keys):
+            lookups.append(sorted(keys))
+            return {used} & set(keys)
+
+        self.assertEqual(sweep_crops(self.store, referenced, chunk_size=1), 1)
+        self.assertEqual(sorted(lookups), sorted([[used], [orphan]]))
+        self.assertIsNone(self.store.get(orphan))
+        for key in (used, recent, restored):
+            self.assertIsNotNone(self.store.get(key))
+        self.assertFalse(self.store.delete(orphan))
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            create_crop_store("s3", root=str(self.tmp))
+
+    def test_incomplete_backend(self):
+        """Test that a backend missing a method fails when constructed."""
+
+        class PutOnly(CropStore):
+            def put(self, data):
+                return crop_key(data)
+
+        with self.assertRaises(TypeError):
+            PutOnly()
+
+
+if __name__ == "__main__":
+    unittest.main()
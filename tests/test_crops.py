@@ -0,0 +1,83 @@
+"""Unit tests for lazy plate crop references."""
+
+from __future__ import annotations
+
+import base64
+import pickle
+import unittest
+
+import cv2
+import numpy as np
+
+from backend.crops import CropRef, crop_pixels
+
+
+def make_frame():
+    frame = np.random.default_rng(0).integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    frame[40:70, 20:100] = 255
+    return frame
+
+
+class TestCropRef(unittest.TestCase):
+
+    def test_view_does_not_copy(self):
+        """Test that the crop is a view into the frame."""
+        frame = make_frame()
+        crop = CropRef(frame, [20, 40, 100, 70])
+        self.assertEqual(crop.shape, (30, 80, 3))
+        self.assertEqual(crop.size, 30 * 80 * 3)
+        pixels = crop.array()
+        self.assertTrue(np.shares_memory(pixels, frame))
+        np.testing.assert_array_equal(pixels, frame[40:70, 20:100])
+        np.testing.assert_array_equal(np.asarray(crop), pixels)
+        self.assertIs(crop_pixels(pixels), pixels)
+
+    def test_detach(self):
+        """Test that a detached crop keeps its pixels after the frame is overwritten."""
+        frame = make_frame()
+        expected = frame[40:70, 20:100].copy()
+        crop = CropRef(frame, [20, 40, 100, 70])
+        self.assertIs(crop.detach(), crop)
+        frame[:] = 0
+        self.assertFalse(np.shares_memory(crop.array(), frame))
+        np.testing.assert_array_equal(crop.array(), expected)
+        self.assertEqual(crop.frame.shape, expected.shape)
+        self.assertEqual(crop.bbox, [20, 40, 100, 70])
+
+    def test_pickle(self):
+        """Test that a pickled crop carries just its pixels and its cached JPEG."""
+        frame = make_frame()
+        crop = CropRef(frame, [20, 40, 100, 70])
+        jpeg = crop.jpeg()
+        data = pickle.dumps(crop)
+        self.assertLess(len(data), frame.nbytes // 4 + len(jpeg))
+
+        restored = pickle.loads(data)
+        self.assertEqual(restored.bbox, [20, 40, 100, 70])
+        np.testing.assert_array_equal(restored.array(), frame[40:70, 20:100])
+        self.assertEqual(restored.jpeg(), jpeg)
+        # The restored crop can be detached and pickled again
+        np.testing.assert_array_equal(pickle.loads(pickle.dumps(restored)).array(), crop.array())
+
+    def test_encoding_is_cached(self):
+        """Test that JPEG and base64 are encoded once, and empty boxes give None."""
+        frame = make_frame()
+        crop = CropRef(frame, [20, 40, 100, 70])
+        jpeg = crop.jpeg()
+        decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(decoded.shape, (30, 80, 3))
+        self.assertEqual(crop.base64(), base64.b64encode(jpeg).decode())
+
+        # Later changes to the frame do not re-encode
+        frame[:] = 0
+        self.assertIs(crop.jpeg(), jpeg)
+        self.assertIs(crop.base64(), crop.base64())
+
+        for bbox in ([50, 40, 50, 70], [20, 70, 100, 70]):
+            empty = CropRef(frame, bbox)
+            self.assertIsNone(empty.jpeg())
+            self.assertIsNone(empty.base64())
+
+
+if __name__ == "__main__":
+    unittest.main()
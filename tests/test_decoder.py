@@ -0,0 +1,106 @@
+"""Unit tests for the video decoders."""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.decoder import PYAV_AVAILABLE, VideoDecoder, open_decoder
+
+
+class TestVideoDecoder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = str(Path(cls.tmp.name) / "frames.avi")
+        writer = cv2.VideoWriter(cls.path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (320, 240))
+        for i in range(40):
+            # Frame index encoded in the brightness
+            writer.write(np.full((240, 320, 3), i * 6, dtype=np.uint8))
+        writer.release()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def check_decoder(self, backend):
+        decoder = open_decoder(self.path, backend, max_width=160, seek_frames=10)
+        try:
+            self.assertEqual((decoder.width, decoder.height, decoder.scale), (320, 240, 2.0))
+            for target in (0, 3, 25, 26, 39):
+                self.assertTrue(decoder.skip_to(target))
+                self.assertTrue(decoder.grab())
+                self.assertEqual(decoder.index, target)
+                frame = decoder.retrieve()
+                self.assertEqual(frame.shape, (120, 160, 3))
+                self.assertEqual(round(frame.mean() / 6), target)
+            self.assertFalse(decoder.grab())
+        finally:
+            decoder.close()
+
+    def test_opencv(self):
+        """Test grab, seek and downscaling with OpenCV."""
+        self.check_decoder("opencv")
+
+    @unittest.skipUnless(PYAV_AVAILABLE, "PyAV not installed")
+    def test_pyav(self):
+        """Test grab, seek and downscaling with PyAV."""
+        self.check_decoder("pyav")
+
+    @unittest.skipUnless(PYAV_AVAILABLE, "PyAV not installed")
+    def test_pyav_index_follows_timestamps(self):
+        """Test that frames missing from the stream leave gaps in the indices."""
+        from fractions import Fraction
+
+        import av
+
+        path = str(Path(self.tmp.name) / "gap.mkv")
+        container = av.open(path, "w")
+        stream = container.add_stream("mpeg4", rate=25)
+        stream.width, stream.height = 64, 48
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.time_base = Fraction(1, 25)
+        # Frames 20-24 were dropped by the camera
+        pts_list = list(range(20)) + list(range(25, 40))
+        for pts in pts_list:
+            frame = av.VideoFrame.from_ndarray(np.zeros((48, 64, 3), np.uint8), format="bgr24")
+            frame.pts, frame.time_base = pts, Fraction(1, 25)
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+        container.close()
+
+        decoder = open_decoder(path, "pyav")
+        indices = []
+        try:
+            while decoder.grab():
+                indices.append(decoder.index)
+        finally:
+            decoder.close()
+        self.assertEqual(indices, pts_list)
+
+    def test_incomplete_decoder(self):
+        """Test that a decoder missing a method fails when constructed."""
+
+        class NoSeek(VideoDecoder):
+            def grab(self):
+                return False
+
+            def retrieve(self):
+                return None
+
+            def close(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoSeek(0, 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Unit tests for the detector's OCR paths."""
+
+from __future__ import annotations
+
+import threading
+import types
+import unittest
+
+import numpy as np
+
+from backend.detector import (
+    OCR_AVAILABLE,
+    OCR_READER_ATTRS,
+    PlateDetector,
+    batch_ocr_supported,
+)
+
+
+class StubReader:
+    """EasyOCR Reader without the recognizer internals batched OCR needs."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, image, detail=1):
+        self.calls += 1
+        return [([[0, 0], [1, 0], [1, 1], [0, 1]], " abc123 ", 0.75)]
+
+
+# Plate boxes [x1, y1, x2, y2] drawn in frames of mixed sizes
+FRAMES = [
+    ((120, 160), [20, 40, 100, 70]),
+    ((90, 200), [120, 10, 190, 40]),
+    ((120, 160), [60, 80, 150, 110]),
+    ((240, 120), [10, 150, 90, 180]),
+    ((60, 80), [5, 5, 45, 25]),
+]
+
+
+class StubBackend:
+    """Finds the bright box in each letterboxed image, two images per run."""
+
+    name = "stub"
+    input_shape = None
+    max_batch = 2
+
+    def __init__(self):
+        self.runs = []
+
+    def __call__(self, batch, conf_threshold, iou_threshold):
+        preds = []
+        for start in range(0, len(batch), self.max_batch):
+            chunk = batch[start : start + self.max_batch]
+            self.runs.append(len(chunk))
+            for image in chunk:
+                ys, xs = np.nonzero(image[0] > 0.7)
+                box = [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.9, 0]
+                preds.append(np.array([box], dtype=np.float32))
+        return preds
+
+
+def make_detector():
+    detector = PlateDetector.__new__(PlateDetector)
+    detector.model = StubBackend()
+    detector.conf_threshold = 0.25
+    detector.iou_threshold = 0.45
+    detector.img_size = 320
+    detector.ocr_reader = None
+    detector._local = threading.local()
+    return detector
+
+
+class TestDetectBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = []
+        for i, ((h, w), (x1, y1, x2, y2)) in enumerate(FRAMES):
+            frame = np.zeros((h, w, 3), dtype=np.uint8)
+            frame[y1:y2, x1:x2] = 200 + 10 * i
+            self.frames.append(frame)
+
+    def test_boxes_map_to_their_frames(self):
+        """Test that each result's box is scaled back to its own source frame."""
+        detector = make_detector()
+        results = detector.detect_batch(self.frames, ocr=False)
+        self.assertEqual(detector.model.runs, [2, 2, 1])
+        self.assertEqual(len(results), len(self.frames))
+
+        for i, (frame, (_, bbox), detections) in enumerate(zip(self.frames, FRAMES, results)):
+            self.assertEqual(len(detections), 1)
+            detection = detections[0]
+            np.testing.assert_allclose(detection["bbox"], bbox, atol=1, err_msg=str(i))
+            self.assertIsNone(detection["plate_text"])
+            # The crop references this frame's pixels
+            self.assertEqual(int(np.median(detection["plate_crop"].array())), 200 + 10 * i)
+
+            (single,) = make_detector().detect(frame)
+            self.assertEqual(single["bbox"], detection["bbox"])
+            self.assertEqual(single["confidence"], detection["confidence"])
+            self.assertEqual(single["plate_text"], "NO_OCR")
+
+
+class TestBatchOcr(unittest.TestCase):
+
+    @unittest.skipUnless(OCR_AVAILABLE, "EasyOCR not installed")
+    def test_supported_reader_attributes(self):
+        """Test that batched OCR requires every Reader internal it uses."""
+        complete = types.SimpleNamespace(**{name: None for name in OCR_READER_ATTRS})
+        self.assertTrue(batch_ocr_supported(complete))
+        for name in OCR_READER_ATTRS:
+            partial = types.SimpleNamespace(
+                **{other: None for other in OCR_READER_ATTRS if other != name}
+            )
+            self.assertFalse(batch_ocr_supported(partial), name)
+
+    def test_falls_back_to_per_crop_ocr(self):
+        """Test that an unsupported reader gets one readtext call per crop."""
+        detector = PlateDetector.__new__(PlateDetector)
+        detector.ocr_reader = StubReader()
+        detector.ocr_batch = False
+        crops = [np.zeros((20, 60, 3), dtype=np.uint8)] * 3
+        self.assertEqual(detector.run_ocr_batch(crops), [("ABC123", 0.75)] * 3)
+        self.assertEqual(detector.ocr_reader.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
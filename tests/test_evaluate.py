@@ -0,0 +1,58 @@
+"""Unit tests for detection evaluation metrics."""
+
+from __future__ import annotations
+
+import unittest
+
+from src.evaluate import detection_metrics
+
+
+class TestDetectionMetrics(unittest.TestCase):
+
+    def test_hand_built_boxes(self):
+        """Test precision, recall, F1 and AP on hand-matched boxes."""
+        images = [
+            (
+                # Hit, duplicate of the same plate (false positive), hit
+                [([0, 0, 10, 10], 0.9), ([1, 1, 11, 11], 0.8), ([20, 20, 30, 30], 0.3)],
+                [[0, 0, 10, 10], [20, 20, 30, 30]],
+            ),
+            (
+                # False positive, and a hit below the score threshold
+                [([50, 50, 60, 60], 0.6), ([0, 0, 10, 10], 0.2)],
+                [[0, 0, 10, 10]],
+            ),
+        ]
+        metrics = detection_metrics(images, iou_thres=0.5, score_thres=0.25)
+        # 2 of the 4 predictions above 0.25 hit, of 3 plates
+        self.assertAlmostEqual(metrics["precision"], 0.5)
+        self.assertAlmostEqual(metrics["recall"], 2 / 3)
+        self.assertAlmostEqual(metrics["f1"], 4 / 7)
+        # Interpolated precision is 1 up to recall 1/3 and 0.6 after it
+        self.assertAlmostEqual(metrics["mAP@0.5"], 1 / 3 + 2 / 3 * 0.6, delta=0.002)
+
+    def test_iou_threshold(self):
+        """Test that a box only matches at or above the IoU threshold."""
+        # IoU 81/119 = 0.68
+        images = [([([1, 1, 11, 11], 0.9)], [[0, 0, 10, 10]])]
+        self.assertEqual(detection_metrics(images, iou_thres=0.5)["recall"], 1.0)
+        self.assertEqual(detection_metrics(images, iou_thres=0.5)["mAP@0.5"], 1.0)
+        self.assertEqual(detection_metrics(images, iou_thres=0.7)["recall"], 0.0)
+
+    def test_empty_cases(self):
+        """Test images without predictions, without ground truth, and with neither."""
+        zero = {"precision": 0.0, "recall": 0.0, "f1": 0.0, "mAP@0.5": 0.0}
+        no_predictions = [([], [[0, 0, 10, 10]])]
+        no_ground_truth = [([([0, 0, 10, 10], 0.9)], [])]
+        for images in (no_predictions, no_ground_truth, [([], [])], []):
+            self.assertEqual(detection_metrics(images), zero, images)
+
+        # Plates missed in one image lower recall only
+        images = [([([0, 0, 10, 10], 0.9)], [[0, 0, 10, 10]])] + no_predictions
+        metrics = detection_metrics(images)
+        self.assertEqual((metrics["precision"], metrics["recall"]), (1.0, 0.5))
+        self.assertAlmostEqual(metrics["mAP@0.5"], 0.5, delta=0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""Unit tests for detection list field selection."""
+
+from __future__ import annotations
+
+import unittest
+
+from backend.fields import parse_fields
+from backend.models import DEFAULT_LIST_FIELDS, DETECTION_FIELDS
+
+
+class TestParseFields(unittest.TestCase):
+
+    def test_default(self):
+        """Test that a missing or empty value selects the default fields."""
+        for value in (None, "", " , "):
+            self.assertEqual(
+                parse_fields(value, DETECTION_FIELDS, DEFAULT_LIST_FIELDS), DEFAULT_LIST_FIELDS
+            )
+        self.assertNotIn("plate_image", DEFAULT_LIST_FIELDS)
+
+    def test_order_and_duplicates(self):
+        """Test that fields keep the requested order without duplicates."""
+        self.assertEqual(
+            parse_fields("plate_number, id,plate_number,bbox", DETECTION_FIELDS, ()),
+            ("plate_number", "id", "bbox"),
+        )
+
+    def test_unknown_fields(self):
+        """Test that unknown field names are rejected and listed."""
+        with self.assertRaises(ValueError) as ctx:
+            parse_fields("id,plate,created", DETECTION_FIELDS, DEFAULT_LIST_FIELDS)
+        message = str(ctx.exception)
+        self.assertTrue(message.startswith("Unknown fields: plate, created."), message)
+        self.assertIn("plate_number", message)
+
+
+if __name__ == "__main__":
+    unittest.main()
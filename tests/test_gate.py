@@ -0,0 +1,44 @@
+"""Unit tests for motion gating."""
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from backend.gate import MotionGate, parse_roi
+
+
+class TestMotionGate(unittest.TestCase):
+
+    def test_static_frames_are_skipped(self):
+        """Test that only frames with motion inside the ROI pass."""
+        background = np.full((360, 640, 3), 80, dtype=np.uint8)
+        # Lower half of the frame only
+        gate = MotionGate(roi=[[0, 0.5], [1, 0.5], [1, 1], [0, 1]])
+
+        self.assertTrue(gate.check(background))  # first frame
+        self.assertFalse(gate.check(background.copy()))
+
+        above = background.copy()
+        above[20:120, 200:400] = 255
+        self.assertFalse(gate.check(above))
+
+        below = background.copy()
+        below[240:340, 200:400] = 255
+        self.assertTrue(gate.check(below))
+
+        stats = gate.stats()
+        self.assertEqual((stats["checked"], stats["passed"], stats["skipped"]), (4, 2, 2))
+
+    def test_parse_roi(self):
+        """Test ROI validation."""
+        self.assertIsNone(parse_roi(None))
+        self.assertEqual(parse_roi([[0, 0], [1, 0], ["1", 1]]), [[0, 0], [1, 0], [1, 1]])
+        for bad in ([[0, 0], [1, 1]], [[0, 0], [2, 0], [1, 1]], "abc", [[0, 0, 0]]):
+            with self.assertRaises(ValueError):
+                parse_roi(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Unit tests for the detector inference backends."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.inference import ORT_AVAILABLE, OnnxBackend, TorchBackend
+
+try:
+    import torch
+    import torchvision
+
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+
+def make_model():
+    """Tiny two-class detector with YOLOv7's (decoded output, features) result."""
+
+    class TinyDetect(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            torch.manual_seed(0)
+            self.conv = torch.nn.Conv2d(3, 7, 16, stride=16)
+
+        def forward(self, x):
+            y = self.conv(x)
+            n, c, h, w = y.shape
+            y = y.permute(0, 2, 3, 1).reshape(n, h * w, c)
+            gy, gx = torch.meshgrid(torch.arange(h), torch.arange(w), indexing="ij")
+            grid = torch.stack((gx, gy), -1).reshape(1, h * w, 2).float() * 16 + 8
+            xy = grid + torch.tanh(y[..., :2]) * 8
+            wh = torch.sigmoid(y[..., 2:4]) * 40 + 4
+            conf = torch.sigmoid(y[..., 4:] * 4)
+            return torch.cat((xy, wh, conf), -1), None
+
+    return TinyDetect().eval()
+
+
+class GridOutput(torch.nn.Module if TORCH_AVAILABLE else object):
+    """The decoded output only, as ``scripts/export_onnx.py`` exports it."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x)[0]
+
+
+def yolov7_nms(prediction, conf_thres, iou_thres, classes=None, agnostic=False):
+    """YOLOv7's ``utils.general.non_max_suppression`` for multi-class models."""
+    output = []
+    for x in prediction:
+        x = x[x[:, 4] > conf_thres].clone()
+        x[:, 5:] *= x[:, 4:5]
+        box = torch.cat((x[:, :2] - x[:, 2:4] / 2, x[:, :2] + x[:, 2:4] / 2), 1)
+        conf, j = x[:, 5:].max(1, keepdim=True)
+        x = torch.cat((box, conf, j.float()), 1)[conf.view(-1) > conf_thres]
+        offsets = x[:, 5:6] * (0 if agnostic else 4096)
+        output.append(x[torchvision.ops.nms(x[:, :4] + offsets, x[:, 4], iou_thres)])
+    return output
+
+
+@unittest.skipUnless(TORCH_AVAILABLE and ORT_AVAILABLE, "PyTorch or ONNX Runtime not installed")
+class TestBackends(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp())
+        cls.weights = cls.tmp / "tiny.pt"
+        cls.weights.touch()
+        cls.model = make_model()
+        # A fixed batch axis of 3, so larger batches are run in chunks
+        cls.onnx_weights = cls.tmp / "tiny.onnx"
+        with torch.no_grad():
+            torch.onnx.export(
+                GridOutput(cls.model),
+                torch.zeros(3, 3, 64, 64),
+                str(cls.onnx_weights),
+                opset_version=13,
+                input_names=["images"],
+                output_names=["output"],
+                dynamo=False,
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        yolov7 = types.SimpleNamespace(
+            select_device=torch.device,
+            attempt_load=lambda weights, map_location: self.model,
+            non_max_suppression=yolov7_nms,
+        )
+        self.torch_backend = TorchBackend(str(self.weights), "cpu", yolov7)
+        self.onnx_backend = OnnxBackend(str(self.onnx_weights), "cpu")
+        self.batch = np.random.default_rng(0).random((8, 3, 64, 64), dtype=np.float32)
+
+    def test_backends_agree(self):
+        """Test that both backends return the same detections for a chunked batch."""
+        self.assertEqual(self.onnx_backend.max_batch, 3)
+        self.assertEqual(self.onnx_backend.input_shape, (64, 64))
+        expected = self.torch_backend(self.batch, 0.1, 0.45)
+        actual = self.onnx_backend(self.batch, 0.1, 0.45)
+        self.assertEqual(len(actual), len(self.batch))
+        self.assertGreater(sum(len(det) for det in expected), 0)
+        for i, (det, ref) in enumerate(zip(actual, expected)):
+            self.assertEqual(det.shape, ref.shape, i)
+            np.testing.assert_allclose(det, ref, atol=1e-4, err_msg=str(i))
+
+    def test_chunks_keep_order(self):
+        """Test that chunked results come back in input order, padding dropped."""
+        per_image = [self.onnx_backend(self.batch[i : i + 1], 0.1, 0.45)[0] for i in range(8)]
+        self.assertGreater(sum(len(det) for det in per_image), 0)
+        reversed_batch = self.onnx_backend(self.batch[::-1].copy(), 0.1, 0.45)
+        for i, det in enumerate(reversed(reversed_batch)):
+            np.testing.assert_allclose(det, per_image[i], atol=1e-5, err_msg=str(i))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""Unit tests for server-side camera ingestion."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.crops import CropRef
+from backend.gate import MotionGate
+from backend.ingest import BACKOFF, CameraIngestService, CameraReader
+
+
+def make_video(path, frames=50, fps=25):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frames):
+        writer.write(np.full((48, 64, 3), i * 5 % 256, dtype=np.uint8))
+    writer.release()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+class RecordingEvent(threading.Event):
+    """Stop event that records the reconnect delays it is asked to wait."""
+
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return super().wait(timeout)
+
+
+class TestCameraReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.video = self.tmp / "camera.avi"
+        make_video(self.video)
+        self.detected = []
+        self.stored = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def detect(self, frames):
+        self.detected.extend(frames)
+        return [
+            [{"bbox": [8, 8, 40, 24], "confidence": 0.9, "plate_crop": CropRef(f, [8, 8, 40, 24])}]
+            for f in frames
+        ]
+
+    def ocr(self, crops):
+        return [("ABC123", 0.8)] * len(crops)
+
+    def sink(self, records, camera_id):
+        self.stored.append((camera_id, records))
+
+    def test_samples_frames_and_stores_tracks(self):
+        """Test that detection runs at sample_fps and finished tracks reach the sink."""
+        reader = CameraReader(
+            "cam", str(self.video), self.detect, self.ocr, self.sink, sample_fps=5
+        )
+        reader.start()
+        # A local file plays back in real time: 25 frames take a second
+        self.assertTrue(wait_for(lambda: reader.frames_read >= 25))
+        reader.stop()
+
+        self.assertGreaterEqual(reader.frames_read, 25)
+        self.assertTrue(3 <= len(self.detected) <= 8, len(self.detected))
+        self.assertEqual(reader.frames_processed, len(self.detected))
+        # The open track is stored when the reader stops
+        self.assertEqual(len(self.stored), 1)
+        camera_id, records = self.stored[0]
+        self.assertEqual(camera_id, "cam")
+        self.assertEqual(records[0]["plate_text"], "ABC123")
+        self.assertEqual(reader.status()["detections"], 1)
+
+    def test_reconnects_with_backoff(self):
+        """Test that missing and unreadable sources are retried with growing delays."""
+        broken = self.tmp / "broken.avi"
+        broken.write_bytes(b"not a video" * 100)
+        for url in (self.tmp / "missing.avi", broken):
+            reader = CameraReader(
+                "cam",
+                str(url),
+                self.detect,
+                self.ocr,
+                self.sink,
+                min_backoff=0.01,
+                max_backoff=0.04,
+            )
+            reader._stop = RecordingEvent()
+            reader.start()
+            self.assertTrue(wait_for(lambda: reader.reconnects >= 4))
+            self.assertEqual(reader.state, BACKOFF)
+            self.assertEqual(reader.last_error, "Could not open stream")
+            reader.stop()
+            self.assertEqual(reader._stop.waits[:4], [0.01, 0.02, 0.04, 0.04])
+        self.assertEqual(self.detected, [])
+
+
+class TestCameraIngestService(unittest.TestCase):
+
+    def setUp(self):
+        self.cameras = [
+            {"camera_id": "a", "rtsp_url": "/nonexistent/a", "is_active": True, "sample_fps": 1},
+            {"camera_id": "b", "rtsp_url": "/nonexistent/b", "is_active": False},
+            {"camera_id": "c", "rtsp_url": None, "is_active": True},
+        ]
+        self.service = CameraIngestService(
+            lambda: [dict(camera) for camera in self.cameras],
+            lambda frames: [[] for _ in frames],
+            lambda crops: [],
+            lambda records, camera_id: None,
+            default_sample_fps=3,
+            gate_factory=lambda roi: MotionGate(roi=roi),
+        )
+
+    def tearDown(self):
+        self.service.stop()
+
+    def test_refresh_follows_camera_list(self):
+        """Test that readers start, restart and stop as camera settings change."""
+        self.service.refresh()
+        self.assertEqual(list(self.service.readers), ["a"])
+        reader = self.service.readers["a"]
+        self.assertEqual(reader.sample_fps, 1.0)
+
+        # Unchanged settings keep the running reader
+        self.service.refresh()
+        self.assertIs(self.service.readers["a"], reader)
+
+        changes = [
+            ("sample_fps", None),
+            ("rtsp_url", "/nonexistent/a2"),
+            ("roi", [[0, 0.5], [1, 0.5], [1, 1], [0, 1]]),
+        ]
+        for key, value in changes:
+            self.cameras[0][key] = value
+            self.service.refresh()
+            restarted = self.service.readers["a"]
+            self.assertIsNot(restarted, reader, key)
+            self.assertFalse(reader._threads, key)
+            reader = restarted
+        self.assertEqual(reader.sample_fps, 3.0)
+        self.assertEqual(reader.url, "/nonexistent/a2")
+        self.assertEqual(reader.roi, [[0, 0.5], [1, 0.5], [1, 1], [0, 1]])
+
+        self.cameras[1]["is_active"] = True
+        self.cameras[0]["is_active"] = False
+        self.service.refresh()
+        self.assertEqual(list(self.service.readers), ["b"])
+        self.assertFalse(reader._threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+"""Unit tests for background video jobs."""
+
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.crops import CropRef
+from backend.jobs import CANCELLED, COMPLETED, VideoJobManager
+from backend.pipeline import VideoPipeline
+
+
+def summary(total_frames=10, cancelled=False):
+    return {
+        "total_frames": total_frames,
+        "processed_frames": total_frames,
+        "tracks": 0,
+        "pipeline": {},
+        "effective_stride": 1.0,
+        "cancelled": cancelled,
+    }
+
+
+def make_video(path, frames=90, fps=25):
+    # A plate box in view for frames 0-29 and 60-89
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (160, 120))
+    for i in range(frames):
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        if i < 30 or i >= 60:
+            image[50:70, 10 + i % 30 : 50 + i % 30] = 255
+        writer.write(image)
+    writer.release()
+
+
+class StubDetector:
+    """Finds the white box and reads every plate as ABC123."""
+
+    def detect_batch(self, frames, ocr=False):
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[:, :, 0] > 128)
+            if len(xs) == 0:
+                results.append([])
+                continue
+            bbox = [int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1]
+            results.append([{"bbox": bbox, "confidence": 0.9, "plate_crop": CropRef(frame, bbox)}])
+        return results
+
+    def run_ocr_batch(self, crops):
+        return [("ABC123", 0.8)] * len(crops)
+
+
+def pipeline_runner(stored, on_commit=None):
+    """Job runner resuming a pipeline from the job's committed frame."""
+
+    def runner(job, on_progress, cancel):
+        pipeline = VideoPipeline(
+            StubDetector(),
+            stored.extend,
+            persist_batch_size=1,
+            persist_interval=0.01,
+            track_max_age=0.5,
+        )
+
+        def progress(committed_frame, done_frame, records):
+            on_progress(committed_frame, done_frame, records)
+            if on_commit is not None:
+                on_commit(committed_frame)
+
+        return pipeline.run(
+            job["video_path"],
+            1,
+            start_frame=job["committed_frame"] + 1,
+            on_progress=progress,
+            cancel=cancel,
+            base_timestamp=0.0,
+        )
+
+    return runner
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestVideoJobManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def upload(self, name):
+        path = self.tmp / name
+        path.write_bytes(b"video")
+        return path
+
+    def test_finished_jobs_are_pruned(self):
+        """Test that finished jobs beyond the count or age limit are removed."""
+        manager = VideoJobManager(
+            self.tmp / "jobs", lambda job, on_progress, cancel: summary(), max_finished=2
+        )
+        manager.start()
+        ids = []
+        for i in range(3):
+            ids.append(manager.submit(self.upload(f"{i}.mp4"), {})["id"])
+            self.assertTrue(wait_for(lambda: manager.get(ids[-1])["status"] == COMPLETED))
+
+        self.assertIsNone(manager.get(ids[0]))
+        self.assertEqual([manager.get(i)["status"] for i in ids[1:]], [COMPLETED] * 2)
+        self.assertEqual(
+            sorted(p.stem for p in (self.tmp / "jobs").glob("*.json")), sorted(ids[1:])
+        )
+        self.assertEqual(list(self.tmp.glob("*.mp4")), [])
+
+        # Jobs that finished before the retention window are dropped on restart
+        state_file = self.tmp / "jobs" / f"{ids[1]}.json"
+        state = json.loads(state_file.read_text())
+        state["finished_at"] = (datetime.utcnow() - timedelta(hours=2)).isoformat()
+        state_file.write_text(json.dumps(state))
+        restarted = VideoJobManager(
+            self.tmp / "jobs", lambda job, on_progress, cancel: summary(), retention_seconds=3600
+        )
+        restarted.start()
+        self.assertIsNone(restarted.get(ids[1]))
+        self.assertIsNotNone(restarted.get(ids[2]))
+        self.assertFalse(state_file.exists())
+
+    def test_plates_are_capped(self):
+        """Test that the job lists at most max_plates distinct plate texts."""
+        release = threading.Event()
+
+        def runner(job, on_progress, cancel):
+            on_progress(4, 4, [{"plate_text": "CCC"}, {"plate_text": "AAA"}])
+            on_progress(9, 9, [{"plate_text": "AAA"}, {"plate_text": "BBB"}, {"plate_text": ""}])
+            release.wait(5)
+            return summary()
+
+        manager = VideoJobManager(self.tmp / "jobs", runner, max_plates=2)
+        manager.start()
+        job_id = manager.submit(self.upload("a.mp4"), {})["id"]
+        self.assertTrue(wait_for(lambda: manager.get(job_id)["frames_done"] == 10))
+        job = manager.get(job_id)
+        self.assertEqual(job["plates"], ["AAA", "CCC"])
+        self.assertEqual(job["detections"], 5)
+        release.set()
+        self.assertTrue(wait_for(lambda: manager.get(job_id)["status"] == COMPLETED))
+
+    def test_resume_from_committed_frame(self):
+        """Test that a job interrupted mid-video resumes without storing tracks twice."""
+        video = self.tmp / "plates.avi"
+        make_video(video)
+        crashed = threading.Event()
+        release = threading.Event()
+
+        def crash(committed_frame):
+            # The process "dies" once the first plate is committed
+            if committed_frame >= 40 and not crashed.is_set():
+                crashed.set()
+                release.wait(10)
+
+        before, after = [], []
+        first = VideoJobManager(self.tmp / "jobs", pipeline_runner(before, crash))
+        first.start()
+        job_id = first.submit(video, {})["id"]
+        self.assertTrue(crashed.wait(10))
+        state = json.loads((self.tmp / "jobs" / f"{job_id}.json").read_text())
+        self.assertEqual(state["status"], "running")
+
+        # A restart finds the job running and resumes after its committed frame
+        shutil.copytree(self.tmp / "jobs", self.tmp / "restarted")
+        restarted = VideoJobManager(self.tmp / "restarted", pipeline_runner(after))
+        restarted.start()
+        self.assertTrue(wait_for(lambda: restarted.get(job_id)["status"] == COMPLETED))
+        job = restarted.get(job_id)
+        self.assertEqual(job["resumed"], 1)
+        self.assertEqual(job["frames_done"], 90)
+        self.assertEqual(job["detections"], 2)
+
+        self.assertGreaterEqual(state["committed_frame"], 40)
+        self.assertEqual([r["frame_index"] for r in before], [0])
+        self.assertEqual([r["frame_index"] for r in after], [60])
+
+        first.cancel(job_id)
+        release.set()
+        self.assertTrue(wait_for(lambda: first.get(job_id)["status"] == CANCELLED))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Unit tests for live frame scheduling and batching."""
+
+from __future__ import annotations
+
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from backend.broker import InferenceBroker
+from backend.live import LiveScheduler, parse_frames
+
+
+class TestParseFrames(unittest.TestCase):
+
+    def test_frame_limit(self):
+        """Test that payloads over the frame limit are rejected, not truncated."""
+        jpeg = cv2.imencode(".jpg", np.zeros((48, 64, 3), dtype=np.uint8))[1].tobytes()
+        images, error = parse_frames({"frames": [jpeg] * 2}, 2)
+        self.assertEqual((len(images), error), (2, None))
+        images, error = parse_frames({"frames": [jpeg] * 3}, 2)
+        self.assertEqual(images, [])
+        self.assertEqual(error, "Too many frames: 3 sent, at most 2 per payload")
+
+
+class TestLiveScheduler(unittest.TestCase):
+
+    def test_latest_frame_wins(self):
+        """Test that frames arriving while busy replace each other and are counted."""
+        scheduler = LiveScheduler()
+        key = ("sid", "cam")
+
+        self.assertTrue(scheduler.submit(key, {"seq": 1}))
+        data, dropped = scheduler.next(key)
+        self.assertEqual((data["seq"], dropped), (1, 0))
+
+        # Stream is busy: later submits only replace the pending payload
+        self.assertFalse(scheduler.submit(key, {"seq": 2}))
+        self.assertFalse(scheduler.submit(key, {"seq": 3, "frames": ["a", "b"]}))
+        self.assertFalse(scheduler.submit(key, {"seq": 5}))
+        scheduler.record(key, 0.1)
+
+        data, dropped = scheduler.next(key)
+        self.assertEqual((data["seq"], dropped), (5, 3))
+        self.assertIsNone(scheduler.next(key))
+
+        # Idle again: the next submit makes the caller the worker
+        self.assertTrue(scheduler.submit(key, {"seq": 6}))
+        stats = scheduler.stats(key)
+        self.assertEqual(stats["dropped_total"], 3)
+        self.assertEqual(stats["processing_ms"], 100.0)
+        self.assertEqual(stats["processing_fps"], 10.0)
+
+    def test_discard_client(self):
+        """Test that disconnecting a client forgets its streams only."""
+        scheduler = LiveScheduler()
+        scheduler.submit(("a", "cam"), {})
+        scheduler.submit(("b", "cam"), {})
+        self.assertEqual(scheduler.discard("a"), [("a", "cam")])
+        self.assertEqual(scheduler.streams(), [("b", "cam")])
+        self.assertIsNone(scheduler.next(("a", "cam")))
+        self.assertIsNotNone(scheduler.next(("b", "cam")))
+
+
+class TestInferenceBroker(unittest.TestCase):
+
+    def test_batches_concurrent_requests(self):
+        """Test that concurrent streams share forward passes and get their own results."""
+        batch_sizes = []
+
+        def detect_batch(images):
+            batch_sizes.append(len(images))
+            return [[{"frame": img}] for img in images]
+
+        broker = InferenceBroker(detect_batch, max_batch_size=4, max_wait_ms=200)
+        results = {}
+
+        def stream(i):
+            results[i] = broker.detect([f"cam{i}-a", f"cam{i}-b"])
+
+        threads = [threading.Thread(target=stream, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(batch_sizes, [4, 4])
+        for i in range(4):
+            self.assertEqual([r[0]["frame"] for r in results[i]], [f"cam{i}-a", f"cam{i}-b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
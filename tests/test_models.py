@@ -0,0 +1,67 @@
+"""Unit tests for the SQL schema upgrade."""
+
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import text
+
+from backend.models import Detection, db, ensure_schema
+
+
+class TestEnsureSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+
+    def upgrade(self, create_table, insert_rows):
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text(create_table))
+                conn.execute(text(insert_rows))
+            db.create_all()
+            before = datetime.utcnow()
+            ensure_schema()
+            after = datetime.utcnow()
+            rows = [
+                (d.id, d.created_at, d.last_seen)
+                for d in Detection.query.order_by(Detection.id).all()
+            ]
+            db.session.remove()
+        return rows, before, after
+
+    def test_backfills_upgrade_time(self):
+        """Test that rows of the original schema, without any time, get the upgrade time."""
+        rows, before, after = self.upgrade(
+            "CREATE TABLE detections (id INTEGER PRIMARY KEY, plate_number VARCHAR(20), "
+            "confidence FLOAT, camera_id VARCHAR(20), bbox_x1 FLOAT, bbox_y1 FLOAT, "
+            "bbox_x2 FLOAT, bbox_y2 FLOAT, plate_image VARCHAR(255))",
+            "INSERT INTO detections (id, plate_number, confidence) VALUES "
+            "(1, 'ABC123', 0.9), (2, 'XYZ789', 0.8)",
+        )
+        self.assertEqual([row[0] for row in rows], [1, 2])
+        for _, created_at, last_seen in rows:
+            self.assertTrue(before <= created_at <= after, created_at)
+            self.assertIsNone(last_seen)
+
+    def test_backfills_from_track_times(self):
+        """Test that created_at comes from last_seen, then first_seen, when those exist."""
+        rows, before, after = self.upgrade(
+            "CREATE TABLE detections (id INTEGER PRIMARY KEY, plate_number VARCHAR(20), "
+            "confidence FLOAT, first_seen DATETIME, last_seen DATETIME)",
+            "INSERT INTO detections (id, plate_number, confidence, first_seen, last_seen) VALUES "
+            "(1, 'ABC123', 0.9, '2024-05-01 08:00:00.000000', '2024-05-01 08:00:05.000000'), "
+            "(2, 'XYZ789', 0.8, '2024-05-01 09:00:00.000000', NULL), "
+            "(3, 'KLM456', 0.7, NULL, NULL)",
+        )
+        self.assertEqual(rows[0][1], datetime(2024, 5, 1, 8, 0, 5))
+        self.assertEqual(rows[1][1], datetime(2024, 5, 1, 9, 0, 0))
+        self.assertTrue(before <= rows[2][1] <= after, rows[2][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
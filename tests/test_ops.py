@@ -0,0 +1,62 @@
+"""Unit tests for the NumPy YOLOv7 post-processing."""
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from backend.ops import nms, non_max_suppression
+
+
+class TestNms(unittest.TestCase):
+
+    def setUp(self):
+        self.boxes = np.array(
+            [[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30], [0, 0, 10, 5]], dtype=np.float32
+        )
+        self.scores = np.array([0.9, 0.8, 0.7, 0.95], dtype=np.float32)
+
+    def test_suppresses_overlaps(self):
+        """Test greedy NMS against hand-computed IoUs."""
+        # IoU(3, 0) = 50/100 = 0.5, IoU(3, 1) = 36/114 = 0.32, IoU(0, 1) = 81/119 = 0.68
+        self.assertEqual(nms(self.boxes, self.scores, 0.45).tolist(), [3, 1, 2])
+        self.assertEqual(nms(self.boxes, self.scores, 0.6).tolist(), [3, 0, 2])
+        self.assertEqual(nms(self.boxes, self.scores, 0.7).tolist(), [3, 0, 1, 2])
+
+    def test_non_max_suppression(self):
+        """Test confidence filtering, box conversion and per-class suppression."""
+        # center x, center y, width, height, objectness, class scores
+        prediction = np.array(
+            [
+                [
+                    [5, 5, 10, 10, 0.9, 1.0, 0.0],
+                    [6, 6, 10, 10, 0.8, 1.0, 0.0],
+                    [6, 6, 10, 10, 0.8, 0.0, 1.0],
+                    [25, 25, 10, 10, 0.7, 1.0, 0.0],
+                    [40, 40, 10, 10, 0.1, 1.0, 0.0],
+                ]
+            ],
+            dtype=np.float32,
+        )
+        (output,) = non_max_suppression(prediction, 0.25, 0.45)
+        np.testing.assert_allclose(
+            output,
+            [
+                [0, 0, 10, 10, 0.9, 0],
+                [1, 1, 11, 11, 0.8, 1],
+                [20, 20, 30, 30, 0.7, 0],
+            ],
+            rtol=1e-6,
+        )
+        # Across classes the second box overlaps the first too much
+        (output,) = non_max_suppression(prediction, 0.25, 0.45, agnostic=True)
+        self.assertEqual(output[:, 4].tolist(), [np.float32(0.9), np.float32(0.7)])
+
+        # Single-class models score by objectness alone
+        (output,) = non_max_suppression(prediction[:, :, :6] * [1, 1, 1, 1, 1, 0.5], 0.25, 0.45)
+        self.assertEqual(output[:, 4].tolist(), [np.float32(0.9), np.float32(0.7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Unit tests for keyset pagination of detection lists."""
+
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from backend.models import DEFAULT_LIST_FIELDS, Detection, db
+from backend.pagination import decode_cursor, encode_cursor, parse_datetime
+
+
+class TestCursor(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test that cursors decode to the id they were made from."""
+        for last_id in (1, 2**40, "65f1c0ffee0123456789abcd"):
+            cursor = encode_cursor(last_id)
+            self.assertNotIn("=", cursor)
+            self.assertEqual(decode_cursor(cursor), last_id)
+
+    def test_invalid_cursor(self):
+        """Test that malformed cursors raise ValueError."""
+        for cursor in ("!!!", "abc", encode_cursor(1)[:-2], "eyJwYWdlIjoxfQ"):
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
+
+
+class TestKeysetPaging(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        self.ctx.pop()
+
+    def page(self, cursor, per_page, date_from):
+        # The query list_detections runs for a cursor page
+        query = Detection.query.filter(Detection.created_at >= date_from)
+        query = Detection.load_fields(query, DEFAULT_LIST_FIELDS).order_by(Detection.id.desc())
+        if cursor:
+            query = query.filter(Detection.id < int(decode_cursor(cursor)))
+        items = query.limit(per_page + 1).all()
+        next_cursor = encode_cursor(items[per_page - 1].id) if len(items) > per_page else None
+        return [item.to_dict(DEFAULT_LIST_FIELDS) for item in items[:per_page]], next_cursor
+
+    def test_equal_created_at(self):
+        """Test that rows sharing a created_at are each listed exactly once."""
+        created_at = datetime(2024, 5, 1, 8, 0, 0)
+        db.session.add_all(
+            Detection(plate_number=f"ABC{i:03d}", confidence=0.9, created_at=created_at)
+            for i in range(7)
+        )
+        db.session.add(
+            Detection(plate_number="OLD001", confidence=0.9, created_at=datetime(2024, 4, 30))
+        )
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            items, cursor = self.page(cursor, 3, parse_datetime("2024-05-01"))
+            seen.extend(items)
+            if cursor is None:
+                break
+        self.assertEqual([item["id"] for item in seen], [7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual({item["created_at"] for item in seen}, {seen[0]["created_at"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
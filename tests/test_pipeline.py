@@ -0,0 +1,112 @@
+"""Unit tests for the staged video pipeline."""
+
+from __future__ import annotations
+
+import random
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.crops import CropRef
+from backend.pipeline import VideoPipeline
+
+# Plate A is in view for frames 0-29 and plate B for frames 60-89
+PLATE_FRAMES = (range(0, 30), range(60, 90))
+
+
+def make_video(path, frames=90, fps=25):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (160, 120))
+    for i in range(frames):
+        image = np.zeros((120, 160, 3), dtype=np.uint8)
+        if any(i in plate for plate in PLATE_FRAMES):
+            x = 10 + i % 30
+            image[50:70, x : x + 40] = 255
+        writer.write(image)
+    writer.release()
+
+
+class StubDetector:
+    """Finds the white box; OCR is slowest for the earliest batches."""
+
+    def detect_batch(self, frames, ocr=False):
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[:, :, 0] > 128)
+            if len(xs) == 0:
+                results.append([])
+                continue
+            bbox = [int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1]
+            results.append([{"bbox": bbox, "confidence": 0.9, "plate_crop": CropRef(frame, bbox)}])
+        return results
+
+    def run_ocr_batch(self, crops):
+        # Random delays make the OCR workers finish batches out of order
+        time.sleep(random.uniform(0.0, 0.02))
+        return [("ABC123", 0.8)] * len(crops)
+
+
+class TestVideoPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.video = str(self.tmp / "plates.avi")
+        make_video(self.video)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_pipeline(self, **kwargs):
+        stored, progress = [], []
+        pipeline = VideoPipeline(
+            StubDetector(),
+            stored.extend,
+            batch_size=2,
+            ocr_workers=3,
+            persist_batch_size=1,
+            persist_interval=0.01,
+            track_max_age=0.5,
+        )
+
+        def on_progress(committed_frame, done_frame, records):
+            progress.append((committed_frame, done_frame, list(stored)))
+
+        summary = pipeline.run(self.video, 1, on_progress=on_progress, base_timestamp=0.0, **kwargs)
+        return summary, stored, progress
+
+    def test_records_in_order_behind_watermark(self):
+        """Test that tracks are stored in order and the watermark never passes an unstored one."""
+        summary, stored, progress = self.run_pipeline()
+
+        self.assertEqual(summary["total_frames"], 90)
+        self.assertEqual(summary["processed_frames"], 90)
+        self.assertEqual([r["frame_index"] for r in stored], [0, 60])
+        self.assertEqual([r["last_frame"] for r in stored], [29, 89])
+        self.assertEqual(summary["committed_frame"], 89)
+
+        committed = [c for c, _, _ in progress]
+        self.assertEqual(committed, sorted(committed))
+        for committed_frame, done_frame, stored_so_far in progress:
+            self.assertLessEqual(committed_frame, done_frame)
+            # Every track starting at or before the watermark is already stored
+            starts = [plate.start for plate in PLATE_FRAMES if plate.start <= committed_frame]
+            self.assertEqual([r["frame_index"] for r in stored_so_far], starts)
+
+    def test_end_frame(self):
+        """Test that a run stops before end_frame and finishes the tracks still open."""
+        summary, stored, _ = self.run_pipeline(end_frame=75)
+        self.assertEqual(summary["total_frames"], 75)
+        self.assertEqual(summary["processed_frames"], 75)
+        self.assertEqual([(r["frame_index"], r["last_frame"]) for r in stored], [(0, 29), (60, 74)])
+
+        summary, stored, _ = self.run_pipeline(start_frame=30, end_frame=60)
+        self.assertEqual((summary["total_frames"], summary["processed_frames"]), (60, 30))
+        self.assertEqual(stored, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Unit tests for the fuzzy plate index."""
+
+from __future__ import annotations
+
+import random
+import unittest
+
+from backend.plate_index import PlateIndex, edit_distance, normalize_plate
+
+
+class TestPlateIndex(unittest.TestCase):
+
+    def test_edit_distance(self):
+        """Test the bit-parallel distance against a plain DP implementation."""
+
+        def reference(a, b):
+            previous = list(range(len(b) + 1))
+            for i, ca in enumerate(a, 1):
+                current = [i]
+                for j, cb in enumerate(b, 1):
+                    current.append(
+                        min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+                    )
+                previous = current
+            return previous[-1]
+
+        rng = random.Random(0)
+        for _ in range(500):
+            a = "".join(rng.choice("AB01") for _ in range(rng.randint(0, 10)))
+            b = "".join(rng.choice("AB01") for _ in range(rng.randint(0, 10)))
+            self.assertEqual(edit_distance(a, b), reference(a, b))
+
+    def test_search_tolerates_confusions(self):
+        """Test that confusable characters match and results are ranked by distance."""
+        self.assertEqual(normalize_plate("mh-12 ab 1234"), normalize_plate("MH12A81234"))
+
+        index = PlateIndex()
+        for plate in ["MH12AB1234", "MH12AB1234", "MH12AB1284", "KA05XY9876", "UNKNOWN"]:
+            index.add(plate)
+
+        results = index.search("MHI2AB1Z34", max_distance=1)
+        self.assertEqual([r["plate_number"] for r in results], ["MH12AB1234", "MH12AB1284"])
+        self.assertEqual([r["distance"] for r in results], [0, 1])
+        self.assertEqual(results[0]["detections"], 2)
+        self.assertEqual(index.search("UNKNOWN"), [])
+
+        index.remove("MH12AB1284")
+        self.assertEqual(len(index.search("MH12AB1234", max_distance=1)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Unit tests for the preallocated detector preprocessing."""
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from backend.ops import letterbox, letterbox_geometry
+from backend.preprocess import BatchPreprocessor, letterbox_into
+
+
+def reference(img, new_shape, auto):
+    padded = letterbox(img, new_shape, auto=auto)[0]
+    return padded[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+
+
+class TestLetterboxInto(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.images = [
+            rng.integers(0, 256, (120, 200, 3), dtype=np.uint8),
+            rng.integers(0, 256, (300, 90, 3), dtype=np.uint8),
+        ]
+
+    def test_matches_letterbox(self):
+        """Test that the in-place letterbox matches ops.letterbox scaled to [0, 1]."""
+        for img in self.images:
+            for auto in (False, True):
+                expected = reference(img, 320, auto)
+                out = np.full(expected.shape, -1.0, dtype=np.float32)
+                geometry = letterbox_geometry(img.shape[:2], 320, auto, 32)
+                letterbox_into(img, out, geometry)
+                self.assertLess(np.abs(out - expected).max(), 1e-6, (img.shape, auto))
+
+    def test_batch_reuses_buffers(self):
+        """Test that a batch of equal-sized frames matches per-frame letterboxing."""
+        preprocess = BatchPreprocessor()
+        for img in self.images:
+            batch = [img, img[::-1].copy()]
+            expected = np.stack([reference(i, 320, False) for i in batch])
+            first = preprocess(batch, 320, False, 32)
+            np.testing.assert_allclose(first, expected, atol=1e-6)
+            second = preprocess(batch[::-1], 320, False, 32)
+            self.assertTrue(np.shares_memory(first, second))
+            np.testing.assert_allclose(second, expected[::-1], atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
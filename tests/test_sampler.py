@@ -0,0 +1,47 @@
+"""Unit tests for adaptive frame sampling."""
+
+from __future__ import annotations
+
+import unittest
+
+from backend.sampler import AdaptiveSampler, parse_sample_rate
+
+
+class TestAdaptiveSampler(unittest.TestCase):
+
+    def run_sampler(self, sampler, active_frames, total):
+        sampled = []
+        for frame_index in range(total):
+            if sampler.sample(frame_index):
+                sampled.append(frame_index)
+                sampler.observe(frame_index, frame_index in active_frames)
+        return sampled
+
+    def test_backs_off_when_idle(self):
+        """Test that the stride doubles on idle frames up to max_stride."""
+        sampler = AdaptiveSampler(min_stride=1, max_stride=8)
+        sampled = self.run_sampler(sampler, set(), 40)
+        self.assertEqual(sampled, [0, 1, 3, 7, 15, 23, 31, 39])
+        self.assertEqual(sampler.stats()["stride"], 8)
+
+    def test_dense_while_active(self):
+        """Test that activity drops the stride back to min_stride."""
+        sampler = AdaptiveSampler(min_stride=2, max_stride=16)
+        active = set(range(40, 60))
+        sampled = self.run_sampler(sampler, active, 100)
+        # Every second frame from the first active sample until activity ends
+        first = min(i for i in sampled if i in active)
+        self.assertEqual([i for i in sampled if first <= i < 60], list(range(first, 60, 2)))
+        self.assertLess(len(sampled), 40)
+
+    def test_parse_sample_rate(self):
+        """Test sample_rate validation."""
+        self.assertEqual(parse_sample_rate("auto"), "auto")
+        self.assertEqual(parse_sample_rate("5"), 5)
+        for bad in ("0", "fast", None):
+            with self.assertRaises(ValueError):
+                parse_sample_rate(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
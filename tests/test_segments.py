@@ -0,0 +1,105 @@
+"""Unit tests for segmented video processing."""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from backend.decoder import PYAV_AVAILABLE
+from backend.segments import plan_segments, stitch_tracks
+
+
+def record(first_seen, last_seen, first_bbox, last_bbox, text="UNKNOWN", frame=0):
+    return {
+        "track_id": f"t{frame}",
+        "frame_index": frame,
+        "last_frame": frame + 10,
+        "bbox": last_bbox,
+        "first_bbox": first_bbox,
+        "last_bbox": last_bbox,
+        "confidence": 0.9,
+        "plate_text": text,
+        "ocr_confidence": 0.8 if text != "UNKNOWN" else 0.0,
+        "plate_crop": None,
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "frames_seen": 5,
+    }
+
+
+class TestStitchTracks(unittest.TestCase):
+
+    def test_joins_track_across_cut(self):
+        """Test that a plate seen on both sides of a cut becomes one record."""
+        earlier = [record(8.0, 9.9, [0, 0, 40, 20], [100, 50, 140, 70], "ABC123", frame=200)]
+        later = [record(10.0, 12.0, [104, 50, 144, 70], [200, 50, 240, 70], frame=250)]
+        unjoined, merged, joins = stitch_tracks(earlier, later)
+        self.assertEqual((unjoined, joins), ([], 1))
+        self.assertEqual(len(merged), 1)
+        track = merged[0]
+        self.assertEqual(track["track_id"], "t200")
+        self.assertEqual((track["first_seen"], track["last_seen"]), (8.0, 12.0))
+        self.assertEqual(track["frames_seen"], 10)
+        self.assertEqual(track["plate_text"], "ABC123")
+
+    def test_keeps_separate_plates(self):
+        """Test that different plates, distant boxes and long gaps are not joined."""
+        earlier = [
+            record(8.0, 9.9, [0, 0, 40, 20], [100, 50, 140, 70], "ABC123"),
+            record(8.0, 9.9, [0, 0, 40, 20], [300, 50, 340, 70]),
+            record(5.0, 6.0, [0, 0, 40, 20], [500, 50, 540, 70]),
+        ]
+        later = [
+            record(10.0, 12.0, [100, 50, 140, 70], [0, 0, 40, 20], "XYZ789"),
+            record(10.0, 12.0, [0, 200, 40, 220], [0, 0, 40, 20]),
+            record(10.0, 12.0, [500, 50, 540, 70], [0, 0, 40, 20]),
+        ]
+        unjoined, merged, joins = stitch_tracks(earlier, later, max_gap=1.5)
+        self.assertEqual(joins, 0)
+        self.assertEqual(len(unjoined), 3)
+        self.assertEqual(merged, later)
+
+
+class TestPlanSegments(unittest.TestCase):
+
+    @unittest.skipUnless(PYAV_AVAILABLE, "PyAV not installed")
+    def test_cuts_on_keyframes(self):
+        """Test that segments are contiguous and start on keyframes."""
+        import av
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "gop.mp4")
+            container = av.open(path, "w")
+            stream = container.add_stream("mpeg4", rate=25)
+            stream.width, stream.height = 64, 48
+            stream.pix_fmt = "yuv420p"
+            stream.codec_context.gop_size = 30
+            for i in range(300):
+                image = np.full((48, 64, 3), i % 256, dtype=np.uint8)
+                for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")):
+                    container.mux(packet)
+            for packet in stream.encode():
+                container.mux(packet)
+            container.close()
+
+            with av.open(path) as container:
+                stream = container.streams.video[0]
+                keyframes = {
+                    round(packet.pts * stream.time_base * 25)
+                    for packet in container.demux(stream)
+                    if packet.pts is not None and packet.is_keyframe
+                }
+            segments = plan_segments(path, 4, start_frame=5, min_frames=50)
+        self.assertEqual(segments[0][0], 5)
+        self.assertIsNone(segments[-1][1])
+        self.assertGreater(len(segments), 1)
+        for (_, end), (start, _) in zip(segments, segments[1:]):
+            self.assertEqual(end, start)
+            self.assertIn(start, keyframes)
+
+
+if __name__ == "__main__":
+    unittest.main()
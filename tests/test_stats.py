@@ -0,0 +1,81 @@
+"""Unit tests for incrementally maintained detection statistics."""
+
+from __future__ import annotations
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from backend.stats import DetectionStats, HyperLogLog
+
+
+class TestDetectionStats(unittest.TestCase):
+
+    def test_hyperloglog_estimate(self):
+        """Test that distinct counts are estimated within a few percent."""
+        sketch = HyperLogLog(14)
+        for i in range(50000):
+            sketch.add(f"PLATE{i % 20000}")
+        self.assertAlmostEqual(sketch.count(), 20000, delta=20000 * 0.03)
+
+    def test_rollups_and_snapshot(self):
+        """Test per-camera and hourly rollups, and that a saved snapshot restores them."""
+        stats = DetectionStats(hours=2)
+        start = datetime(2024, 5, 1, 8, 30)
+        for i in range(6):
+            stats.add(f"AB{i % 2}", "gate", start + timedelta(hours=i // 2), id=i + 1)
+        stats.add("UNKNOWN", "yard", start, id=7)
+        stats.remove("gate", start)
+
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["total_detections"], 6)
+        self.assertEqual(snapshot["unique_plates"], 2)
+        self.assertEqual(snapshot["per_camera"]["gate"]["detections"], 5)
+        self.assertEqual(snapshot["per_camera"]["yard"]["unique_plates"], 0)
+        # Only the newest two hours are kept
+        self.assertEqual(
+            snapshot["hourly"],
+            [
+                {"hour": "2024-05-01T09:00", "detections": 2},
+                {"hour": "2024-05-01T10:00", "detections": 2},
+            ],
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stats.json"
+            stats.save(path)
+            restored = DetectionStats(hours=2)
+            self.assertTrue(restored.load(path))
+        self.assertEqual(restored.snapshot(), snapshot)
+        self.assertEqual(restored.watermark, 7)
+
+    def test_batches_during_catch_up(self):
+        """Test that batches written during the catch-up are counted once, after it."""
+        stats = DetectionStats()
+        when = datetime(2024, 5, 1, 8, 30)
+        # Written before the catch-up read its newest id (5), and after it
+        stats.add_batch([("AB1", "gate", when)] * 2, id=5)
+        stats.add_batch([("AB2", "gate", when)] * 3, id=8)
+        self.assertEqual((stats.total, stats.watermark), (0, None))
+
+        for i in range(1, 6):
+            stats.add("AB1", "gate", when, id=i)
+        self.assertEqual(stats.watermark, 5)
+        stats.finish_catch_up(5)
+        self.assertEqual((stats.total, stats.watermark), (8, 8))
+
+        stats.add_batch([("AB3", "yard", when)], id=9)
+        self.assertEqual((stats.total, stats.watermark), (9, 9))
+
+        # Ids not assigned in order are skipped only if the catch-up counted them
+        stats = DetectionStats()
+        stats.add_batch([("AB1", "gate", when)], id="b")
+        stats.add_batch([("AB2", "gate", when)], id="a")
+        stats.add("AB1", "gate", when, id="b")
+        stats.finish_catch_up(counted={"b"})
+        self.assertEqual((stats.total, stats.watermark), (2, "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Unit tests for the plate tracker."""
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from backend.crops import CropRef
+from backend.tracker import PlateTracker, TrackerRegistry, box_iou
+
+
+def make_result(bbox, confidence=0.9):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    return {
+        "bbox": list(bbox),
+        "confidence": confidence,
+        "plate_crop": CropRef(frame, bbox),
+    }
+
+
+class TestTracker(unittest.TestCase):
+
+    def test_box_iou(self):
+        """Test IoU of identical, disjoint and half-overlapping boxes."""
+        a = np.array([[0, 0, 10, 10]], dtype=np.float64)
+        b = np.array([[0, 0, 10, 10], [20, 20, 30, 30], [5, 0, 15, 10]], dtype=np.float64)
+        iou = box_iou(a, b)
+        self.assertAlmostEqual(iou[0, 0], 1.0)
+        self.assertAlmostEqual(iou[0, 1], 0.0)
+        self.assertAlmostEqual(iou[0, 2], 1 / 3)
+
+    def test_moving_plate_is_one_track(self):
+        """Test a plate moving across frames stays one track and is OCR'd once."""
+        tracker = PlateTracker(max_age=1.0)
+        ocr_requests = 0
+        for i in range(10):
+            x = 100 + 8 * i
+            requests, finished = tracker.update([make_result((x, 50, x + 80, 80))], i * 0.1)
+            ocr_requests += len(requests)
+            tracker.apply_ocr(requests, [("ABC1234", 0.8)] * len(requests))
+            self.assertEqual(finished, [])
+
+        self.assertEqual(len(tracker.tracks), 1)
+        self.assertEqual(ocr_requests, 1)
+
+        finished = tracker.expire(3.0)
+        self.assertEqual(len(finished), 1)
+        record = finished[0].to_record()
+        self.assertEqual(record["plate_text"], "ABC1234")
+        self.assertEqual(record["frames_seen"], 10)
+        self.assertEqual(record["plate_crop"].frame.shape, (30, 80, 3))
+        self.assertAlmostEqual(record["last_seen"] - record["first_seen"], 0.9)
+
+    def test_better_crop_requests_ocr(self):
+        """Test OCR is re-requested when crop quality clearly improves."""
+        tracker = PlateTracker()
+        requests, _ = tracker.update([make_result((0, 0, 40, 20), 0.5)], 0.0)
+        self.assertEqual(len(requests), 1)
+        requests, _ = tracker.update([make_result((0, 0, 40, 20), 0.5)], 0.1)
+        self.assertEqual(len(requests), 0)
+        requests, _ = tracker.update([make_result((0, 0, 50, 25), 0.9)], 0.2)
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(len(tracker.tracks), 1)
+
+    def test_registry_flush_camera(self):
+        """Test flushing one camera finishes its open tracks and no others."""
+        registry = TrackerRegistry()
+        registry.get("a").update([make_result((0, 0, 40, 20))], 0.0)
+        registry.get("b").update([make_result((0, 0, 40, 20))], 0.0)
+        self.assertEqual([camera for camera, _ in registry.flush("a")], ["a"])
+        self.assertEqual(registry.get("a").tracks, [])
+        self.assertEqual(len(registry.get("b").tracks), 1)
+        self.assertEqual([camera for camera, _ in registry.flush()], ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Unit tests for streaming video uploads."""
+
+from __future__ import annotations
+
+import io
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from backend.upload import StreamingUpload
+
+
+class SlowStream(io.RawIOBase):
+    """Request body that hands out data only when the test releases it."""
+
+    def __init__(self, data, chunk_size, fail=False):
+        super().__init__()
+        self.chunks = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
+        self.fail = fail
+        self.release = threading.Semaphore(0)
+
+    def read(self, n=-1):
+        self.release.acquire()
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.fail:
+            raise ConnectionError("client disconnected")
+        return b""
+
+
+class TestStreamingUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.data = bytes(range(256)) * 40
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def start(self, fail=False):
+        upload = StreamingUpload(self.tmp / "video.mp4", len(self.data), chunk_size=1024)
+        body = SlowStream(self.data, 1024, fail=fail)
+        thread = threading.Thread(target=lambda: self.receive(upload, body), daemon=True)
+        thread.start()
+        return upload, body, thread
+
+    def receive(self, upload, body):
+        try:
+            upload.receive(body)
+        except ConnectionError:
+            pass
+
+    def test_reader_follows_upload(self):
+        """Test that reads block for data still to come and see every byte."""
+        upload, body, thread = self.start()
+        reader = upload.open()
+        # The size is known from Content-Length before any data arrived
+        self.assertEqual(reader.seek(0, io.SEEK_END), len(self.data))
+        reader.seek(0)
+        body.release.release()
+        self.assertEqual(reader.read(1024), self.data[:1024])
+        for _ in range(len(self.data) // 1024 + 1):
+            body.release.release()
+        self.assertEqual(reader.read(), self.data[1024:])
+        thread.join(5)
+        self.assertTrue(upload.status()["complete"])
+        self.assertEqual(upload.status()["bytes_received"], len(self.data))
+        reader.close()
+
+    def test_failed_upload(self):
+        """Test that readers fail once the data that did arrive is consumed."""
+        upload, body, thread = self.start(fail=True)
+        for _ in range(20):
+            body.release.release()
+        thread.join(5)
+        self.assertEqual(upload.error, "client disconnected")
+        self.assertFalse(upload.wait())
+        reader = upload.open()
+        reader.read(upload.bytes_received)
+        with self.assertRaises(OSError):
+            reader.read(1)
+        reader.close()
+
+    def test_cancel_unblocks_reader(self):
+        """Test that a cancelled reader returns end of file instead of waiting."""
+        upload, body, thread = self.start()
+        cancel = threading.Event()
+        cancel.set()
+        reader = upload.open(cancel)
+        self.assertEqual(reader.read(10), b"")
+        reader.close()
+        for _ in range(20):
+            body.release.release()
+        thread.join(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
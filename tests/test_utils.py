@@ -1,8 +1,10 @@
 """Unit tests for utility functions."""
 from __future__ import annotations
 
+import tempfile
 import unittest
-from src.utils import yolo_label_to_box
+from pathlib import Path
+from src.utils import read_yolo_labels, split_images, yolo_label_to_box
 
 
 class TestUtils(unittest.TestCase):
@@ -25,6 +27,21 @@ class TestUtils(unittest.TestCase):
         self.assertAlmostEqual(x2, 40.0)
         self.assertAlmostEqual(y2, 40.0)
 
+    def test_split_images_and_labels(self):
+        """Test dataset split listing and label lookup from data.yaml."""
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "images" / "val").mkdir(parents=True)
+            (root / "labels" / "val").mkdir(parents=True)
+            (root / "images" / "val" / "a.jpg").write_bytes(b"")
+            (root / "labels" / "val" / "a.txt").write_text("0 0.5 0.5 0.2 0.3\n")
+            (root / "data.yaml").write_text("val: images/val\nnc: 1\n")
+
+            images = split_images(root / "data.yaml", "val")
+            self.assertEqual([p.name for p in images], ["a.jpg"])
+            self.assertEqual(split_images(root / "data.yaml", "test"), [])
+            self.assertEqual(read_yolo_labels(images[0], 100, 100), [(40.0, 35.0, 60.0, 65.0)])
+
 
 if __name__ == "__main__":
     unittest.main()
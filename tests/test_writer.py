@@ -0,0 +1,94 @@
+"""Unit tests for the batched detection writer."""
+
+from __future__ import annotations
+
+import unittest
+
+from backend.writer import DetectionWriter, PartialWriteError
+
+
+class TestDetectionWriter(unittest.TestCase):
+
+    def test_batches_and_retries(self):
+        """Test that items are bulk-written in batches and kept for a retry on failure."""
+        batches = []
+        fail = [True]
+
+        def write_many(items):
+            if fail[0]:
+                fail[0] = False
+                raise RuntimeError("database unavailable")
+            batches.append(list(items))
+
+        writer = DetectionWriter(write_many, batch_size=3, flush_interval=60)
+        try:
+            writer.add([1, 2])
+            with self.assertRaises(RuntimeError):
+                writer.add([3], wait=True)
+
+            # Only the failed waiter's item was dropped; the retry writes the rest,
+            # keeping the second waiter's items in one batch
+            writer.add([4, 5, 6, 7], wait=True)
+            self.assertEqual(batches, [[1, 2, 4, 5, 6, 7]])
+            self.assertEqual(writer.stats()["written"], 6)
+            self.assertEqual(writer.stats()["failures"], 1)
+        finally:
+            writer.close()
+
+    def test_failed_wait_can_be_retried(self):
+        """Test that a caller re-adding items after a failed wait writes them once."""
+        written = []
+        fail = [1]
+
+        def write_many(items):
+            if fail[0]:
+                fail[0] -= 1
+                raise RuntimeError("database unavailable")
+            written.extend(items)
+
+        writer = DetectionWriter(write_many, batch_size=2, flush_interval=60)
+        try:
+            rows = ["a", "b", "c"]
+            for attempt in range(2):
+                try:
+                    writer.add(rows, wait=True)
+                    break
+                except RuntimeError:
+                    self.assertEqual(writer.stats()["pending"], 0)
+            self.assertEqual(attempt, 1)
+            self.assertEqual(written, rows)
+            self.assertEqual(writer.stats()["dropped"], 0)
+        finally:
+            writer.close()
+
+    def test_partial_write(self):
+        """Test that items a partial write stored are reported and never written again."""
+        written = []
+        fail = [True]
+
+        def write_many(items):
+            if fail[0]:
+                fail[0] = False
+                # Every item but "c" is stored
+                stored = [i for i, item in enumerate(items) if item != "c"]
+                written.extend(items[i] for i in stored)
+                raise PartialWriteError(stored, RuntimeError("document too large"))
+            written.extend(items)
+
+        writer = DetectionWriter(write_many, batch_size=10, flush_interval=60)
+        try:
+            writer.add(["x", "y"])
+            with self.assertRaises(PartialWriteError) as ctx:
+                writer.add(["a", "b", "c", "d"], wait=True)
+            # Indices into the caller's own items
+            self.assertEqual(ctx.exception.written, [0, 1, 3])
+            self.assertTrue(writer.flush(5))
+            self.assertEqual(written, ["x", "y", "a", "b", "d"])
+            self.assertEqual(writer.stats()["written"], 5)
+            self.assertEqual(writer.stats()["pending"], 0)
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()